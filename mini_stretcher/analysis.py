@@ -0,0 +1,171 @@
+"""Per-run metrics from recorded .msrun files.
+
+    result = analyze_run("runs/20240101-120000.msrun")
+    results = analyze_runs(glob.glob("runs/*.msrun"), jobs=8)
+
+Everything is computed with whole-array NumPy operations on the
+memory-mapped records, so a run costs a few passes over its samples and
+runs analyse independently in separate processes.
+"""
+import csv
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from mini_stretcher.recorder import load_run
+from mini_stretcher.units import data_to_mm
+
+RATE_WINDOW = 0.2  # [s] strain rates are differences over this window
+SETTLE_TOLERANCE = 0.01  # [mm] band around the target length for settling
+
+# Columns of write_summary(); the per-cycle lists only go to JSON
+SUMMARY_FIELDS = [
+    "name", "samples", "duration_s", "l0", "target_length", "target_strain", "peak_strain", "peak_strain_error",
+    "nominal_rate", "ramp_rate", "peak_rate", "overshoot_mm", "overshoot_pct", "settling_time_s", "cycles",
+    "amplitude_first", "amplitude_last", "amplitude_decay_pct", "skew_mean_um", "skew_rms_um", "skew_max_um",
+]
+
+
+def analyze_run(path, settle_tolerance: float = SETTLE_TOLERANCE) -> dict:
+    """Metrics of one run; strains in %, rates in %/s
+
+    Args:
+        settle_tolerance (float): a hold counts as settled once the length
+            stays within this distance of the target [mm]
+
+    Returns:
+        dict: SUMMARY_FIELDS plus "path", "cycle_peaks" and "cycle_amplitudes"
+    """
+    header, records = load_run(path)
+    result = {"path": str(path), "name": os.path.splitext(os.path.basename(path))[0], "samples": len(records)}
+    l0 = header["l0"]
+    target = header.get("target_length")
+    result.update(l0=l0, target_length=target)
+    if len(records) < 2:
+        return result
+
+    t = (records["t_ns"] - records["t_ns"][0]) / 1e9
+    length = np.asarray(records["length"])
+    strain = np.asarray(records["strain"])
+    result["duration_s"] = float(t[-1])
+    result.update(_skew(records["pos1"], records["pos2"]))
+    result["peak_rate"] = _peak_rate(t, strain)
+    if "speed" in header:
+        result["nominal_rate"] = header["speed"] / l0 * 100
+    if target is None or target == l0:
+        return result
+
+    direction = 1 if target > l0 else -1
+    amplitude = abs(target - l0)
+    excursion = (length - l0) * direction  # towards the target, [mm]
+    result["target_strain"] = (target - l0) / l0 * 100
+    peak = int(excursion.argmax())
+    result["peak_strain"] = float(strain[peak])
+    result["peak_strain_error"] = result["peak_strain"] - result["target_strain"]
+    result["overshoot_mm"] = max(float(excursion[peak]) - amplitude, 0.0)
+    result["overshoot_pct"] = result["overshoot_mm"] / amplitude * 100
+    result["ramp_rate"] = _ramp_rate(t, excursion, amplitude, l0)
+    result["settling_time_s"] = _settling_time(t, excursion, amplitude, settle_tolerance)
+
+    peaks, troughs = _cycle_extremes(strain * direction, excursion > amplitude / 2)
+    if len(peaks):
+        amplitudes = (peaks - troughs[:len(peaks)]) * direction
+        result.update(cycles=len(peaks), cycle_peaks=(peaks * direction).tolist(),
+                      cycle_amplitudes=amplitudes.tolist(), amplitude_first=float(amplitudes[0]),
+                      amplitude_last=float(amplitudes[-1]))
+        if amplitudes[0]:
+            result["amplitude_decay_pct"] = float((amplitudes[0] - amplitudes[-1]) / amplitudes[0] * 100)
+    return result
+
+
+def analyze_runs(paths, jobs: int = None, **kwargs) -> list:
+    """analyze_run() for every path in parallel processes, results in path order
+
+    A run that can't be analysed gives {"path": ..., "error": ...} instead
+    of aborting the batch.
+    """
+    paths = [str(p) for p in paths]
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = [pool.submit(analyze_run, path, **kwargs) for path in paths]
+        results = []
+        for path, future in zip(paths, futures):
+            try:
+                results.append(future.result())
+            except Exception as e:
+                results.append({"path": path, "name": os.path.basename(path), "error": str(e)})
+    return results
+
+
+def write_summary(results, path) -> None:
+    """One CSV row per run with the SUMMARY_FIELDS"""
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, SUMMARY_FIELDS + ["error"], extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(results)
+
+
+def _skew(pos1, pos2):
+    skew = data_to_mm(np.asarray(pos1, dtype=np.int64) - pos2) * 1000
+    return {"skew_mean_um": float(skew.mean()), "skew_rms_um": float(np.sqrt(np.mean(skew ** 2))),
+            "skew_max_um": float(np.abs(skew).max())}
+
+
+def _windowed_rate(t, y):
+    """dy/dt over RATE_WINDOW, so position quantization doesn't dominate"""
+    dt = np.median(np.diff(t))
+    k = max(1, int(round(RATE_WINDOW / dt))) if dt > 0 else 1
+    if len(t) <= k:
+        k = len(t) - 1
+    span = t[k:] - t[:-k]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(span > 0, (y[k:] - y[:-k]) / span, 0.0)
+
+
+def _peak_rate(t, strain):
+    return float(np.abs(_windowed_rate(t, strain)).max())
+
+
+def _ramp_rate(t, excursion, amplitude, l0):
+    """Mean strain rate between 10 % and 90 % of the first ramp"""
+    above10 = np.flatnonzero(excursion >= 0.1 * amplitude)
+    above90 = np.flatnonzero(excursion >= 0.9 * amplitude)
+    if not len(above10) or not len(above90) or t[above90[0]] <= t[above10[0]]:
+        return None
+    return float(0.8 * amplitude / l0 * 100 / (t[above90[0]] - t[above10[0]]))
+
+
+def _settling_time(t, excursion, amplitude, tolerance):
+    """From arriving at the target until staying within tolerance of it, during the first hold"""
+    in_band = np.abs(excursion - amplitude) <= tolerance
+    arrived = np.flatnonzero(excursion >= amplitude - tolerance)  # an overshoot can jump over the band
+    if not len(arrived) or not in_band.any():
+        return None
+    first = arrived[0]
+    # The hold ends where the length leaves towards L0 for good
+    falling = np.flatnonzero(excursion[first:] < amplitude / 2)
+    end = first + (falling[0] if len(falling) else len(excursion) - first)
+    inside = np.flatnonzero(in_band[first:end])
+    if not len(inside):
+        return None
+    last_in = first + inside[-1]
+    outside = np.flatnonzero(~in_band[first:last_in + 1])
+    settled = first if not len(outside) else first + outside[-1] + 1
+    return float(t[settled] - t[first])
+
+
+def _cycle_extremes(signed_strain, high):
+    """Max of every excursion above the midpoint and min before each of them"""
+    edges = np.flatnonzero(np.diff(high.astype(np.int8))) + 1
+    bounds = np.r_[0, edges, len(high)]
+    starts = bounds[:-1]
+    is_high = high[starts]
+    if not is_high.any():
+        return np.array([]), np.array([])
+    maxima = np.maximum.reduceat(signed_strain, starts)
+    minima = np.minimum.reduceat(signed_strain, starts)
+    # Every high segment pairs with the low segment before it; the first
+    # ramp starts from the first sample
+    high_segments = np.flatnonzero(is_high)
+    troughs = np.where(high_segments > 0, minima[np.maximum(high_segments - 1, 0)], signed_strain[0])
+    return maxima[is_high], troughs
@@ -0,0 +1,143 @@
+"""asyncio version of Motors with awaitable move completion.
+
+    async def main():
+        rigs = [AsyncMotors(), AsyncMotors()]
+        await asyncio.gather(rigs[0].connect("COM3"), rigs[1].connect("COM4"))
+        await asyncio.gather(*(rig.move_absolute(14, 0.03) for rig in rigs))
+
+    asyncio.run(main())
+"""
+import asyncio
+
+from zaber_motion.binary import CommandCode
+
+from mini_stretcher.connection_manager import ConnectionManager
+from mini_stretcher.motion_state import MoveInterrupted
+from mini_stretcher.motors import Motors
+from mini_stretcher.replies import ERROR_REPLY
+from mini_stretcher.units import check_microstep_resolution, mm_to_data, mms_to_data
+
+
+class _PendingReplies:
+    """Future resolved once every axis sent one of the expected replies"""
+
+    def __init__(self, loop, addresses, reply_codes):
+        self.future = loop.create_future()
+        self.reply_codes = reply_codes
+        self.replies = {}
+        self._pending = set(addresses)
+
+    def feed(self, event) -> None:
+        if self.future.done() or event.device_address not in self._pending:
+            return
+        if event.command == ERROR_REPLY:
+            self.future.set_exception(RuntimeError(f"Device {event.device_address} error {event.data}"))
+            return
+        if event.command not in self.reply_codes:
+            return
+        self.replies[event.device_address] = event.data
+        self._pending.discard(event.device_address)
+        if not self._pending:
+            self.future.set_result(self.replies)
+
+
+class AsyncMotors:
+    """Both stretcher axes as an asyncio API.
+
+    Motion commands are broadcast like in Motors, so both axes start on the
+    same packet. The returned coroutines finish when both devices sent their
+    completion reply, which the binary protocol sends when a move ends.
+    """
+
+    ZERO_POSITION = Motors.ZERO_POSITION
+    ALL_DEVICES = 0
+
+    def __init__(self, connections: ConnectionManager = None):
+        self.connected = False
+        self.connections = connections or ConnectionManager()
+        self._awaiting = []
+        self._motion = None
+
+    async def connect(self, port):
+        self._loop = asyncio.get_running_loop()
+        self.connection, devices = await self.connections.open_async(port)
+        if len(devices) < 2:
+            await self.connection.close_async()
+            raise ConnectionError(f"Expected two devices on {port}, found {len(devices)}.")
+        self.device1, self.device2 = devices[:2]
+        replies = await asyncio.gather(*(
+            device.generic_command_async(CommandCode.RETURN_SETTING, CommandCode.SET_MICROSTEP_RESOLUTION.value)
+            for device in devices[:2]))
+        try:
+            check_microstep_resolution(reply.data for reply in replies)
+        except ValueError as e:
+            await self.connection.close_async()
+            raise ConnectionError(f"{port}: {e}") from e
+        self._addresses = (self.device1.device_address, self.device2.device_address)
+        # Replies arrive on a library thread; hand them to the event loop
+        self._subscription = self.connection.unknown_response.subscribe(
+            lambda event: self._loop.call_soon_threadsafe(self._dispatch, event))
+        self.connected = True
+
+    async def disconnect(self):
+        self.connected = False
+        self._subscription.dispose()
+        await self.connection.close_async()
+
+    async def move_absolute(self, length: float, speed: float, timeout: float = None) -> tuple:
+        """Move to a chamber length [mm] at a stretching speed [mm/s]
+
+        Returns:
+            (int, int): final positions of device1 and device2 [data]
+        """
+        position = self.ZERO_POSITION - mm_to_data((length - 12) / 2)
+        await self._broadcast(CommandCode.SET_TARGET_SPEED, mms_to_data(speed / 2))
+        return await self._motion_command(CommandCode.MOVE_ABSOLUTE, position, timeout)
+
+    async def move_relative(self, length: float, speed: float, timeout: float = None) -> tuple:
+        """Stretch by `length` [mm] at a stretching speed [mm/s]"""
+        await self._broadcast(CommandCode.SET_TARGET_SPEED, mms_to_data(speed / 2))
+        return await self._motion_command(CommandCode.MOVE_RELATIVE, mm_to_data(-length / 2), timeout)
+
+    async def home(self, timeout: float = None) -> tuple:
+        return await self._motion_command(CommandCode.HOME, 0, timeout)
+
+    async def stop(self) -> tuple:
+        """Stop both axes; a running move_* call resolves with the stop positions"""
+        return await self._motion_command(CommandCode.STOP, 0, None, interrupt=False)
+
+    async def get_positions(self) -> tuple:
+        self._require_connection()
+        replies = await asyncio.gather(
+            self.device1.generic_command_async(CommandCode.RETURN_CURRENT_POSITION),
+            self.device2.generic_command_async(CommandCode.RETURN_CURRENT_POSITION))
+        return replies[0].data, replies[1].data
+
+    async def _broadcast(self, command: CommandCode, data: int = 0) -> None:
+        self._require_connection()
+        await self.connection.generic_command_no_response_async(self.ALL_DEVICES, command, data)
+
+    async def _motion_command(self, command, data, timeout, interrupt=True):
+        self._require_connection()
+        # A stop ends the running move too, so that move accepts its reply
+        reply_codes = {command.value, CommandCode.STOP.value}
+        pending = _PendingReplies(self._loop, self._addresses, reply_codes)
+        if interrupt and self._motion is not None and not self._motion.future.done():
+            self._motion.future.set_exception(MoveInterrupted(f"Replaced by {command.name}"))
+        if interrupt:
+            self._motion = pending
+        self._awaiting.append(pending)
+        try:
+            await self._broadcast(command, data)
+            replies = await asyncio.wait_for(asyncio.shield(pending.future), timeout)
+        finally:
+            self._awaiting.remove(pending)
+        return replies[self._addresses[0]], replies[self._addresses[1]]
+
+    def _require_connection(self):
+        if not self.connected:
+            raise ConnectionError("Motors must be connected first.")
+
+    def _dispatch(self, event) -> None:
+        for pending in list(self._awaiting):
+            pending.feed(event)
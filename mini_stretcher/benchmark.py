@@ -0,0 +1,188 @@
+import platform
+import statistics
+import subprocess
+import time
+
+import numpy as np
+from zaber_motion.binary import CommandCode
+
+from mini_stretcher.position_sampler import PositionSampler
+from mini_stretcher.units import mm_to_data, mms_to_data
+
+
+def latency_stats(durations_s) -> dict:
+    """Summary of a list of durations, in milliseconds"""
+    ms = sorted(d * 1000 for d in durations_s)
+    return {
+        "n": len(ms),
+        "mean_ms": statistics.fmean(ms),
+        "median_ms": statistics.median(ms),
+        "p95_ms": ms[int(0.95 * (len(ms) - 1))],
+        "max_ms": ms[-1],
+    }
+
+
+def bench_settings_roundtrip(motors, n: int = 50) -> dict:
+    """Round-trip time of settings.get/set on one axis"""
+    device = motors.device1
+    get_times, set_times = [], []
+    speed = device.generic_command(CommandCode.RETURN_SETTING, CommandCode.SET_TARGET_SPEED.value).data
+    for _ in range(n):
+        t = time.perf_counter()
+        device.generic_command(CommandCode.RETURN_CURRENT_POSITION)
+        get_times.append(time.perf_counter() - t)
+        t = time.perf_counter()
+        device.generic_command(CommandCode.SET_TARGET_SPEED, speed)
+        set_times.append(time.perf_counter() - t)
+    return {"get": latency_stats(get_times), "set": latency_stats(set_times)}
+
+
+def bench_issue_skew(motors, distance_mm: float = 0.4, speed: float = 1, n: int = 3) -> dict:
+    """Start skew between the axes, per-device commands vs one broadcast
+
+    Both axes ramp the same distance at the same speed; during the constant
+    velocity phase their position difference divided by the velocity is
+    how far one axis started ahead of the other. Reply timing can't be
+    used for this because replies queue up behind each other on the link.
+    The stages first move to ZERO_POSITION, and every move is measured
+    from the positions read right before it.
+    """
+    step = mm_to_data(distance_mm / 2)
+    velocity = mm_to_data(speed / 2)  # [data/s]
+    motors.move_to(motors.ZERO_POSITION, mms_to_data(speed / 2))
+    _wait_still(motors)
+
+    def per_device(position):
+        motors.device1.generic_command_no_response(CommandCode.MOVE_ABSOLUTE, position)
+        motors.device2.generic_command_no_response(CommandCode.MOVE_ABSOLUTE, position)
+
+    def broadcast(position):
+        motors.broadcast(CommandCode.MOVE_ABSOLUTE, position)
+
+    result = {}
+    for name, send in (("per_device", per_device), ("broadcast", broadcast)):
+        skews = []
+        for i in range(2 * n):
+            end = motors.ZERO_POSITION - (step if i % 2 == 0 else 0)
+            start1, start2 = motors.get_positions()
+            sampler = PositionSampler(motors, rate=0)
+            sampler.start()
+            send(end)
+            time.sleep(distance_mm / speed)
+            sampler.stop()
+            sampler.join()
+            _wait_still(motors)
+            _, pos1, pos2, _ = sampler.buffer.read_since(0)
+            moved1, moved2 = pos1 - start1, pos2 - start2
+            progress = (moved1 + moved2) / (2 * end - start1 - start2)
+            cruising = (progress > 0.2) & (progress < 0.8)
+            if cruising.any():
+                # Positive: device1 ahead of device2
+                direction = 1 if 2 * end > start1 + start2 else -1
+                skews.append(float(np.median(moved1[cruising] - moved2[cruising])) * direction / velocity)
+        result[name] = {
+            "n": len(skews),
+            "mean_ms": statistics.fmean(skews) * 1000 if skews else None,
+            "max_abs_ms": max(abs(s) for s in skews) * 1000 if skews else None,
+        }
+    return result
+
+
+def bench_sample_rate(motors, duration: float = 2.0) -> dict:
+    """Highest position sample rate the link sustains"""
+    sampler = PositionSampler(motors, rate=0)
+    sampler.start()
+    time.sleep(duration)
+    sampler.stop()
+    sampler.join()
+    count = sampler.buffer.count
+    t_ns, _, _, _ = sampler.buffer.read_since(0)
+    intervals = np.diff(t_ns) / 1e9
+    return {
+        "samples": count,
+        "rate_hz": count / duration,
+        "interval": latency_stats(intervals) if len(intervals) else None,
+    }
+
+
+def bench_strain_rate(motors, l0: float = 12, target_length: float = 12.6, speed: float = 0.1,
+                      rate: float = 50) -> dict:
+    """Commanded vs achieved stretching speed over a ramp
+
+    The achieved speed is the slope of a linear fit to the middle half of
+    the ramp, so acceleration phases are left out.
+    """
+    motors.move_absolute_distance(l0, 5)
+    _wait_still(motors)
+    sampler = PositionSampler(motors, rate=rate)
+    sampler.start()
+    motors.move_absolute_distance(target_length, speed)
+    time.sleep(abs(target_length - l0) / speed)
+    _wait_still(motors)
+    sampler.stop()
+    sampler.join()
+
+    t_ns, pos1, pos2, _ = sampler.buffer.read_since(0)
+    length = motors.length_from_positions(pos1, pos2)
+    t = (t_ns - t_ns[0]) / 1e9
+    progress = (length - l0) / (target_length - l0)
+    ramp = (progress > 0.25) & (progress < 0.75)
+    achieved = float(np.polyfit(t[ramp], length[ramp], 1)[0]) if ramp.sum() > 2 else float("nan")
+    return {
+        "commanded_mm_s": speed,
+        "achieved_mm_s": achieved,
+        "commanded_strain_rate": speed / l0 * 100,
+        "achieved_strain_rate": achieved / l0 * 100,
+        "relative_error": (achieved - speed) / speed,
+    }
+
+
+def _wait_still(motors, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    last = None
+    while time.monotonic() < deadline:
+        positions = motors.get_positions()
+        if positions == last:
+            return
+        last = positions
+        time.sleep(0.1)
+
+
+def run_all(motors, target: str) -> dict:
+    """Run every benchmark and return a JSON-serializable report"""
+    return {
+        "meta": {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "target": target,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "commit": _git_commit(),
+        },
+        "settings_roundtrip": bench_settings_roundtrip(motors),
+        "issue_skew": bench_issue_skew(motors),
+        "sample_rate": bench_sample_rate(motors),
+        "strain_rate": bench_strain_rate(motors),
+    }
+
+
+def compare(old: dict, new: dict, prefix: str = "") -> list:
+    """Flatten two reports and list (key, old, new, relative change)"""
+    rows = []
+    for key, value in new.items():
+        if key == "meta":
+            continue
+        name = f"{prefix}{key}"
+        before = old.get(key) if isinstance(old, dict) else None
+        if isinstance(value, dict):
+            rows += compare(before or {}, value, name + ".")
+        elif isinstance(value, (int, float)) and isinstance(before, (int, float)) and before:
+            rows.append((name, before, value, (value - before) / abs(before)))
+    return rows
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
@@ -9,7 +9,12 @@ class ColorLED(ttk.Frame):
         
         self.led = ttk.Canvas(self, height=self.diameter, width=self.diameter)
         self.led.pack()
+        # One oval for the LED's lifetime; set_color only recolours it
+        self.color = None
+        self.oval = self.led.create_oval(0, 0, self.diameter, self.diameter)
         self.set_color()
 
     def set_color(self, color="red"): 
-        self.led.create_oval(0, 0, self.diameter, self.diameter, fill=color)
\ No newline at end of file
+        if color != self.color:
+            self.led.itemconfigure(self.oval, fill=color)
+            self.color = color
@@ -0,0 +1,133 @@
+class ConnectionManager:
+    """Opens serial connections and remembers which devices sit on each port.
+
+    detect_devices() enumerates the whole bus. Devices are not identified
+    against the device database, which may have to be fetched online; Motors
+    only sends raw data commands, so addresses and device IDs are all it
+    needs. Enumerating only has to happen once per port: on a reconnect the
+    cached addresses are checked with one device ID query per axis and the
+    devices are reused without another enumeration.
+
+    zaber_motion loads a native library on import, which takes about half a
+    second, so it is only imported when the first port is opened.
+    """
+
+    def __init__(self, device_db: str = None):
+        """
+        Args:
+            device_db (str): directory of the device DB store, enabled on the
+                first open(), for code that identifies devices itself (unit
+                conversions, device.settings); by default the library's own
+                setting is kept
+        """
+        self.device_db = device_db
+        self._known = {}  # port -> [(device_address, device_id), ...]
+        self._library_ready = False
+
+    def open(self, port: str):
+        """Open a port and return the connection and its devices
+
+        Args:
+            port (str): serial port, e.g. "COM3", or "tcp://host:port"
+                for a TCP device such as mini_stretcher.simulator
+
+        Returns:
+            (Connection, list[Device])
+        """
+        Connection = self._load_library()
+        if port.startswith("tcp://"):
+            host, tcp_port = port[len("tcp://"):].rsplit(":", 1)
+            connection = Connection.open_tcp(host, int(tcp_port))
+        else:
+            connection = Connection.open_serial_port(port)
+        try:
+            devices = self._reuse(port, connection)
+            if devices is None:
+                devices = self._detect(port, connection)
+        except Exception as e:
+            connection.close()
+            raise e
+        return connection, devices
+
+    async def open_async(self, port: str):
+        """asyncio version of open()"""
+        Connection = self._load_library()
+        if port.startswith("tcp://"):
+            host, tcp_port = port[len("tcp://"):].rsplit(":", 1)
+            connection = await Connection.open_tcp_async(host, int(tcp_port))
+        else:
+            connection = await Connection.open_serial_port_async(port)
+        try:
+            devices = await self._reuse_async(port, connection)
+            if devices is None:
+                devices = await self._detect_async(port, connection)
+        except Exception as e:
+            await connection.close_async()
+            raise e
+        return connection, devices
+
+    def _load_library(self):
+        from zaber_motion.binary import Connection
+        if not self._library_ready:
+            if self.device_db is not None:
+                from zaber_motion import Library
+                Library.enable_device_db_store(self.device_db)
+            self._library_ready = True
+        return Connection
+
+    def forget(self, port: str) -> None:
+        """Drop the cached devices of a port, e.g. after swapping a stage"""
+        self._known.pop(port, None)
+
+    def _detect(self, port, connection):
+        from zaber_motion.binary import CommandCode
+        devices = connection.detect_devices(identify_devices=False)
+        self._known[port] = [
+            (d.device_address, connection.generic_command(d.device_address, CommandCode.RETURN_DEVICE_ID).data)
+            for d in devices
+        ]
+        return devices
+
+    async def _detect_async(self, port, connection):
+        from zaber_motion.binary import CommandCode
+        devices = await connection.detect_devices_async(identify_devices=False)
+        known = []
+        for d in devices:
+            reply = await connection.generic_command_async(d.device_address, CommandCode.RETURN_DEVICE_ID)
+            known.append((d.device_address, reply.data))
+        self._known[port] = known
+        return devices
+
+    def _reuse(self, port, connection):
+        from zaber_motion.binary import CommandCode
+        known = self._known.get(port)
+        if not known:
+            return None
+        devices = []
+        for address, device_id in known:
+            try:
+                reply = connection.generic_command(address, CommandCode.RETURN_DEVICE_ID)
+            except Exception:
+                self.forget(port)
+                return None
+            if reply.data != device_id:
+                self.forget(port)
+                return None
+            devices.append(connection.get_device(address))
+        return devices
+
+    async def _reuse_async(self, port, connection):
+        from zaber_motion.binary import CommandCode
+        known = self._known.get(port)
+        if not known:
+            return None
+        for address, device_id in known:
+            try:
+                reply = await connection.generic_command_async(address, CommandCode.RETURN_DEVICE_ID)
+            except Exception:
+                self.forget(port)
+                return None
+            if reply.data != device_id:
+                self.forget(port)
+                return None
+        return [connection.get_device(address) for address, _ in known]
@@ -0,0 +1,161 @@
+import threading
+import time
+from dataclasses import dataclass
+
+from zaber_motion.binary import CommandCode
+
+from mini_stretcher.replies import ReplyCollector
+from mini_stretcher.units import mm_to_data
+
+
+@dataclass
+class CycleTiming:
+    cycle: int
+    start_ns: int    # stretch command sent
+    peak_ns: int     # both axes reached the end position
+    end_ns: int      # both axes back at zero
+
+    @property
+    def stretch_s(self) -> float:
+        return (self.peak_ns - self.start_ns) / 1e9
+
+    @property
+    def release_s(self) -> float:
+        return (self.end_ns - self.peak_ns) / 1e9
+
+    @property
+    def period_s(self) -> float:
+        return (self.end_ns - self.start_ns) / 1e9
+
+
+class CycleEngine:
+    """Cyclic loading between two positions, driven by move completion.
+
+    Each half cycle is a single broadcast MOVE_ABSOLUTE followed by a wait
+    for both completion replies. If a reply does not arrive in time the
+    engine falls back to is_busy() polling with exponential back-off, so
+    a lost packet costs a few queries instead of a busy loop.
+
+    Given the Motors, every half cycle is sent through Motors.move_to(), so
+    the tracker state, the move listeners (PositionEstimator) and the
+    SyncMonitor's moving statistics follow the cycles.
+    """
+
+    def __init__(self, connection, devices, poll_min: float = 0.005, poll_max: float = 0.5,
+                 cancel: threading.Event = None, motors=None):
+        """
+        Args:
+            connection (Connection): open binary connection
+            devices (list[Device]): the two stretcher axes
+            poll_min (float): first back-off polling interval [s]
+            poll_max (float): longest back-off polling interval [s]
+            cancel (threading.Event): ends the cycles when set, e.g.
+                MotionWorker.scheduler().cancel, so cancelling the worker
+                also ends a hold; cancel() sets it too
+            motors (Motors): send the moves through these instead of the bare connection
+        """
+        self.connection = connection
+        self.devices = devices
+        self.motors = motors
+        self.poll_min = poll_min
+        self.poll_max = poll_max
+        self.timings = []
+        self._own_cancel = cancel is None
+        self._cancelled = threading.Event() if cancel is None else cancel
+        self._waiter = None
+
+    def run(self, cycles: int, position: int, zero_position: int, move_time: float,
+            on_cycle=None, hold: float = 0) -> list:
+        """Cycle between zero_position and position
+
+        Args:
+            cycles (int): number of cycles [n]
+            position (int): end position [data]
+            zero_position (int): start/return position [data]
+            move_time (float): expected duration of one half cycle [s]
+            on_cycle (callable): called with each CycleTiming
+            hold (float): time to stay at the end position each cycle [s]
+
+        Returns:
+            list[CycleTiming]
+        """
+        if self._own_cancel:
+            self._cancelled.clear()
+        self.timings = []
+        timeout = 2 * move_time + 1
+        waiter = ReplyCollector(self.connection, [d.device_address for d in self.devices])
+        self._waiter = waiter
+        try:
+            for cycle in range(cycles):
+                start_ns = time.monotonic_ns()
+                self._move(waiter, position, timeout)
+                peak_ns = time.monotonic_ns()
+                if hold and self._cancelled.wait(hold):
+                    raise InterruptedError("Cycling cancelled")
+                self._move(waiter, zero_position, timeout)
+                timing = CycleTiming(cycle + 1, start_ns, peak_ns, time.monotonic_ns())
+                self.timings.append(timing)
+                if on_cycle is not None:
+                    on_cycle(timing)
+        finally:
+            self._waiter = None
+            waiter.close()
+        return self.timings
+
+    def cancel(self) -> None:
+        """Abort the running cycles; stopping the motors is up to the caller"""
+        self._cancelled.set()
+        if self._waiter is not None:
+            self._waiter.release()
+
+    def _move(self, waiter, position, timeout):
+        if self._cancelled.is_set():
+            raise InterruptedError("Cycling cancelled")
+        waiter.arm(CommandCode.MOVE_ABSOLUTE, stop_ends=True)
+        if self.motors is not None:
+            self.motors.move_to(position)
+        else:
+            self.connection.generic_command_no_response(0, CommandCode.MOVE_ABSOLUTE, position)
+        if not waiter.wait(timeout):
+            self._wait_idle()
+        if self._cancelled.is_set() or waiter.stopped:
+            raise InterruptedError("Cycling cancelled")
+        if waiter.error:
+            raise RuntimeError(waiter.error)
+
+    def _wait_idle(self):
+        interval = self.poll_min
+        while any(d.is_busy() for d in self.devices):
+            if self._cancelled.wait(interval):
+                raise InterruptedError("Cycling cancelled")
+            interval = min(2 * interval, self.poll_max)
+
+
+def cycle_lengths(motors, l0: float, target_length: float, speed: float, cycles: int, on_cycle=None,
+                  hold: float = 0, cancel: threading.Event = None) -> list:
+    """Cycle a connected Motors pair between L0 and the target length [mm] at `speed` [mm/s]
+
+    Args:
+        cancel (threading.Event): see CycleEngine
+
+    Returns:
+        list: CycleTiming of every completed cycle
+    """
+    zero = motors.ZERO_POSITION - mm_to_data((l0 - 12) / 2)
+    peak = motors.ZERO_POSITION - mm_to_data((target_length - 12) / 2)
+    motors.set_speed(speed)
+    engine = CycleEngine(motors.connection, (motors.device1, motors.device2), cancel=cancel, motors=motors)
+    return engine.run(cycles, peak, zero, abs(target_length - l0) / speed, on_cycle=on_cycle, hold=hold)
+
+
+def summarize(timings) -> dict:
+    """Mean/min/max period of a list of CycleTiming [s]"""
+    periods = [t.period_s for t in timings]
+    if not periods:
+        return {"cycles": 0}
+    return {
+        "cycles": len(periods),
+        "mean_period": sum(periods) / len(periods),
+        "min_period": min(periods),
+        "max_period": max(periods),
+    }
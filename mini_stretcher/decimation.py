@@ -0,0 +1,81 @@
+import numpy as np
+
+
+class MinMaxDecimator:
+    """Keeps the min and max of a growing time series in at most `width` time bins.
+
+    Samples are folded into their bin as they arrive. When the series
+    outgrows `width` bins the bin duration doubles and neighbouring bins are
+    merged, so memory and the number of points to draw stay at 2 · width no
+    matter how long the run is, while every spike still shows up as the
+    min or max of its bin.
+    """
+
+    def __init__(self, width: int = 800, bin_s: float = 0.02):
+        """
+        Args:
+            width (int): number of bins, about the plot width in pixels
+            bin_s (float): initial bin duration [s]
+        """
+        self.width = width
+        self.bin_ns = round(bin_s * 1e9)
+        self.t0_ns = None
+        self.count = 0  # samples folded in
+        self.min_t = np.zeros(width, dtype=np.int64)
+        self.min_y = np.full(width, np.inf)
+        self.max_t = np.zeros(width, dtype=np.int64)
+        self.max_y = np.full(width, -np.inf)
+
+    def extend(self, t_ns, y) -> None:
+        """Fold in samples in time order"""
+        t_ns = np.asarray(t_ns, dtype=np.int64)
+        y = np.asarray(y, dtype=float)
+        if not len(t_ns):
+            return
+        if self.t0_ns is None:
+            self.t0_ns = int(t_ns[0])
+        while (int(t_ns[-1]) - self.t0_ns) // self.bin_ns >= self.width:
+            self._merge()
+        bins = (t_ns - self.t0_ns) // self.bin_ns
+        starts = np.flatnonzero(np.r_[True, bins[1:] != bins[:-1]])
+        for start, end in zip(starts, np.r_[starts[1:], len(bins)]):
+            b = bins[start]
+            i = start + int(y[start:end].argmin())
+            if y[i] < self.min_y[b]:
+                self.min_t[b], self.min_y[b] = t_ns[i], y[i]
+            i = start + int(y[start:end].argmax())
+            if y[i] > self.max_y[b]:
+                self.max_t[b], self.max_y[b] = t_ns[i], y[i]
+        self.count += len(t_ns)
+
+    def points(self) -> tuple:
+        """(t_ns, y) of every bin's min and max in time order, at most 2 · width points"""
+        filled = np.isfinite(self.min_y)
+        min_first = self.min_t[filled] <= self.max_t[filled]
+        t = np.where(min_first, self.min_t[filled], self.max_t[filled])
+        t = np.column_stack((t, np.where(min_first, self.max_t[filled], self.min_t[filled]))).ravel()
+        y = np.where(min_first, self.min_y[filled], self.max_y[filled])
+        y = np.column_stack((y, np.where(min_first, self.max_y[filled], self.min_y[filled]))).ravel()
+        return t, y
+
+    def limits(self) -> tuple:
+        """(min, max) of everything folded in, None before the first sample"""
+        if not self.count:
+            return None
+        return float(self.min_y.min()), float(self.max_y.max())
+
+    def _merge(self):
+        # Pair bins 2i and 2i + 1 into bin i of twice the duration
+        half = self.width // 2
+        pairs = slice(0, 2 * half)
+        for t, y, pick in ((self.min_t, self.min_y, np.argmin), (self.max_t, self.max_y, np.argmax)):
+            y_pairs = y[pairs].reshape(half, 2)
+            choice = pick(y_pairs, axis=1)
+            merged_t = t[pairs].reshape(half, 2)[np.arange(half), choice]
+            merged_y = y_pairs[np.arange(half), choice]
+            fill = np.inf if pick is np.argmin else -np.inf
+            # An odd last bin lands in bin `half` on its own
+            t[half], y[half] = (t[2 * half], y[2 * half]) if self.width % 2 else (0, fill)
+            t[:half], y[:half] = merged_t, merged_y
+            t[half + 1:], y[half + 1:] = 0, fill
+        self.bin_ns *= 2
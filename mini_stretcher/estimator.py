@@ -0,0 +1,179 @@
+import math
+import threading
+import time
+
+from mini_stretcher import units
+
+
+class AxisProfile:
+    """Trapezoidal motion of one axis from a known state towards a target.
+
+    Phases are (start time [s], position [data], velocity [data/s],
+    acceleration [data/s²]) and are evaluated analytically, so a position
+    costs a few multiplications instead of a serial round-trip.
+    """
+
+    def __init__(self, t0_ns: int, position: float, velocity: float = 0.0, target: float = None,
+                 speed: float = None, acceleration: float = None, previous=None):
+        self.t0_ns = t0_ns
+        self.target = target
+        self.previous = previous  # motion before t0_ns, for a move that has not reached the device yet
+        self.phases = [(0.0, float(position), float(velocity), 0.0)]
+        if target is not None and speed and acceleration:
+            self.phases = self._plan(float(position), float(velocity), float(target), speed, acceleration)
+
+    def state(self, t_ns: int) -> tuple:
+        """(position [data], velocity [data/s]) at t_ns"""
+        t = (t_ns - self.t0_ns) / 1e9
+        if t < 0 and self.previous is not None:
+            return self.previous.state(t_ns)
+        for start, position, velocity, acceleration in reversed(self.phases):
+            if t >= start:
+                dt = t - start
+                return position + velocity * dt + 0.5 * acceleration * dt * dt, velocity + acceleration * dt
+        return self.phases[0][1], self.phases[0][2]
+
+    @staticmethod
+    def _plan(p0, v0, target, v_max, a):
+        phases = []
+        t = 0.0
+        for _ in range(3):  # at most: brake a reversal, overshoot, then the actual move
+            distance = target - p0
+            direction = 1 if distance >= 0 else -1
+            u0 = v0 * direction  # speed towards the target
+            if u0 < 0 or u0 * u0 / (2 * a) > abs(distance) + 1:
+                # Moving away or too fast to stop in time: brake to a stand-still first
+                t_brake = abs(v0) / a
+                accel = -a if v0 > 0 else a
+                phases.append((t, p0, v0, accel))
+                p0 += v0 * t_brake / 2
+                v0 = 0.0
+                t += t_brake
+                continue
+            d = abs(distance)
+            peak = min(v_max, math.sqrt(a * d + u0 * u0 / 2))
+            peak = max(peak, u0) if u0 <= v_max else v_max
+            a1 = a if peak >= u0 else -a
+            t1 = (peak - u0) / a1
+            d1 = (peak * peak - u0 * u0) / (2 * a1)
+            d3 = peak * peak / (2 * a)
+            d2 = max(d - d1 - d3, 0.0)
+            t2 = d2 / peak if peak else 0.0
+            t3 = peak / a
+            phases.append((t, p0, v0, a1 * direction))
+            p1 = p0 + direction * d1
+            phases.append((t + t1, p1, peak * direction, 0.0))
+            phases.append((t + t1 + t2, p1 + direction * d2, peak * direction, -a * direction))
+            phases.append((t + t1 + t2 + t3, target, 0.0, 0.0))
+            return phases
+        phases.append((t, p0, 0.0, 0.0))
+        return phases
+
+
+class PositionEstimator:
+    """Predicts both axis positions from the issued moves, corrected by sparse reads.
+
+    Every motion command sent through Motors (see Motors.move_listeners)
+    starts a new AxisProfile from the current estimate; completion replies
+    pin the axes to their reported final positions. Reads fed to correct(),
+    e.g. from a slow PositionSampler, re-anchor the profiles so errors in
+    the model do not accumulate. position() then costs no serial traffic.
+
+    CycleEngine and TrajectoryStreamer moves are followed when they are
+    given the Motors; moves sent around Motors are only picked up by the
+    corrections.
+    """
+
+    def __init__(self, motors, acceleration: float = None, correction_interval: float = 0.5,
+                 command_delay: float = 0.0125):
+        """
+        Args:
+            motors (Motors): connected motors whose commands are followed
+            acceleration (float): [data/s²]; read from the devices by default
+            correction_interval (float): use at most one read per interval [s]
+            command_delay (float): from sending a move until the devices start
+                it [s]; the speed and move packets take 12.5 ms at 9600 baud
+        """
+        self.motors = motors
+        self.command_delay_ns = round(command_delay * 1e9)
+        self.correction_interval = correction_interval
+        self.acceleration = acceleration
+        self.errors = []  # (t_ns, error1, error2) [data] of every applied correction
+        self._lock = threading.Lock()
+        self._speed = None
+        self._last_correction_ns = 0
+        self._profiles = None  # seeded by the first correct()
+        motors.move_listeners.append(self._on_move)
+
+    def close(self) -> None:
+        self.motors.move_listeners.remove(self._on_move)
+
+    def position(self, t_ns: int = None) -> tuple:
+        """Estimated (pos1, pos2) [data] at t_ns, by default now; None before the first read"""
+        t_ns = time.monotonic_ns() if t_ns is None else t_ns
+        with self._lock:
+            if self._profiles is None:
+                return None
+            profiles = tuple(self._profiles)
+        return tuple(round(profile.state(t_ns)[0]) for profile in profiles)
+
+    def length(self, t_ns: int = None) -> float:
+        """Estimated chamber length [mm]; None before the first read"""
+        position = self.position(t_ns)
+        return None if position is None else self.motors.length_from_positions(*position)
+
+    def correct(self, t_ns: int, pos1: int, pos2: int) -> None:
+        """Re-anchor on a real read; signature matches PositionSampler.listeners"""
+        if self._profiles is None:
+            if self.acceleration is None:
+                self.acceleration = self._read_acceleration()
+            with self._lock:
+                self._profiles = [AxisProfile(t_ns, pos1), AxisProfile(t_ns, pos2)]
+            self._last_correction_ns = t_ns
+            return
+        if t_ns - self._last_correction_ns < self.correction_interval * 1e9:
+            return
+        self._last_correction_ns = t_ns
+        with self._lock:
+            errors = []
+            for i, measured in enumerate((pos1, pos2)):
+                profile = self._profiles[i]
+                predicted, velocity = profile.state(t_ns)
+                errors.append(measured - predicted)
+                self._profiles[i] = AxisProfile(t_ns, measured, velocity, profile.target, self._speed,
+                                                self.acceleration)
+        self.errors.append((t_ns, *errors))
+
+    def _on_move(self, t_ns, handle):
+        t_ns += self.command_delay_ns
+        with self._lock:
+            if self._profiles is None:
+                return
+            if handle.speed is not None:
+                self._speed = handle.speed
+            for i, profile in enumerate(self._profiles):
+                position, velocity = profile.state(t_ns)
+                if handle.kind == "stop":
+                    target = position + math.copysign(velocity * velocity / (2 * self.acceleration), velocity)
+                elif handle.kind == "move_relative":
+                    target = position + handle.target
+                else:
+                    target = handle.target
+                profile.previous = None  # keep only one step of history
+                self._profiles[i] = AxisProfile(t_ns, position, velocity, target, self._speed or abs(velocity),
+                                                self.acceleration, previous=profile)
+        handle.add_done_callback(self._on_done)
+
+    def _on_done(self, handle):
+        if handle.cancelled() or handle.exception() is not None:
+            return
+        now = time.monotonic_ns()
+        with self._lock:
+            if self._profiles is None:
+                return
+            self._profiles = [AxisProfile(now, position) for position in handle.result()]
+
+    def _read_acceleration(self):
+        from zaber_motion.binary import CommandCode
+        setting = self.motors.query_pair(CommandCode.RETURN_SETTING, CommandCode.SET_ACCELERATION.value)[0]
+        return setting * units.acceleration_unit()
@@ -0,0 +1,160 @@
+"""Unattended batches of protocols, loaded from a JSON or YAML file.
+
+    [
+        {"name": "ramp 20%", "l0": 12, "target_length": 14.4, "speed": 0.03, "pause": 60},
+        {"name": "fatigue", "l0": 12, "target_length": 13, "speed": 1, "cycles": 500, "hold": 0.5}
+    ]
+
+Entries run one after the other on a Rig. The stage returns to L0 before
+and after every entry, each entry gets its own recording, and one result
+line per entry is appended to `<queue file>.results.jsonl`. Entries marked
+done there are skipped when the queue is run again, so a batch interrupted
+overnight picks up where it stopped.
+"""
+import json
+import os
+import time
+from dataclasses import asdict, dataclass, fields
+
+from mini_stretcher.cycle_engine import cycle_lengths, summarize
+from mini_stretcher.motion_worker import CommandCancelled
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+
+@dataclass
+class Experiment:
+    l0: float               # [mm]
+    target_length: float    # [mm]
+    speed: float            # [mm/s]
+    name: str = ""
+    pause: float = 0        # before the stretch [s]
+    cycles: int = 0         # 0: single stretch
+    hold: float = 0         # at the target length; per cycle when cycling [s]
+    rest: float = 0         # at L0 after the entry [s]
+    return_speed: float = 5  # for moves back to L0 [mm/s]
+
+    def move_timeout(self, speed: float) -> float:
+        return 2 * abs(self.target_length - self.l0) / speed + 10
+
+
+def load_queue(path: str) -> list:
+    """Read a list of Experiments from a .json, .yaml or .yml file"""
+    with open(path) as f:
+        if path.endswith((".yaml", ".yml")):
+            if yaml is None:
+                raise ImportError("Reading YAML queues requires PyYAML (pip install pyyaml).")
+            entries = yaml.safe_load(f)
+        else:
+            entries = json.load(f)
+    known = {field.name for field in fields(Experiment)}
+    experiments = []
+    for i, entry in enumerate(entries):
+        unknown = set(entry) - known
+        if unknown:
+            raise ValueError(f"Queue entry {i}: unknown keys {sorted(unknown)}")
+        experiment = Experiment(**entry)
+        experiment.name = experiment.name or f"entry {i + 1}"
+        experiments.append(experiment)
+    return experiments
+
+
+class ExperimentQueue:
+    """Runs a list of Experiments back-to-back on one rig"""
+
+    def __init__(self, path: str, results_path: str = None):
+        """
+        Args:
+            path (str): queue file (.json, .yaml or .yml)
+            results_path (str): result log; defaults to <path>.results.jsonl
+        """
+        self.path = path
+        self.results_path = results_path or os.path.splitext(path)[0] + ".results.jsonl"
+        self.experiments = load_queue(path)
+
+    def completed(self) -> set:
+        """Indices of entries that already finished according to the result log"""
+        done = set()
+        if os.path.exists(self.results_path):
+            with open(self.results_path) as f:
+                for line in f:
+                    result = json.loads(line)
+                    if result["status"] == "done":
+                        done.add(result["index"])
+        return done
+
+    def run(self, rig, resume: bool = True) -> list:
+        """Run every entry; meant to be submitted as a Rig protocol
+
+            rig.submit(queue.run)
+
+        An entry that fails is logged and the queue moves on to the next one;
+        a STOP ends the whole queue.
+
+        Returns:
+            list[dict]: result of each entry run
+        """
+        skip = self.completed() if resume else set()
+        results = []
+        for index, experiment in enumerate(self.experiments):
+            if index in skip:
+                rig.log_message(f"Skipping {experiment.name}, already done")
+                continue
+            rig.log_message(f"Queue {index + 1}/{len(self.experiments)}: {experiment.name}")
+            result = {"index": index, "name": experiment.name, "started": time.strftime("%Y-%m-%dT%H:%M:%S")}
+            try:
+                result.update(self._run_one(rig, experiment))
+                result["status"] = "done"
+            except (CommandCancelled, InterruptedError):
+                result["status"] = "stopped"
+                self._log(result)
+                results.append(result)
+                raise
+            except Exception as e:
+                result.update(status="error", error=str(e))
+                rig.log_message(f"{experiment.name} failed: {e}")
+                rig.stop_recording()
+                try:
+                    rig.move_and_wait(experiment.l0, experiment.return_speed,
+                                      experiment.move_timeout(experiment.return_speed))
+                except Exception as e:
+                    rig.log_message(f"Return to L0 failed: {e}")
+            finally:
+                result["finished"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+            self._log(result)
+            results.append(result)
+        return results
+
+    def _run_one(self, rig, experiment: Experiment) -> dict:
+        rig.move_and_wait(experiment.l0, experiment.return_speed,
+                          experiment.move_timeout(experiment.return_speed))
+        recording = rig.start_recording(experiment.l0, dict(asdict(experiment), queue=self.path))
+        result = {"recording": recording}
+        try:
+            # Each pause follows a move of unknown length, so it gets its own deadline
+            rig.worker.scheduler().wait(experiment.pause, "pause")
+            if experiment.cycles:
+                result["cycles"] = summarize(self._cycle(rig, experiment))
+            else:
+                rig.move_and_wait(experiment.target_length, experiment.speed,
+                                  experiment.move_timeout(experiment.speed))
+                rig.worker.scheduler().wait(experiment.hold, "hold")
+            rig.move_and_wait(experiment.l0, experiment.return_speed,
+                              experiment.move_timeout(experiment.return_speed))
+        finally:
+            rig.stop_recording()
+        rig.worker.scheduler().wait(experiment.rest, "rest")
+        return result
+
+    @staticmethod
+    def _cycle(rig, experiment: Experiment) -> list:
+        return cycle_lengths(rig.motors, experiment.l0, experiment.target_length, experiment.speed,
+                             experiment.cycles, on_cycle=rig.mark_cycle, hold=experiment.hold,
+                             cancel=rig.worker.scheduler().cancel)
+
+    def _log(self, result: dict) -> None:
+        with open(self.results_path, "a") as f:
+            f.write(json.dumps(result) + "\n")
@@ -0,0 +1,94 @@
+import numpy as np
+import ttkbootstrap as ttk
+
+from mini_stretcher.decimation import MinMaxDecimator
+
+
+class LivePlot(ttk.Frame):
+    """Length (or strain, once l0 is set) over time, drawn from a sampler's RingBuffer.
+
+    Every refresh only reads the samples added since the last one and folds
+    them into a MinMaxDecimator with one bin per pixel, so a 10 h run costs
+    the same to draw as a 10 s one. The curve is a single canvas line whose
+    coordinates are replaced; the axis labels are only touched when the
+    range changes.
+    """
+
+    REFRESH_INTERVAL = 200  # [ms]
+    MARGIN = 45  # [px] left of the plot area, for the axis labels
+
+    def __init__(self, master, buffer, length_from_positions, width: int = 480, height: int = 160):
+        """
+        Args:
+            buffer (RingBuffer): e.g. PositionSampler.buffer
+            length_from_positions (callable): (pos1, pos2) -> length [mm], must accept arrays
+        """
+        super().__init__(master)
+        self.buffer = buffer
+        self.length_from_positions = length_from_positions
+        self.width = width
+        self.height = height
+        self.l0 = None
+
+        colors = ttk.Style().colors
+        self.canvas = ttk.Canvas(self, width=width, height=height, highlightthickness=0, background=colors.bg)
+        self.canvas.pack()
+        self.canvas.create_rectangle(self.MARGIN, 2, width - 2, height - 14, outline=colors.border)
+        self.line = self.canvas.create_line(0, 0, 0, 0, fill=colors.info, state="hidden")
+        self.top_text = self.canvas.create_text(self.MARGIN - 4, 2, anchor="ne", fill=colors.fg,
+                                                font="TkSmallCaptionFont")
+        self.bottom_text = self.canvas.create_text(self.MARGIN - 4, height - 14, anchor="e", fill=colors.fg,
+                                                   font="TkSmallCaptionFont")
+        self.time_text = self.canvas.create_text(width - 2, height, anchor="se", fill=colors.fg,
+                                                 font="TkSmallCaptionFont")
+        self._restart = None
+        self._start(None, buffer.count)
+        self.refresh()
+
+    def reset(self, l0: float = None) -> None:
+        """Start a new curve from now on; with l0 [mm] strain [%] is plotted
+
+        Safe to call from any thread, it takes effect on the next refresh.
+        """
+        self._restart = (l0, self.buffer.count)
+
+    def refresh(self):
+        if self._restart is not None:
+            restart, self._restart = self._restart, None
+            self._start(*restart)
+        t_ns, pos1, pos2, self._read = self.buffer.read_since(self._read)
+        if len(t_ns):
+            y = self.length_from_positions(pos1, pos2)
+            if self.l0:
+                y = (y - self.l0) / self.l0 * 100
+            self.decimator.extend(t_ns, y)
+            self.draw()
+        self.after(self.REFRESH_INTERVAL, self.refresh)
+
+    def _start(self, l0, read):
+        self.l0 = l0
+        self.decimator = MinMaxDecimator(self.width - self.MARGIN - 2)
+        self._read = read
+        self._labels = None
+        self.canvas.itemconfigure(self.line, state="hidden")
+
+    def draw(self):
+        t_ns, y = self.decimator.points()
+        if len(t_ns) < 2:
+            return
+        low, high = self.decimator.limits()
+        if high - low < 1e-3:
+            low, high = low - 5e-4, high + 5e-4
+        duration = max((int(t_ns[-1]) - self.decimator.t0_ns) / 1e9, 1e-3)
+        left, right, top, bottom = self.MARGIN, self.width - 2, 2, self.height - 14
+        x = left + (t_ns - self.decimator.t0_ns) / 1e9 / duration * (right - left)
+        y = bottom - (y - low) / (high - low) * (bottom - top)
+        self.canvas.coords(self.line, *np.column_stack((x, y)).ravel().round(1))
+        self.canvas.itemconfigure(self.line, state="normal")
+
+        unit = "%" if self.l0 else "mm"
+        labels = (f"{high:.3f}", f"{low:.3f} {unit}", f"{duration:.0f} s")
+        if labels != self._labels:
+            for item, text in zip((self.top_text, self.bottom_text, self.time_text), labels):
+                self.canvas.itemconfigure(item, text=text)
+            self._labels = labels
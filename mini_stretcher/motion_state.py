@@ -0,0 +1,147 @@
+import threading
+import time
+from concurrent.futures import Future
+
+from mini_stretcher.replies import ERROR_REPLY, STOP_REPLY
+
+MOVE_REPLIES = (1, 20, 21)  # home, move absolute, move relative
+
+IDLE = "idle"
+MOVING = "moving"
+HOMING = "homing"
+STOPPED = "stopped"
+ERROR = "error"
+
+# RETURN_STATUS reply data -> state
+STATUS_STATES = {0: IDLE, 1: HOMING, 65: IDLE}
+
+
+class MoveInterrupted(Exception):
+    """A move was replaced by another motion command before it finished"""
+
+
+class MoveHandle(Future):
+    """Future of one motion command sent to both axes.
+
+    Resolves with the final (pos1, pos2) [data] once both axes replied. A
+    STOP resolves it too, with `stopped` set; a later motion command that
+    replaces it makes it raise MoveInterrupted.
+    """
+
+    def __init__(self, kind: str, target: int = None, speed: float = None):
+        super().__init__()
+        self.kind = kind          # "home", "move_absolute", "move_relative", "stop"
+        self.target = target      # [data]; absolute position or relative distance
+        self.speed = speed        # [data/s]; None keeps the axes' current target speed
+        self.start_ns = time.monotonic_ns()
+        self.end_ns = None
+        self.stopped = False
+        self.positions = {}       # device address -> reply position
+
+    @property
+    def duration(self) -> float:
+        """[s], None while running"""
+        return None if self.end_ns is None else (self.end_ns - self.start_ns) / 1e9
+
+
+class MotionTracker:
+    """Per-axis motion state, driven by the replies the devices send.
+
+    Each axis is idle, moving, homing, stopped or in error. Motion commands
+    register a MoveHandle right before they are sent; completion, STOP and
+    error replies then update the axis states and resolve the handle.
+    """
+
+    def __init__(self, connection, addresses):
+        self.addresses = tuple(addresses)
+        self.states = {address: IDLE for address in self.addresses}
+        self.listeners = []  # called as listener(states) on the reply thread after every change
+        self._lock = threading.Lock()
+        self._handle = None
+        self._stop_handle = None
+        self._subscription = connection.unknown_response.subscribe(self._on_reply)
+
+    @property
+    def state(self) -> str:
+        """Common state of both axes; "error" or "moving" win if they differ"""
+        states = set(self.states.values())
+        if len(states) == 1:
+            return states.pop()
+        for state in (ERROR, HOMING, MOVING, STOPPED):
+            if state in states:
+                return state
+        return IDLE
+
+    @property
+    def current(self) -> MoveHandle:
+        """Handle of the last motion command, None before the first"""
+        return self._handle
+
+    def set_status(self, address: int, status: int) -> None:
+        """Seed an axis state from a RETURN_STATUS reply"""
+        with self._lock:
+            self.states[address] = STATUS_STATES.get(status, MOVING)
+        self._notify()
+
+    def begin(self, kind: str, target: int = None, speed: float = None) -> MoveHandle:
+        """Register a motion command that is about to be sent"""
+        handle = MoveHandle(kind, target, speed)
+        with self._lock:
+            previous = self._handle
+            if kind == "stop":
+                self._stop_handle = handle
+            else:
+                self._handle = handle
+                for address in self.addresses:
+                    self.states[address] = HOMING if kind == "home" else MOVING
+        if kind != "stop" and previous is not None and not previous.done():
+            previous.end_ns = time.monotonic_ns()
+            previous.set_exception(MoveInterrupted(f"Replaced by {kind}"))
+        self._notify()
+        return handle
+
+    def close(self) -> None:
+        self._subscription.dispose()
+        with self._lock:
+            handle, self._handle = self._handle, None
+        if handle is not None and not handle.done():
+            handle.set_exception(ConnectionError("Disconnected"))
+
+    def _on_reply(self, event):
+        address = event.device_address
+        if address not in self.states:
+            return
+        if event.command == ERROR_REPLY:
+            if self._handle is None or self._handle.done():
+                return  # a rejected query or setting, not a motion error
+            state = ERROR
+        elif event.command == STOP_REPLY:
+            state = STOPPED
+        elif event.command in MOVE_REPLIES:
+            state = IDLE
+        else:
+            return
+        with self._lock:
+            self.states[address] = state
+            handles = [h for h in (self._handle, self._stop_handle) if h is not None]
+        for handle in handles:
+            self._resolve(handle, address, event, state)
+        self._notify()
+
+    def _resolve(self, handle, address, event, state):
+        if handle.done() or (handle.kind == "stop" and state != STOPPED):
+            return
+        if state == ERROR:
+            handle.end_ns = time.monotonic_ns()
+            handle.set_exception(RuntimeError(f"Device {address} error {event.data}"))
+            return
+        handle.stopped = handle.stopped or state == STOPPED
+        handle.positions[address] = event.data
+        if len(handle.positions) == len(self.addresses):
+            handle.end_ns = time.monotonic_ns()
+            handle.set_result(tuple(handle.positions[a] for a in self.addresses))
+
+    def _notify(self):
+        states = dict(self.states)
+        for listener in tuple(self.listeners):
+            listener(states)
@@ -0,0 +1,132 @@
+import queue
+import threading
+
+from mini_stretcher.scheduler import DeadlineScheduler
+
+
+class CommandCancelled(InterruptedError):
+    """Raised inside a worker command when it was cancelled (e.g. STOP)"""
+
+
+class MotionWorker(threading.Thread):
+    """Executes motor commands on a dedicated thread.
+
+    The worker owns the Motors object. The GUI only submits commands and
+    gets the results back through callbacks that run on the Tk thread, so
+    blocking serial I/O and pauses never freeze the mainloop.
+    """
+
+    POLL_INTERVAL = 20  # [ms]
+
+    def __init__(self, motors, master=None):
+        super().__init__(name="MotionWorker", daemon=True)
+        self.motors = motors
+        self.master = master
+
+        self._commands = queue.Queue()
+        self._results = queue.Queue()
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+        self._generation = 0
+
+        self.start()
+        if self.master is not None:
+            self._poll_results()
+
+    def submit(self, command, *args, on_done=None, on_error=None, **kwargs):
+        """Queue a command for the worker thread
+
+        Args:
+            command (callable): function to run on the worker thread
+            on_done (callable): called with the return value on the Tk thread
+            on_error (callable): called with the exception on the Tk thread
+        """
+        with self._lock:
+            generation = self._generation
+        self._commands.put((generation, command, args, kwargs, on_done, on_error))
+
+    def post(self, callback, value=None) -> None:
+        """Run callback(value) on the Tk thread, from a command on the worker
+
+        Posted callbacks share the queue of the command results, so they
+        run before the on_done/on_error of the command that posted them.
+        """
+        self._dispatch(callback, value)
+
+    def cancel(self) -> None:
+        """Drop all queued commands and interrupt a running pause"""
+        with self._lock:
+            self._generation += 1
+            self._cancel.set()
+
+    def stop_motors(self, on_done=None, on_error=None) -> None:
+        """Cancel the running protocol and stop both motors right away
+
+        The stop is sent from the calling thread instead of being queued
+        behind the running command, which may be waiting for a move to
+        finish. Callbacks run on the calling thread as well.
+        """
+        self.cancel()
+        try:
+            result = self.motors.stop()
+        except Exception as e:
+            if on_error is not None:
+                on_error(e)
+            return
+        if on_done is not None:
+            on_done(result)
+
+    def sleep(self, seconds: float) -> None:
+        """Interruptible sleep for commands running on the worker thread
+
+        Raises:
+            CommandCancelled: if cancel() was called while sleeping
+        """
+        if self._cancel.wait(seconds):
+            raise CommandCancelled("Command cancelled")
+
+    def scheduler(self) -> DeadlineScheduler:
+        """Deadline scheduler for commands on the worker thread
+
+        Its waits raise CommandCancelled if cancel() is called.
+        """
+        return DeadlineScheduler(self._cancel, cancelled=CommandCancelled)
+
+    def shutdown(self) -> None:
+        """Stop the worker thread after the queued commands are done"""
+        self._commands.put(None)
+
+    def run(self):
+        while True:
+            item = self._commands.get()
+            if item is None:
+                return
+            generation, command, args, kwargs, on_done, on_error = item
+            with self._lock:
+                if generation != self._generation:
+                    continue
+                self._cancel.clear()
+            try:
+                result = command(*args, **kwargs)
+            except Exception as e:
+                self._dispatch(on_error, e)
+            else:
+                self._dispatch(on_done, result)
+
+    def _dispatch(self, callback, value):
+        if callback is None:
+            return
+        if self.master is None:
+            callback(value)
+        else:
+            self._results.put((callback, value))
+
+    def _poll_results(self):
+        """Run finished callbacks on the Tk thread"""
+        while True:
+            try:
+                callback, value = self._results.get_nowait()
+            except queue.Empty:
+                break
+            callback(value)
+        self.master.after(self.POLL_INTERVAL, self._poll_results)
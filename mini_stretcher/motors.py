@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import TYPE_CHECKING
+
+from mini_stretcher.connection_manager import ConnectionManager
+from mini_stretcher.motion_state import MotionTracker, MoveHandle
+from mini_stretcher.units import check_microstep_resolution, data_to_mm, mm_to_data, mms_to_data, velocity_unit
+from mini_stretcher.replies import ReplyCollector
+
+if TYPE_CHECKING:
+    from zaber_motion.binary import CommandCode
+
+
+class Motors:
+    """Both stretcher axes, driven as one synchronized pair.
+
+    The two stages always get the same speed and target, so motion commands
+    are broadcast to device number 0: one packet reaches both axes and they
+    start on the same byte instead of one serial round-trip apart. Queries
+    are broadcast as well, so both axes are sampled at the same instant.
+
+    Motion commands return a MoveHandle that resolves when both axes sent
+    their completion reply, and `tracker` keeps each axis' state from the
+    replies instead of guessing it from positions.
+
+    zaber_motion is imported inside the methods, which can only run after
+    connect() loaded it anyway, so creating a Motors is free at startup.
+    """
+
+    ZERO_POSITION = 503937
+    ALL_DEVICES = 0
+    QUERY_TIMEOUT = 0.5  # [s]
+
+    def __init__(self, connections: ConnectionManager = None):
+        self.connected = False
+        self.connections = connections or ConnectionManager()
+        self._query_lock = threading.Lock()
+        self.move_listeners = []  # called as listener(t_ns, handle) right after a motion command is sent
+
+    def connect(self, port):
+        self.connection, devices = self.connections.open(port)
+        try:
+            self.device1, self.device2 = devices[:2]
+        except ValueError:
+            self.connection.close()
+            raise ConnectionError(f"Expected two devices on {port}, found {len(devices)}.")
+        addresses = (self.device1.device_address, self.device2.device_address)
+        self._replies = ReplyCollector(self.connection, addresses)
+        self.tracker = MotionTracker(self.connection, addresses)
+        self.connected = True
+        from zaber_motion.binary import CommandCode
+        try:
+            for address, status in zip(addresses, self.query_pair(CommandCode.RETURN_STATUS)):
+                self.tracker.set_status(address, status)
+        except (TimeoutError, RuntimeError):
+            pass  # keep assuming idle
+        try:
+            check_microstep_resolution(
+                self.query_pair(CommandCode.RETURN_SETTING, CommandCode.SET_MICROSTEP_RESOLUTION.value))
+        except (TimeoutError, RuntimeError) as e:
+            print(f"Microstep resolution not checked: {e}")
+        except ValueError as e:
+            self.disconnect()
+            raise ConnectionError(f"{port}: {e}") from e
+
+    def disconnect(self):
+        self.connected = False
+        self.tracker.close()
+        self._replies.close()
+        self.connection.close()
+
+    @property
+    def state(self) -> str:
+        """idle, moving, homing, stopped or error; disconnected before connect()"""
+        return self.tracker.state if self.connected else "disconnected"
+
+    def broadcast(self, command: CommandCode, data: int = 0) -> None:
+        """Send one command to both axes in a single serial write"""
+        self._require_connection()
+        self.connection.generic_command_no_response(self.ALL_DEVICES, command, data)
+
+    def query_pair(self, command: CommandCode, data: int = 0) -> tuple:
+        """Broadcast a query and return the replies of device1 and device2"""
+        from zaber_motion.binary import CommandCode
+        self._require_connection()
+        reply_command = data if command == CommandCode.RETURN_SETTING else None
+        with self._query_lock:
+            self._replies.arm(command, reply_command)
+            self.connection.generic_command_no_response(self.ALL_DEVICES, command, data)
+            if not self._replies.wait(self.QUERY_TIMEOUT):
+                raise TimeoutError(f"No reply to {command.name} from both devices.")
+            if self._replies.error:
+                raise RuntimeError(self._replies.error)
+            replies = self._replies.replies
+        return replies[self.device1.device_address], replies[self.device2.device_address]
+
+    def stop(self) -> MoveHandle:
+        """Stop both axes; the running move's handle resolves with `stopped` set"""
+        from zaber_motion.binary import CommandCode
+        self._require_connection()
+        handle = self.tracker.begin("stop")
+        self.broadcast(CommandCode.STOP)
+        self._moved(handle)
+        return handle
+
+    def home(self) -> MoveHandle:
+        from zaber_motion.binary import CommandCode
+        self._require_connection()
+        handle = self.tracker.begin("home", 0)
+        self.broadcast(CommandCode.HOME)
+        self._moved(handle)
+        return handle
+
+    def move_relative_distance(self, length, speed) -> MoveHandle:
+        from zaber_motion.binary import CommandCode
+        distance = mm_to_data(-length / 2)
+        speed_data = mms_to_data(speed / 2)
+        self.broadcast(CommandCode.SET_TARGET_SPEED, speed_data)
+        handle = self.tracker.begin("move_relative", distance, speed_data * velocity_unit())
+        self.broadcast(CommandCode.MOVE_RELATIVE, distance)
+        self._moved(handle)
+        return handle
+
+    def set_speed(self, speed) -> None:
+        """Target speed of both axes for the following moves, chamber speed [mm/s]
+
+        Unlike move_absolute_distance() this starts no move, so no move
+        reply is left in flight for whoever waits on the next one.
+        """
+        from zaber_motion.binary import CommandCode
+        self.broadcast(CommandCode.SET_TARGET_SPEED, mms_to_data(speed / 2))
+
+    def move_absolute_distance(self, pos, speed) -> MoveHandle:
+        position = self.ZERO_POSITION - mm_to_data((pos - 12) / 2)
+        return self.move_to(position, mms_to_data(speed / 2))
+
+    def move_to(self, position: int, speed_data: int = None) -> MoveHandle:
+        """Move both axes to a position [data], e.g. a CycleEngine or TrajectoryStreamer step
+
+        Args:
+            speed_data (int): target speed per axis [data]; None keeps the current one
+        """
+        from zaber_motion.binary import CommandCode
+        if speed_data is not None:
+            self.broadcast(CommandCode.SET_TARGET_SPEED, speed_data)
+        self._require_connection()
+        speed = None if speed_data is None else speed_data * velocity_unit()
+        handle = self.tracker.begin("move_absolute", position, speed)
+        self.broadcast(CommandCode.MOVE_ABSOLUTE, position)
+        self._moved(handle)
+        return handle
+
+    def retarget(self, device, speed_data: int) -> None:
+        """Resend the running move to one axis at another speed [data], e.g. a SyncMonitor trim
+
+        The move continues without stopping and stays the tracked one: its
+        handle resolves on this axis' reply to the resent move.
+        """
+        from zaber_motion.binary import CommandCode
+        handle = self.tracker.current
+        if handle is None or handle.done() or handle.kind != "move_absolute":
+            return
+        device.generic_command_no_response(CommandCode.SET_TARGET_SPEED, speed_data)
+        device.generic_command_no_response(CommandCode.MOVE_ABSOLUTE, handle.target)
+
+    def get_positions(self):
+        from zaber_motion.binary import CommandCode
+        return self.query_pair(CommandCode.RETURN_CURRENT_POSITION)
+
+    def _require_connection(self):
+        if not self.connected:
+            raise ConnectionError("Motors must be connected first.")
+
+    def _moved(self, handle):
+        t_ns = time.monotonic_ns()
+        for listener in tuple(self.move_listeners):
+            listener(t_ns, handle)
+
+    @classmethod
+    def length_from_positions(cls, pos1: int, pos2: int) -> float:
+        """Chamber length [mm] for the given axis positions [data]"""
+        return data_to_mm((cls.ZERO_POSITION - pos1) + (cls.ZERO_POSITION - pos2)) + 12
@@ -0,0 +1,74 @@
+import threading
+import time
+
+from mini_stretcher.ring_buffer import RingBuffer
+
+
+class PositionSampler(threading.Thread):
+    """Reads both axis positions off the GUI thread at a fixed rate.
+
+    Samples are timestamped with the monotonic clock and published into a
+    RingBuffer; the GUI and other consumers read it at their own pace and
+    never touch the serial port themselves.
+
+    A listener that raises doesn't stop the sampling: its first error is
+    printed, later ones are only counted in `errors`.
+    """
+
+    def __init__(self, motors, rate: float = 50, buffer: RingBuffer = None):
+        """
+        Args:
+            motors (Motors): connected motors to sample
+            rate (float): samples per second; 0 samples as fast as the serial link allows
+            buffer (RingBuffer): where samples go; a new one if omitted
+        """
+        super().__init__(name="PositionSampler", daemon=True)
+        self.motors = motors
+        self.rate = rate
+        self.buffer = buffer or RingBuffer()
+        self.listeners = []  # called as listener(t_ns, pos1, pos2) on this thread
+        self.errors = 0  # exceptions raised by listeners
+        self._failed = set()  # listeners whose error was printed
+        self._stopped = threading.Event()
+
+    def run(self):
+        next_sample = time.monotonic()
+        while not self._stopped.is_set():
+            if self.motors.connected:
+                self.sample()
+            if self.rate:
+                next_sample += 1 / self.rate
+                delay = next_sample - time.monotonic()
+                if delay < 0:
+                    # Serial link slower than the requested rate; don't try to catch up
+                    next_sample = time.monotonic()
+                    delay = 0
+            else:
+                delay = 0 if self.motors.connected else 0.1
+            if delay:
+                self._stopped.wait(delay)
+
+    def sample(self):
+        t_start = time.monotonic_ns()
+        try:
+            pos1, pos2 = self.motors.get_positions()
+        except Exception:
+            # Disconnected mid-read
+            return
+        # Stamp at the middle of the query, closest to when the devices answered
+        t_ns = (t_start + time.monotonic_ns()) // 2
+        self.buffer.append(t_ns, pos1, pos2)
+        for listener in tuple(self.listeners):
+            try:
+                listener(t_ns, pos1, pos2)
+            except Exception as e:
+                self._listener_failed(listener, e)
+
+    def _listener_failed(self, listener, e):
+        self.errors += 1
+        if listener not in self._failed:
+            self._failed.add(listener)
+            print(f"PositionSampler: listener {getattr(listener, '__qualname__', listener)} failed: {e!r}")
+
+    def stop(self):
+        self._stopped.set()
@@ -0,0 +1,230 @@
+import json
+import os
+import queue
+import struct
+import threading
+import time
+
+import numpy as np
+
+MAGIC = b"MSRUN\x00\x01\x00"
+COMPACT_MAGIC = b"MSRUN\x00\x02\x00"  # delta-encoded chunks, see compact.py
+HEADER_ALIGN = 64  # records start on a 64 byte boundary
+RECORD_DTYPE = np.dtype([
+    ("t_ns", "<i8"),     # time.monotonic_ns()
+    ("pos1", "<i4"),     # [data]
+    ("pos2", "<i4"),     # [data]
+    ("length", "<f8"),   # [mm]
+    ("strain", "<f8"),   # [%]
+])
+# Cycle markers, written next to the run as <run>.cycles
+CYCLE_DTYPE = np.dtype([
+    ("cycle", "<i8"),
+    ("start_ns", "<i8"),  # stretch command sent
+    ("peak_ns", "<i8"),   # end position reached
+    ("end_ns", "<i8"),    # back at zero
+])
+
+
+class Recorder:
+    """Records timestamped positions of a protocol run to a binary file.
+
+    Samples are written into preallocated chunks; full chunks are handed to
+    a writer thread that computes length/strain for the whole chunk at once
+    and appends it to the file. Memory stays bounded by the chunk pool no
+    matter how long the run is, and the sampling thread never waits on disk.
+    append() and mark_cycle() may run on other threads than close(); once
+    closed, they are ignored.
+
+    File layout: MAGIC, uint32 header size, JSON header padded to
+    HEADER_ALIGN, then RECORD_DTYPE records. With a codec the chunks are
+    delta-encoded instead (see compact.py), which takes a quarter of the
+    space or less. Cycles passed to mark_cycle() go to a CYCLE_DTYPE
+    sidecar, see cycles_path().
+    """
+
+    def __init__(self, path, l0: float, length_from_positions, chunk_size: int = 4096,
+                 pool_size: int = 8, metadata: dict = None, codec: str = None):
+        """
+        Args:
+            path (str): output file, by convention *.msrun
+            l0 (float): reference length for strain [mm]
+            length_from_positions (callable): (pos1, pos2) -> length [mm], must accept arrays
+            chunk_size (int): samples per chunk written to disk
+            pool_size (int): number of preallocated chunks
+            metadata (dict): extra JSON-serializable header fields
+            codec (str): None for raw records, "delta", "zlib" or "lzma" for
+                a compact file; load_run() reads both
+        """
+        self.path = str(path)
+        self.l0 = l0
+        self.length_from_positions = length_from_positions
+        self.chunk_size = chunk_size
+        self.codec = codec
+        self.count = 0
+        self.closed = False
+        self._lock = threading.Lock()  # append/mark_cycle vs. close
+        self._cycles = None  # sidecar, opened by the first mark_cycle(); False after a failed write
+
+        self._free = queue.Queue()
+        for _ in range(pool_size):
+            self._free.put(np.zeros(chunk_size, dtype=RECORD_DTYPE))
+        self._full = queue.Queue()
+        self._chunk = self._free.get()
+        self._fill = 0
+
+        header = {"dtype": RECORD_DTYPE.descr, "l0": l0, "created": time.time()}
+        header.update(metadata or {})
+        if codec is None:
+            self._file = open(self.path, "wb")
+            self._file.write(encode_header(header))
+        else:
+            from mini_stretcher.compact import CompactWriter
+            self._file = CompactWriter(self.path, header, codec)
+
+        self._writer = threading.Thread(target=self._write_chunks, name="Recorder", daemon=True)
+        self._writer.start()
+
+    def append(self, t_ns: int, pos1: int, pos2: int) -> None:
+        """Add one sample; signature matches PositionSampler.listeners"""
+        with self._lock:
+            if not self.closed:
+                self._append(t_ns, pos1, pos2)
+
+    def _append(self, t_ns, pos1, pos2):
+        chunk = self._chunk
+        i = self._fill
+        chunk["t_ns"][i] = t_ns
+        chunk["pos1"][i] = pos1
+        chunk["pos2"][i] = pos2
+        self._fill += 1
+        self.count += 1
+        if self._fill == self.chunk_size:
+            self._full.put((chunk, self._fill))
+            # Only blocks if the disk can't keep up with the whole pool
+            self._chunk = self._free.get()
+            self._fill = 0
+
+    def mark_cycle(self, timing) -> None:
+        """Record where a cycle starts, peaks and ends; signature matches CycleEngine's on_cycle
+
+        Args:
+            timing (CycleTiming): the finished cycle
+        """
+        marker = np.array([(timing.cycle, timing.start_ns, timing.peak_ns, timing.end_ns)], dtype=CYCLE_DTYPE)
+        with self._lock:
+            if self.closed or self._cycles is False:
+                return
+            try:
+                if self._cycles is None:
+                    self._cycles = open(cycles_path(self.path), "wb")
+                self._cycles.write(marker.tobytes())
+                self._cycles.flush()
+            except OSError as e:
+                self._drop_cycles(e)
+
+    def close(self) -> None:
+        """Write the remaining samples and close the file; later calls do nothing"""
+        with self._lock:
+            if self.closed:
+                return
+            self.closed = True
+            if self._fill:
+                self._full.put((self._chunk, self._fill))
+                self._fill = 0
+        self._full.put(None)
+        self._writer.join()
+        self._file.close()
+        if self._cycles:
+            try:
+                self._cycles.close()
+            except OSError as e:
+                self._drop_cycles(e)
+
+    def _drop_cycles(self, error):
+        """Give up on the sidecar after a failed write; RunReader detects the cycles from the records instead"""
+        print(f"Recorder: cycle markers of {self.path} not saved: {error!r}")
+        if self._cycles:
+            try:
+                self._cycles.close()
+            except OSError:
+                pass
+        self._cycles = False
+        try:
+            os.remove(cycles_path(self.path))  # an incomplete sidecar would hide cycles from RunReader
+        except OSError:
+            pass
+
+    def _write_chunks(self):
+        while True:
+            item = self._full.get()
+            if item is None:
+                return
+            chunk, n = item
+            records = chunk[:n]
+            if self.codec is not None:
+                # Length and strain are recomputed from the positions when reading
+                self._file.write(records["t_ns"], records["pos1"], records["pos2"])
+                self._free.put(chunk)
+                continue
+            records["length"] = self.length_from_positions(records["pos1"], records["pos2"])
+            records["strain"] = (records["length"] - self.l0) / self.l0 * 100
+            self._file.write(records.tobytes())
+            self._free.put(chunk)
+
+
+def encode_header(header: dict, magic: bytes = MAGIC) -> bytes:
+    """magic + size + JSON header, padded to HEADER_ALIGN"""
+    body = json.dumps(header).encode()
+    size = len(magic) + 4 + len(body)
+    body += b" " * (-size % HEADER_ALIGN)
+    return magic + struct.pack("<I", len(body)) + body
+
+
+def read_header(f, magic: bytes = MAGIC):
+    """Read the header of an open run file
+
+    Returns:
+        (dict, int): header and byte offset of the first record
+    """
+    if f.read(len(magic)) != magic:
+        raise ValueError(f"{f.name} is not a run file")
+    (size,) = struct.unpack("<I", f.read(4))
+    header = json.loads(f.read(size))
+    return header, len(MAGIC) + 4 + size
+
+
+def cycles_path(path) -> str:
+    """Cycle marker sidecar of a run file"""
+    return os.path.splitext(str(path))[0] + ".cycles"
+
+
+def load_run(path):
+    """Memory-map a run file; compact files are decoded into memory
+
+    Returns:
+        (dict, np.memmap): header and records
+    """
+    with open(path, "rb") as f:
+        if f.read(len(COMPACT_MAGIC)) == COMPACT_MAGIC:
+            from mini_stretcher.compact import CompactReader
+            reader = CompactReader(path)
+            return reader.header, reader.read_all()
+        f.seek(0)
+        header, offset = read_header(f)
+        if f.seek(0, 2) == offset:
+            return header, np.zeros(0, dtype=RECORD_DTYPE)
+    records = np.memmap(path, dtype=RECORD_DTYPE, mode="r", offset=offset)
+    return header, records
+
+
+def export_csv(path, csv_path=None, rows_per_block: int = 100_000) -> str:
+    """Export a run file to CSV without loading it into memory at once"""
+    csv_path = csv_path or str(path).rsplit(".", 1)[0] + ".csv"
+    _, records = load_run(path)
+    with open(csv_path, "w") as f:
+        f.write(",".join(RECORD_DTYPE.names) + "\n")
+        for start in range(0, len(records), rows_per_block):
+            block = records[start:start + rows_per_block]
+            np.savetxt(f, block, fmt=["%d", "%d", "%d", "%.6f", "%.6f"], delimiter=",")
+    return csv_path
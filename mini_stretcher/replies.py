@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import threading
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from zaber_motion.binary import CommandCode
+
+STOP_REPLY = 23
+ERROR_REPLY = 255
+
+
+class ReplyCollector:
+    """Collects the replies of both axes to a command sent to device 0.
+
+    Replies to commands sent without a pending request (broadcasts, moves
+    sent with generic_command_no_response) show up on the connection's
+    unknown_response stream. A move is answered when it finishes, so
+    waiting for its replies is a plain Event.wait() instead of polling.
+    """
+
+    def __init__(self, connection, addresses):
+        self.addresses = set(addresses)
+        self.replies = {}  # device address -> reply data
+        self.error = None
+        self.stopped = False
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._pending = set()
+        self._command = None
+        self._stop_ends = False
+        self._subscription = connection.unknown_response.subscribe(self._on_reply)
+
+    def arm(self, command: CommandCode, reply_command: int = None, stop_ends: bool = False) -> None:
+        """Call before sending the command, so no reply can be missed
+
+        Args:
+            command (CommandCode): command whose replies to collect
+            reply_command (int): reply code if it differs from the command,
+                e.g. the setting number for RETURN_SETTING
+            stop_ends (bool): count STOP replies too, for moves that may be
+                stopped before they finish; sets `stopped`
+        """
+        with self._lock:
+            self._command = command.value if reply_command is None else reply_command
+            self._stop_ends = stop_ends
+            self._pending = set(self.addresses)
+            self.replies = {}
+            self.error = None
+            self.stopped = False
+            self._done.clear()
+
+    def wait(self, timeout: float) -> bool:
+        return self._done.wait(timeout)
+
+    def release(self) -> None:
+        """Wake up wait() early, e.g. on cancel"""
+        self._done.set()
+
+    def close(self) -> None:
+        self._subscription.dispose()
+
+    def _on_reply(self, event):
+        with self._lock:
+            if event.device_address not in self._pending:
+                return
+            if event.command == ERROR_REPLY:
+                self.error = f"Device {event.device_address} error {event.data}"
+            elif self._stop_ends and event.command == STOP_REPLY:
+                self.stopped = True
+            elif event.command != self._command:
+                return
+            self.replies[event.device_address] = event.data
+            self._pending.discard(event.device_address)
+            if not self._pending or self.error:
+                self._done.set()
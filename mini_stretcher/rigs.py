@@ -0,0 +1,223 @@
+import os
+import threading
+import time
+
+from mini_stretcher.connection_manager import ConnectionManager
+from mini_stretcher.cycle_engine import cycle_lengths
+from mini_stretcher.motion_worker import CommandCancelled, MotionWorker
+from mini_stretcher.motors import Motors
+from mini_stretcher.position_sampler import PositionSampler
+from mini_stretcher.recorder import Recorder
+from mini_stretcher.sync_monitor import SyncMonitor
+
+
+class Rig:
+    """One stretcher with its own connection, motion worker and sampler.
+
+    Every rig talks to its own serial port from its own threads, so a slow
+    link or a long pause on one rig never holds up another.
+    """
+
+    def __init__(self, name: str, port: str, connections: ConnectionManager = None,
+                 sample_rate: float = 50, run_dir: str = "runs", sync_threshold: float = 0.01,
+                 codec: str = None):
+        self.name = name
+        self.port = port
+        self.run_dir = os.path.join(run_dir, name)
+        self.motors = Motors(connections)
+        self.worker = MotionWorker(self.motors)
+        self.sampler = PositionSampler(self.motors, rate=sample_rate)
+        self.sampler.start()
+        self.recorder = None
+        self.sync = None
+        self.sync_threshold = sync_threshold  # [mm] axis skew logged during recordings
+        self.codec = codec  # of the recordings, see Recorder
+        self.state = "disconnected"
+        self.error = None
+        self.log = []  # (time.time(), message)
+        self.done = threading.Event()
+        self.done.set()
+
+    def log_message(self, message: str) -> None:
+        self.log.append((time.time(), message))
+        print(f"[{self.name}] {message}")
+
+    def submit(self, protocol, **params) -> None:
+        """Run protocol(rig, **params) on this rig's worker thread"""
+        self.done.clear()
+        self.error = None
+        self.state = "running"
+        self.worker.submit(protocol, self, on_done=self._finished, on_error=self._failed, **params)
+
+    def start_recording(self, l0: float, metadata: dict) -> str:
+        """Record positions until stop_recording(); returns the file path"""
+        self.stop_recording()
+        os.makedirs(self.run_dir, exist_ok=True)
+        stem = os.path.join(self.run_dir, time.strftime("%Y%m%d-%H%M%S"))
+        path, n = stem + ".msrun", 1
+        while os.path.exists(path):  # queued runs can start within the same second
+            path, n = f"{stem}-{n}.msrun", n + 1
+        metadata = dict(metadata, rig=self.name, port=self.port)
+        self.recorder = Recorder(path, l0, self.motors.length_from_positions, metadata=metadata, codec=self.codec)
+        self.sync = SyncMonitor(self.motors, self.sync_threshold,
+                                on_alarm=lambda t_ns, skew: self.log_message(f"Axis skew {skew * 1000:.1f} µm"))
+        self.sampler.listeners.append(self.recorder.append)
+        self.sampler.listeners.append(self.sync.feed)
+        self.log_message(f"Recording to {path}")
+        return path
+
+    def stop_recording(self) -> None:
+        if self.recorder is None:
+            return
+        self.sampler.listeners.remove(self.recorder.append)
+        self.sampler.listeners.remove(self.sync.feed)
+        self.recorder.close()
+        self.sync.save(os.path.splitext(self.recorder.path)[0] + ".sync.json")
+        self.recorder = None
+        self.sync = None
+
+    def mark_cycle(self, timing) -> None:
+        """Mark a finished cycle in the running recording; for CycleEngine's on_cycle"""
+        if self.recorder is not None:
+            self.recorder.mark_cycle(timing)
+
+    def move_and_wait(self, length: float, speed: float, timeout: float) -> None:
+        """Move to a chamber length and wait for both completion replies"""
+        handle = self.motors.move_absolute_distance(length, speed)
+        try:
+            handle.result(timeout)
+        except TimeoutError:
+            raise TimeoutError(f"Move to {length} mm did not finish within {timeout:.0f} s")
+        if handle.stopped:
+            raise CommandCancelled("Stopped")
+
+    def stop(self) -> None:
+        """Cancel the protocol and stop both axes right away
+
+        The stop is sent from the calling thread, since the worker may be
+        blocked waiting for a move to finish; that move then ends with the
+        STOP replies.
+        """
+        self.worker.cancel()
+        self.motors.stop()
+
+    def status(self) -> dict:
+        sample = self.sampler.buffer.latest()
+        length = self.motors.length_from_positions(sample[1], sample[2]) if sample else None
+        return {"state": self.state, "length": length, "samples": self.sampler.buffer.count,
+                "error": self.error}
+
+    def _finished(self, _):
+        self.stop_recording()
+        self.state = "idle"
+        self.log_message("Protocol finished")
+        self.done.set()
+
+    def _failed(self, e):
+        self.stop_recording()
+        if isinstance(e, (CommandCancelled, InterruptedError)):
+            self.state = "stopped"
+        else:
+            self.state = "error"
+            self.error = str(e)
+        self.log_message(f"Protocol failed: {e}")
+        self.done.set()
+
+
+def stretch(rig: Rig, l0: float, target_length: float, speed: float, pause: float) -> None:
+    """Single stretch protocol: pause, then ramp from L0 to the target length"""
+    rig.start_recording(l0, {"target_length": target_length, "speed": speed, "pause": pause})
+    rig.worker.scheduler().wait(pause, "pause")
+    rig.move_and_wait(target_length, speed, 2 * abs(target_length - l0) / speed + 10)
+
+
+def cycle(rig: Rig, l0: float, target_length: float, speed: float, pause: float, cycles: int) -> None:
+    """Cyclic protocol between L0 and the target length"""
+    rig.start_recording(l0, {"target_length": target_length, "speed": speed, "pause": pause,
+                             "cycles": cycles})
+    schedule = rig.worker.scheduler()
+    schedule.wait(pause, "pause")
+
+    def on_cycle(timing):
+        rig.mark_cycle(timing)
+        rig.log_message(f"cycle {timing.cycle}/{cycles} {timing.period_s:.3f} s")
+
+    cycle_lengths(rig.motors, l0, target_length, speed, cycles, on_cycle=on_cycle, cancel=schedule.cancel)
+
+
+class RigManager:
+    """Supervises several stretchers and runs protocols on all of them at once"""
+
+    def __init__(self, ports: dict, run_dir: str = "runs", sample_rate: float = 50, device_db: str = None):
+        """
+        Args:
+            ports (dict): rig name -> serial port
+            run_dir (str): recordings go to run_dir/<rig name>/
+            sample_rate (float): position samples per second per rig
+            device_db (str): device DB store directory, see ConnectionManager
+        """
+        connections = ConnectionManager(device_db)
+        self.rigs = {name: Rig(name, port, connections, sample_rate, run_dir)
+                     for name, port in ports.items()}
+
+    def connect_all(self, timeout: float = 30) -> dict:
+        """Connect every rig in parallel
+
+        Returns:
+            dict: rig name -> error message for rigs that failed
+        """
+        errors = {}
+        pending = []
+        for rig in self.rigs.values():
+            done = threading.Event()
+            pending.append(done)
+
+            def connected(_, rig=rig, done=done):
+                rig.state = "idle"
+                done.set()
+
+            def failed(e, rig=rig, done=done):
+                rig.state = "error"
+                errors[rig.name] = str(e)
+                done.set()
+
+            rig.worker.submit(rig.motors.connect, rig.port, on_done=connected, on_error=failed)
+        for done in pending:
+            done.wait(timeout)
+        return errors
+
+    def run(self, protocol, **params) -> None:
+        """Start the same protocol on every connected rig"""
+        for rig in self.rigs.values():
+            if rig.motors.connected:
+                rig.submit(protocol, **params)
+
+    def wait(self, timeout: float = None) -> bool:
+        """Block until every rig finished its protocol"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for rig in self.rigs.values():
+            remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+            if not rig.done.wait(remaining):
+                return False
+        return True
+
+    def stop_all(self) -> None:
+        for rig in self.rigs.values():
+            if rig.motors.connected:
+                rig.stop()
+
+    def status(self) -> dict:
+        return {name: rig.status() for name, rig in self.rigs.items()}
+
+    def logs(self) -> list:
+        """All rig log messages merged in time order as (time, rig name, message)"""
+        merged = [(t, name, message) for name, rig in self.rigs.items() for t, message in rig.log]
+        return sorted(merged)
+
+    def close(self) -> None:
+        for rig in self.rigs.values():
+            rig.sampler.stop()
+            rig.stop_recording()
+            if rig.motors.connected:
+                rig.motors.disconnect()
+            rig.worker.shutdown()
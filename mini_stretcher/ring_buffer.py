@@ -0,0 +1,45 @@
+import numpy as np
+
+
+class RingBuffer:
+    """Fixed-size buffer of timestamped position samples.
+
+    One writer thread appends, any number of readers poll without locks:
+    a slot is filled before `count` is advanced, so everything below
+    `count` is complete. Readers that fall more than `capacity` samples
+    behind lose the oldest samples instead of blocking the writer.
+    """
+
+    def __init__(self, capacity: int = 65536):
+        self.capacity = capacity
+        self.t_ns = np.zeros(capacity, dtype=np.int64)  # time.monotonic_ns()
+        self.pos1 = np.zeros(capacity, dtype=np.int64)  # [data]
+        self.pos2 = np.zeros(capacity, dtype=np.int64)  # [data]
+        self.count = 0  # samples written since creation
+
+    def append(self, t_ns: int, pos1: int, pos2: int) -> None:
+        i = self.count % self.capacity
+        self.t_ns[i] = t_ns
+        self.pos1[i] = pos1
+        self.pos2[i] = pos2
+        self.count += 1
+
+    def latest(self):
+        """Return the newest (t_ns, pos1, pos2) sample or None if empty"""
+        count = self.count
+        if count == 0:
+            return None
+        i = (count - 1) % self.capacity
+        return int(self.t_ns[i]), int(self.pos1[i]), int(self.pos2[i])
+
+    def read_since(self, start: int):
+        """Copy all samples written after sample number `start`
+
+        Returns:
+            (t_ns, pos1, pos2, end): arrays in time order and the sample
+            number to pass as `start` on the next call
+        """
+        end = self.count
+        start = max(start, end - self.capacity)
+        idx = np.arange(start, end) % self.capacity
+        return self.t_ns[idx], self.pos1[idx], self.pos2[idx], end
@@ -0,0 +1,176 @@
+import os
+
+import numpy as np
+
+from mini_stretcher.compact import CompactReader
+from mini_stretcher.recorder import COMPACT_MAGIC, CYCLE_DTYPE, RECORD_DTYPE, cycles_path, load_run
+
+
+class RunReader:
+    """Time and cycle based access to a run file without reading all of it.
+
+        run = RunReader("runs/20240101-120000.msrun")
+        hold = run.time_slice(3 * 3600, 3 * 3600 + 10)
+        fatigue = run.cycles(5000, 5010)
+
+    Records are memory-mapped and every slice is a view into the map, so
+    only the pages a slice covers are ever read. A sparse index keeps the
+    timestamp of every INDEX_STRIDE-th record; a lookup bisects the index
+    and then one stride of records, touching a few pages instead of
+    scanning. The index is cached next to the run as <run>.tidx.npy.
+
+    Cycles come from the <run>.cycles markers written during the run. For
+    recordings without markers they are detected once from the crossings of
+    the midpoint between L0 and the target length, which reads the file
+    once, and saved as markers.
+
+    Compact run files can't be mapped. Their chunk table takes the place of
+    the index and only the chunks a slice covers are decoded, so slices of
+    compact runs are copies, not views.
+    """
+
+    INDEX_STRIDE = 4096  # records per index entry, 128 KiB of records
+    DETECT_BLOCK = 1 << 20  # records per block when detecting cycles
+
+    def __init__(self, path):
+        self.path = str(path)
+        with open(self.path, "rb") as f:
+            compact = f.read(len(COMPACT_MAGIC)) == COMPACT_MAGIC
+        if compact:
+            self.compact = CompactReader(self.path)
+            self.header, self.records = self.compact.header, None
+            self.index = self.compact.starts_ns
+        else:
+            self.compact = None
+            self.header, self.records = load_run(self.path)
+            self.index = self._load_index()
+        self._cycles = None
+
+    def __len__(self) -> int:
+        return len(self.compact) if self.compact is not None else len(self.records)
+
+    @property
+    def t0_ns(self) -> int:
+        """Timestamp of the first record, None for an empty run"""
+        if not len(self):
+            return None
+        return int(self.index[0]) if self.compact is not None else int(self.records["t_ns"][0])
+
+    @property
+    def duration(self) -> float:
+        """[s] from the first to the last record"""
+        return (self._last_ns() - self.t0_ns) / 1e9 if len(self) else 0.0
+
+    def find(self, t_ns: int) -> int:
+        """Number of the first record at or after t_ns"""
+        block = int(np.searchsorted(self.index, t_ns, side="right")) - 1
+        if block < 0:
+            return 0
+        if self.compact is not None:
+            start = int(self.compact.counts[:block].sum())
+            stamps = self.compact.chunk(block)["t_ns"]
+        else:
+            start = block * self.INDEX_STRIDE
+            stamps = self.records["t_ns"][start:start + self.INDEX_STRIDE]
+        return start + int(np.searchsorted(stamps, t_ns, side="left"))
+
+    def between(self, start_ns: int, stop_ns: int) -> np.ndarray:
+        """Records with start_ns <= t_ns < stop_ns, as a view into the file for raw runs"""
+        if self.compact is not None:
+            return self.compact.between(start_ns, stop_ns)
+        return self.records[self.find(start_ns):self.find(stop_ns)]
+
+    def time_slice(self, start: float, stop: float) -> np.ndarray:
+        """Records from `start` to `stop` seconds after the first record; empty for an empty run"""
+        if not len(self):
+            return np.zeros(0, dtype=RECORD_DTYPE)
+        return self.between(self.t0_ns + round(start * 1e9), self.t0_ns + round(stop * 1e9))
+
+    def cycle_markers(self) -> np.ndarray:
+        """CYCLE_DTYPE markers of every cycle in the run"""
+        if self._cycles is None:
+            path = cycles_path(self.path)
+            if os.path.exists(path):
+                self._cycles = np.fromfile(path, dtype=CYCLE_DTYPE)
+                return self._cycles
+            self._cycles = self._detect_cycles()
+            try:
+                self._cycles.tofile(path)
+            except OSError as e:
+                print(f"RunReader: cycle markers not saved, detected again next time: {e!r}")
+                _remove(path)
+        return self._cycles
+
+    def cycles(self, first: int, last: int = None) -> np.ndarray:
+        """Records from the start of cycle `first` to the end of cycle `last` (1-based, inclusive)"""
+        markers = self.cycle_markers()
+        last = first if last is None else last
+        if not len(markers) or first < markers["cycle"][0] or last > markers["cycle"][-1] or first > last:
+            raise IndexError(f"Cycles {first}-{last} not in {self.path} ({len(markers)} cycles)")
+        numbers = markers["cycle"]
+        start = markers[np.searchsorted(numbers, first)]["start_ns"]
+        end = markers[np.searchsorted(numbers, last)]["end_ns"]
+        return self.between(int(start), int(end) + 1)
+
+    def _load_index(self):
+        path = os.path.splitext(self.path)[0] + ".tidx.npy"
+        size = -(-len(self.records) // self.INDEX_STRIDE)
+        if os.path.exists(path):
+            index = np.load(path)
+            last = self.records["t_ns"][(size - 1) * self.INDEX_STRIDE] if size else None
+            if len(index) == size and (not size or index[-1] == last):
+                return index
+        # One record per stride, so building reads a fraction of the pages
+        index = np.array(self.records["t_ns"][::self.INDEX_STRIDE])
+        try:
+            np.save(path, index)
+        except OSError:
+            pass  # read-only location; rebuilt next time
+        return index
+
+    def _detect_cycles(self):
+        l0, target = self.header["l0"], self.header.get("target_length")
+        if target is None or target == l0 or not len(self):
+            return np.zeros(0, dtype=CYCLE_DTYPE)
+        midpoint = (l0 + target) / 2
+        direction = 1 if target > l0 else -1
+        rises, falls = [], []
+        previous = False
+        for block in self._blocks():
+            high = (block["length"] - midpoint) * direction > 0
+            edges = np.diff(np.r_[previous, high].astype(np.int8))
+            rises.append(block["t_ns"][edges > 0])
+            falls.append(block["t_ns"][edges < 0])
+            previous = high[-1]
+        rises, falls = np.concatenate(rises), np.concatenate(falls)
+        # A cycle runs from one rising midpoint crossing to the next; its peak
+        # marker is where it falls back through the midpoint
+        markers = np.zeros(len(rises), dtype=CYCLE_DTYPE)
+        markers["cycle"] = np.arange(1, len(rises) + 1)
+        markers["start_ns"] = rises
+        markers["end_ns"] = np.r_[rises[1:], self._last_ns()]
+        falls = np.r_[falls, markers["end_ns"][-1:]]  # the last cycle may end high
+        markers["peak_ns"] = falls[np.searchsorted(falls, rises)]
+        return markers
+
+    def _blocks(self):
+        """The records in blocks of DETECT_BLOCK, or chunk by chunk for compact runs"""
+        if self.compact is not None:
+            for i in range(len(self.compact.offsets)):
+                yield self.compact.chunk(i)
+            return
+        for start in range(0, len(self), self.DETECT_BLOCK):
+            yield self.records[start:start + self.DETECT_BLOCK]
+
+    def _last_ns(self) -> int:
+        if self.compact is not None:
+            return int(self.compact.chunk(len(self.compact.offsets) - 1)["t_ns"][-1])
+        return int(self.records["t_ns"][-1])
+
+
+def _remove(path):
+    """Delete a partly written file, if there is one"""
+    try:
+        os.remove(path)
+    except OSError:
+        pass
@@ -0,0 +1,83 @@
+import math
+import threading
+import time
+
+
+class DeadlineScheduler:
+    """Runs protocol steps at absolute deadlines on the monotonic clock.
+
+    Every wait is measured from the previous deadline, not from when the
+    previous step returned, so print and wake-up jitter never add up over a
+    long protocol. Waits sleep until `spin` seconds before the deadline and
+    busy-wait the rest, which lands within a few microseconds of it instead
+    of the scheduler's wake-up granularity (up to 15 ms on Windows).
+
+        schedule = DeadlineScheduler()
+        schedule.countdown(10, "Start")
+        motors.move_absolute_distance(14, 0.03)
+        schedule.wait(60, "hold")
+        motors.move_absolute_distance(12, 0.03)
+        print(schedule.report())
+    """
+
+    def __init__(self, cancel: threading.Event = None, spin: float = 0.002, cancelled=InterruptedError):
+        """
+        Args:
+            cancel (threading.Event): aborts a wait when set
+            spin (float): busy-wait this long before each deadline [s]
+            cancelled (type): exception raised when `cancel` is set
+        """
+        self.cancel = cancel or threading.Event()
+        self.spin = spin
+        self.cancelled = cancelled
+        self.t0_ns = time.monotonic_ns()
+        self.cursor = 0.0  # last deadline [s after t0]
+        self.steps = []  # (label, planned_ns, actual_ns)
+
+    def wait(self, seconds: float, label: str = "") -> float:
+        """Wait until `seconds` after the previous deadline; returns the error [s]"""
+        return self.wait_until(self.cursor + seconds, label)
+
+    def wait_until(self, t: float, label: str = "") -> float:
+        """Wait until `t` seconds after the scheduler was created; returns the error [s]"""
+        self.cursor = t
+        deadline_ns = self.t0_ns + round(t * 1e9)
+        spin_ns = round(self.spin * 1e9)
+        while True:
+            remaining_ns = deadline_ns - time.monotonic_ns()
+            if remaining_ns <= spin_ns:
+                break
+            if self.cancel.wait((remaining_ns - spin_ns) / 1e9):
+                raise self.cancelled("Command cancelled")
+        now_ns = time.monotonic_ns()
+        while now_ns < deadline_ns:
+            now_ns = time.monotonic_ns()
+        if self.cancel.is_set():
+            raise self.cancelled("Command cancelled")
+        self.steps.append((label, deadline_ns, now_ns))
+        return (now_ns - deadline_ns) / 1e9
+
+    def countdown(self, seconds: float, label: str = "Start", announce=print) -> None:
+        """Wait `seconds`, announcing the time left on every whole second
+
+        Fractional pauses are fine: 2.5 s announces 2.5, 2 and 1.
+        """
+        remaining = seconds
+        while remaining > 0:
+            announce(f"{label} in {remaining:g} s")
+            step = remaining - (math.ceil(remaining) - 1)
+            remaining = round(remaining - step, 9)
+            self.wait(step, f"{label} -{remaining:g} s")
+
+    def report(self) -> dict:
+        """Achieved vs planned time of every step [ms]"""
+        errors = [(actual - planned) / 1e6 for _, planned, actual in self.steps]
+        if not errors:
+            return {"steps": 0}
+        return {
+            "steps": len(errors),
+            "mean_ms": sum(errors) / len(errors),
+            "max_ms": max(errors),
+            "total_s": (self.steps[-1][2] - self.t0_ns) / 1e9,
+            "planned_s": self.cursor,
+        }
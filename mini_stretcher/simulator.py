@@ -0,0 +1,365 @@
+"""Hardware-free stand-in for a chain of Zaber T-LSM025A stages.
+
+Speaks the Zaber binary protocol (6 byte packets: device, command, int32
+data) with trapezoidal move kinematics, so Motors, ms_CL and the GUI can be
+run, benchmarked and regression-tested without the real stretcher.
+
+Connect zaber_motion to it over TCP (Connection.open_tcp, or the port
+"tcp://127.0.0.1:<port>" in the GUI) or through a pseudo terminal that looks
+like a serial port:
+
+    python -m mini_stretcher.simulator --tcp 5000
+    python -m mini_stretcher.simulator --pty
+"""
+import argparse
+import heapq
+import os
+import socket
+import struct
+import threading
+import time
+
+from mini_stretcher import units
+
+PACKET = struct.Struct("<BBi")
+ERROR = 255
+
+# Settings of a freshly reset T-LSM025A [data]
+DEFAULT_SETTINGS = {
+    37: 64,       # microstep resolution
+    40: 0,        # device mode
+    42: 2922,     # target speed
+    43: 100,      # acceleration
+    44: 533334,   # maximum position
+    46: 533334,   # maximum relative move
+    47: 0,        # home offset
+    48: 0,        # alias number
+}
+
+
+class SimulatedAxis:
+    """One stage: settings plus velocity/acceleration limited motion"""
+
+    DEVICE_ID = 6110
+    FIRMWARE = 524  # 5.24
+
+    def __init__(self, address: int, velocity_unit: float, acceleration_unit: float,
+                 position: int = 0):
+        self.address = address
+        self.velocity_unit = velocity_unit
+        self.acceleration_unit = acceleration_unit
+        self.settings = dict(DEFAULT_SETTINGS)
+        self.position = float(position)  # [microsteps]
+        self.velocity = 0.0              # [microsteps/s]
+        self.target = None
+        self.constant_velocity = None
+        self.command = None  # command to answer when the motion ends
+
+    @property
+    def busy(self) -> bool:
+        return self.command is not None or self.velocity != 0
+
+    def status(self) -> int:
+        return self.command or (22 if self.constant_velocity else 0)
+
+    def start_move(self, command: int, target: float) -> None:
+        self.target = min(max(target, 0), self.settings[44])
+        self.constant_velocity = None
+        self.command = command
+
+    def start_velocity(self, data: int) -> None:
+        self.target = None
+        self.constant_velocity = data * self.velocity_unit
+        self.command = None
+
+    def stop(self) -> None:
+        self.target = None
+        self.constant_velocity = 0.0
+        self.command = 23
+
+    def step(self, dt: float):
+        """Advance the motion by dt seconds
+
+        Returns:
+            (command, position) when a move finished during this step, else None
+        """
+        if self.target is None and self.constant_velocity is None:
+            return None
+        accel = self.settings[43] * self.acceleration_unit
+        dv = accel * dt
+        if self.target is None:
+            # Velocity mode and stop: ramp towards the requested velocity
+            v_goal = self.constant_velocity
+            if abs(v_goal - self.velocity) <= dv:
+                self.velocity = v_goal
+            else:
+                self.velocity += dv if v_goal > self.velocity else -dv
+            self.position += self.velocity * dt
+            if self.position <= 0 or self.position >= self.settings[44]:
+                self.position = min(max(self.position, 0), self.settings[44])
+                self.velocity = 0.0
+            if self.velocity == 0 and v_goal == 0:
+                self.constant_velocity = None
+                return self._finish()
+            return None
+
+        v_max = max(self.settings[42] * self.velocity_unit, 1.0)
+        distance = self.target - self.position
+        direction = 1 if distance > 0 else -1
+        if self.velocity * direction < 0:
+            self.velocity += direction * dv
+        elif self.velocity ** 2 / (2 * accel) >= abs(distance):
+            # Braking; keep a minimal creep speed so the target is reached
+            self.velocity = direction * max(abs(self.velocity) - dv, dv)
+        elif abs(self.velocity) > v_max:
+            # Target speed lowered during the move
+            self.velocity = direction * max(abs(self.velocity) - dv, v_max)
+        else:
+            self.velocity = direction * min(abs(self.velocity) + dv, v_max)
+        self.position += self.velocity * dt
+        if (self.target - self.position) * direction <= 0:
+            self.position = self.target
+            self.velocity = 0.0
+            self.target = None
+            return self._finish()
+        return None
+
+    def _finish(self):
+        command, self.command = self.command, None
+        if command is None:
+            return None
+        return command, round(self.position)
+
+
+class SimulatedChain:
+    """Daisy chain of simulated axes behind one serial link.
+
+    Commands and replies each occupy the wire for the time a 6 byte packet
+    takes at `baud_rate`, one packet after the other like on the real link;
+    replies are additionally delayed by `latency`.
+    """
+
+    TICK = 0.001  # [s]
+
+    def __init__(self, axes: int = 2, latency: float = 0.0, baud_rate: int = 9600,
+                 position: int = 503937):
+        """
+        Args:
+            axes (int): number of devices in the chain
+            latency (float): extra delay of every reply [s]
+            baud_rate (int): simulated serial speed; 0 for an infinitely fast link
+            position (int): start position of every axis [data]
+        """
+        velocity_unit, acceleration_unit = units.velocity_unit(), units.acceleration_unit()
+        self.axes = {a: SimulatedAxis(a, velocity_unit, acceleration_unit, position)
+                     for a in range(1, axes + 1)}
+        self.latency = latency
+        self.packet_time = 10 * PACKET.size / baud_rate if baud_rate else 0.0
+        self.send = None  # callable(bytes) set by the transport
+
+        self._lock = threading.Lock()
+        self._replies = []  # heap of (due, sequence, packet)
+        self._sequence = 0
+        self._wire_free = 0.0
+        self._rx_free = 0.0
+        self._wakeup = threading.Condition(self._lock)
+        self._running = True
+        threading.Thread(target=self._tick, name="SimTick", daemon=True).start()
+        threading.Thread(target=self._transmit, name="SimTx", daemon=True).start()
+
+    def close(self) -> None:
+        with self._lock:
+            self._running = False
+            self._wakeup.notify()
+
+    def receive(self, packet: bytes) -> None:
+        """Handle one 6 byte command packet from the host
+
+        Blocks for the time the packet takes on the wire, so commands sent
+        back to back reach the devices one packet time apart.
+        """
+        now = time.monotonic()
+        self._rx_free = max(now, self._rx_free) + self.packet_time
+        if self._rx_free > now:
+            time.sleep(self._rx_free - now)
+        address, command, data = PACKET.unpack(packet)
+        with self._lock:
+            targets = list(self.axes.values()) if address == 0 else [self.axes.get(address)]
+            for axis in targets:
+                if axis is not None:
+                    reply = self._execute(axis, command, data)
+                    if reply is not None:
+                        self._queue_reply(axis.address, *reply)
+
+    def _execute(self, axis: SimulatedAxis, command: int, data: int):
+        """Apply a command; returns an immediate (command, data) reply or None"""
+        settings = axis.settings
+        if command == 0:  # reset
+            axis.settings = dict(DEFAULT_SETTINGS)
+            return None
+        if command == 1:  # home
+            axis.start_move(1, 0)
+            return None
+        if command == 20:  # move absolute
+            if not 0 <= data <= settings[44]:
+                return ERROR, 20
+            axis.start_move(20, data)
+            return None
+        if command == 21:  # move relative
+            target = axis.position + data
+            if abs(data) > settings[46] or not 0 <= target <= settings[44]:
+                return ERROR, 21
+            axis.start_move(21, target)
+            return None
+        if command == 22:  # move at constant speed
+            axis.start_velocity(data)
+            return 22, data
+        if command == 23:  # stop
+            axis.stop()
+            return None
+        if command == 45:  # set current position
+            axis.position = float(data)
+            return 45, data
+        if command in settings:  # set a setting
+            if command in (42, 43) and data <= 0:
+                return ERROR, command
+            settings[command] = data
+            return command, data
+        if command == 50:
+            return 50, axis.DEVICE_ID
+        if command == 51:
+            return 51, axis.FIRMWARE
+        if command == 52:
+            return 52, 120  # 12.0 V
+        if command == 53:  # return setting
+            if data == 60:
+                return 60, round(axis.position)
+            if data in settings:
+                return data, settings[data]
+            return ERROR, 53
+        if command == 54:
+            return 54, axis.status()
+        if command == 55:
+            return 55, data
+        if command == 56:
+            return 56, 0
+        if command == 60:
+            return 60, round(axis.position)
+        if command == 63:
+            return 63, 10000 + axis.address
+        return ERROR, 64
+
+    def _queue_reply(self, address: int, command: int, data: int) -> None:
+        # Caller holds the lock
+        now = time.monotonic()
+        due = max(now + self.latency, self._wire_free) + self.packet_time
+        self._wire_free = due
+        heapq.heappush(self._replies, (due, self._sequence, PACKET.pack(address, command, data)))
+        self._sequence += 1
+        self._wakeup.notify()
+
+    def _tick(self):
+        last = time.monotonic()
+        while self._running:
+            time.sleep(self.TICK)
+            now = time.monotonic()
+            with self._lock:
+                for axis in self.axes.values():
+                    done = axis.step(now - last)
+                    if done is not None:
+                        self._queue_reply(axis.address, *done)
+            last = now
+
+    def _transmit(self):
+        while True:
+            with self._lock:
+                while self._running:
+                    delay = self._replies[0][0] - time.monotonic() if self._replies else None
+                    if delay is not None and delay <= 0:
+                        break
+                    self._wakeup.wait(delay)
+                if not self._running:
+                    return
+                _, _, packet = heapq.heappop(self._replies)
+                send = self.send
+            if send is not None:
+                try:
+                    send(packet)
+                except OSError:
+                    pass
+
+
+def _feed(chain: SimulatedChain, read) -> None:
+    """Split a byte stream into packets for the chain until read() returns b''"""
+    buffer = b""
+    while True:
+        data = read()
+        if not data:
+            return
+        buffer += data
+        while len(buffer) >= PACKET.size:
+            chain.receive(buffer[:PACKET.size])
+            buffer = buffer[PACKET.size:]
+
+
+def serve_tcp(chain: SimulatedChain, host: str = "127.0.0.1", port: int = 0):
+    """Accept zaber_motion TCP connections (Connection.open_tcp) in the background
+
+    Returns:
+        int: the port actually bound
+    """
+    server = socket.socket()
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind((host, port))
+    server.listen()
+
+    def accept():
+        while True:
+            client, _ = server.accept()
+            client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            chain.send = client.sendall
+            _feed(chain, lambda: client.recv(256))
+            chain.send = None
+            client.close()
+
+    threading.Thread(target=accept, name="SimTcp", daemon=True).start()
+    return server.getsockname()[1]
+
+
+def open_pty(chain: SimulatedChain) -> str:
+    """Expose the chain on a pseudo terminal (Linux/macOS)
+
+    Returns:
+        str: device path to pass to Connection.open_serial_port
+    """
+    import pty
+    import tty
+
+    master, slave = pty.openpty()
+    tty.setraw(slave)
+    chain.send = lambda packet: os.write(master, packet)
+    threading.Thread(target=_feed, args=(chain, lambda: os.read(master, 256)),
+                     name="SimPty", daemon=True).start()
+    return os.ttyname(slave)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulated Zaber T-LSM025A chain")
+    parser.add_argument("--tcp", type=int, help="serve on this TCP port")
+    parser.add_argument("--pty", action="store_true", help="serve on a pseudo terminal")
+    parser.add_argument("--axes", type=int, default=2)
+    parser.add_argument("--latency", type=float, default=0.0, help="extra reply delay [s]")
+    parser.add_argument("--baud", type=int, default=9600)
+    args = parser.parse_args()
+
+    chain = SimulatedChain(args.axes, args.latency, args.baud)
+    if args.pty:
+        print(f"Simulator on {open_pty(chain)}")
+    else:
+        port = serve_tcp(chain, port=args.tcp or 0)
+        print(f"Simulator on tcp://127.0.0.1:{port}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        chain.close()
@@ -1,7 +1,9 @@
+import time
+
 from zaber_motion import Library, Units
 from zaber_motion.binary import *
-from pynput.mouse import Listener
-from time import sleep
+from mini_stretcher.units import mm_to_data
+from mini_stretcher.scheduler import DeadlineScheduler
 
 Library.enable_device_db_store()
 
@@ -47,27 +49,15 @@ def zero() -> None:
     
     print("POSITION: zero")
 
-def mm_to_data(length_mm: float) -> int:
-    """Convert millimeters to zaber data units
-    default microstep size: 0.047625 µm
-    position = data[micron] * (Microstep Size[micron]) 
-    """
-    return round(length_mm * 1000 / 0.047625)
-
-# def mms_to_data(speed_mms: float) -> int:
-#     """Convert millimeters per second to zaber data units
-#     default microstep size: 0.047625 µm
-#     velocity = data * (Microstep Size) / (1.6384 s) 
-#     """
-#     return round(speed_mms * 1000 / 0.047625 * 1.6384)
-
-def stretch(strain: float, strain_rate: float, pause: float) -> None:
+def stretch(strain: float, strain_rate: float, pause: float, on_move=None) -> None:
     """Stretch chamber
 
     Args:
         strain (float): target strain [%]
         strain_rate (float): strain rate [%/s]
         pause (float): time to pause before stretch [s]
+        on_move (callable): called with time.monotonic_ns() right before
+            the move commands are sent
     """
 
     chamber_end_length = Protocol.CHAMBER_LENGTH * (1 + strain / 100)
@@ -84,12 +74,12 @@ def stretch(strain: float, strain_rate: float, pause: float) -> None:
                     speed/2, 
                     Units.VELOCITY_MILLIMETRES_PER_SECOND)
 
-    for s in range(pause):
-        countdown = pause - s
-        print("Start in: ", countdown)
-        sleep(1)
+    schedule = DeadlineScheduler()
+    schedule.countdown(pause)
 
     # Send move commands
+    if on_move is not None:
+        on_move(time.monotonic_ns())
     d1.generic_command_no_response(CommandCode.MOVE_ABSOLUTE, position)
     d2.generic_command_no_response(CommandCode.MOVE_ABSOLUTE, position)
     
@@ -110,35 +100,29 @@ def current_position():
 
 # Trigger
 
-left_counter = 0
-right_counter = 0
+_triggers = None
 
-def on_click(x, y, button, pressed):
-    global left_counter
-    global right_counter
 
-    if button._name_ == "left" and not pressed:
-        left_counter += 1
-        print(f"left_counter: {left_counter}")
+def trigger(strain: float = 50, strain_rate: float = 0.5, pause: float = 10) -> None:
+    """Stretch on a triple left click; a triple right click disarms"""
+    global _triggers
+    from mini_stretcher.trigger import MouseSource, TriggerManager
+    if _triggers is None:
+        _triggers = TriggerManager([MouseSource()])
+        _triggers.on_disarm = lambda event: print("Trigger stopped")
 
-    if button._name_ == "right" and not pressed:
-        right_counter += 1
-        print(f"right_counter: {right_counter}")
+    def triggered(event):
+        print(f"Protocol LIVE ({event.dispatch_ms:.2f} ms after the click)")
 
-    if left_counter == 3:
-        left_counter = 0
-        print("Protocol LIVE")
-        stretch(strain=50, strain_rate=0.5, pause=10)
-        return False
+        def moved(t_ns):
+            # No Motors here to time the move for the TriggerManager
+            event.motion_ns = t_ns
 
-    if right_counter == 3:
-        right_counter = 0
-        print("Trigger stopped")
-        return False
+        stretch(strain=strain, strain_rate=strain_rate, pause=pause, on_move=moved)
 
+    def finished(_):
+        print(f"Trigger latency: {_triggers.latency_report()}")
 
-def trigger():
-    listener = Listener(on_click=on_click)
-    listener.start()
+    _triggers.arm(triggered, on_done=finished)
+    print("Trigger armed")
 
-    
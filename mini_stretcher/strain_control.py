@@ -0,0 +1,189 @@
+import queue
+import time
+from collections import deque
+
+import numpy as np
+
+from mini_stretcher.motion_state import MoveInterrupted
+from mini_stretcher.scheduler import DeadlineScheduler
+from mini_stretcher.units import data_to_mms, mms_to_data
+
+
+class StrainRateController:
+    """Stretches at a constant strain rate, correcting the speed from measured positions.
+
+    The open-loop speed is only as good as the velocity resolution (at the
+    0.03 mm/s default one velocity unit is ~3% of the speed per axis) and
+    the mechanics. While the ramp runs, the measured length is compared to
+    the ideal ramp L(t) = L_start + v·t and the commanded speed becomes
+
+        v_cmd = v + gain · (L_ideal(t) - L(t))
+
+    so the length error, and with it the average rate error, is driven to
+    zero. A new speed is only sent when it differs from the running one by
+    at least one velocity unit; it is applied by resending the move with
+    the new speed, which replaces the running move without stopping.
+
+    The report is computed from running sums, so a ramp of any length runs
+    in constant memory; only the last HISTORY samples are kept.
+    """
+
+    BRAKE_MARGIN = 1.0  # [s] of travel before the target without corrections
+    HISTORY = 3000  # samples kept in `samples`
+
+    def __init__(self, motors, l0: float, gain: float = 1.0, tolerance: float = 0.02,
+                 max_correction: float = 0.5, rate: float = 20):
+        """
+        Args:
+            motors (Motors): connected motors
+            l0 (float): reference length of the strain [mm]
+            gain (float): length error to speed correction [1/s]
+            tolerance (float): allowed relative strain rate error
+            max_correction (float): limit of the speed correction, relative to v
+            rate (float): position reads per second when no sampler is used
+        """
+        self.motors = motors
+        self.l0 = l0
+        self.gain = gain
+        self.tolerance = tolerance
+        self.max_correction = max_correction
+        self.rate = rate
+        self.strain_rate = None  # [%/s] of the last run
+        self.samples = deque(maxlen=self.HISTORY)  # (t [s], length [mm], ideal length [mm], commanded speed [mm/s])
+        self.corrections = 0
+        self._all = _RampFit()
+        self._ramp = _RampFit()  # middle 80% of the ramp
+
+    def run(self, target_length: float, strain_rate: float, sampler=None, scheduler: DeadlineScheduler = None,
+            timeout: float = None) -> dict:
+        """Ramp to target_length at strain_rate [%/s] relative to l0
+
+        Args:
+            sampler (PositionSampler): take positions from its listeners instead
+                of reading them here, so the link isn't queried twice
+            scheduler (DeadlineScheduler): e.g. MotionWorker.scheduler(); its
+                cancel event interrupts the run, and it times the reads when no
+                sampler is given
+
+        Returns:
+            dict: see report()
+        """
+        speed = strain_rate / 100 * self.l0
+        start_length = self.motors.length_from_positions(*self.motors.get_positions())
+        direction = 1 if target_length >= start_length else -1
+        duration = abs(target_length - start_length) / speed
+        timeout = timeout or 2 * duration + 10
+        self.samples = deque(maxlen=self.HISTORY)
+        self._all = _RampFit()
+        self._ramp = _RampFit()
+        self.corrections = 0
+        self.strain_rate = strain_rate
+
+        samples = queue.Queue()
+        if sampler is not None:
+            def listener(t_ns, pos1, pos2):
+                samples.put((t_ns, pos1, pos2))
+            sampler.listeners.append(listener)
+        schedule = scheduler or DeadlineScheduler()
+
+        handle = self.motors.move_absolute_distance(target_length, speed)
+        t0_ns = handle.start_ns
+        command = mms_to_data(speed / 2)
+        try:
+            while not self._finished(handle):
+                if schedule.cancel.is_set():
+                    raise schedule.cancelled("Command cancelled")
+                if time.monotonic_ns() - t0_ns > timeout * 1e9:
+                    raise TimeoutError(f"Strain ramp did not finish within {timeout:.0f} s")
+                if sampler is None:
+                    schedule.wait(1 / self.rate)
+                    t_ns = time.monotonic_ns()
+                    pos1, pos2 = self.motors.get_positions()
+                    t_ns = (t_ns + time.monotonic_ns()) // 2
+                else:
+                    try:
+                        t_ns, pos1, pos2 = samples.get(timeout=0.1)
+                    except queue.Empty:
+                        continue
+                t = (t_ns - t0_ns) / 1e9
+                length = self.motors.length_from_positions(pos1, pos2)
+                ideal = start_length + direction * speed * min(t, duration)
+                # No corrections while braking into the target
+                if direction * (target_length - length) > speed * self.BRAKE_MARGIN:
+                    wanted = speed + direction * self.gain * (ideal - length)
+                    wanted = min(max(wanted, speed * (1 - self.max_correction)), speed * (1 + self.max_correction))
+                    new_command = mms_to_data(wanted / 2)
+                    if new_command != command and new_command > 0:
+                        command = new_command
+                        handle = self.motors.move_absolute_distance(target_length, data_to_mms(command) * 2)
+                        self.corrections += 1
+                self.samples.append((t, length, ideal, data_to_mms(command) * 2))
+                self._all.add(t, length, ideal)
+                if duration and 0.1 < t / duration < 0.9:
+                    self._ramp.add(t, length, ideal)
+        finally:
+            if sampler is not None:
+                sampler.listeners.remove(listener)
+        if handle.stopped:
+            raise InterruptedError("Strain ramp stopped")
+        return self.report()
+
+    def report(self) -> dict:
+        """Tracking of the middle 80% of the ramp: achieved vs commanded strain rate"""
+        if self._all.n < 3:
+            return {"samples": self._all.n}
+        ramp = self._ramp if self._ramp.n >= 3 else self._all
+        achieved = abs(ramp.slope()) / self.l0 * 100
+        rate_error = (achieved - self.strain_rate) / self.strain_rate
+        return {
+            "samples": self._all.n,
+            "corrections": self.corrections,
+            "commanded_strain_rate": self.strain_rate,
+            "achieved_strain_rate": achieved,
+            "rate_error": rate_error,
+            "within_tolerance": abs(rate_error) <= self.tolerance,
+            "rms_length_error_mm": float(np.sqrt(ramp.squared_error / ramp.n)),
+            "max_length_error_mm": float(ramp.max_error),
+        }
+
+    @staticmethod
+    def _finished(handle) -> bool:
+        if not handle.done():
+            return False
+        try:
+            handle.result()
+        except MoveInterrupted:
+            return False  # replaced by our own correction; the new handle is tracked
+        return True
+
+
+class _RampFit:
+    """Running least-squares line through (t, length) and the error against the ideal length
+
+    Means and co-moments are updated incrementally (Welford), which stays
+    accurate over hours of samples where plain sums of t² would not.
+    """
+
+    def __init__(self):
+        self.n = 0
+        self.mean_t = 0.0
+        self.mean_length = 0.0
+        self.var_t = 0.0       # sum of (t - mean_t)²
+        self.cov = 0.0         # sum of (t - mean_t)(length - mean_length)
+        self.squared_error = 0.0
+        self.max_error = 0.0
+
+    def add(self, t: float, length: float, ideal: float) -> None:
+        self.n += 1
+        dt = t - self.mean_t
+        self.mean_t += dt / self.n
+        self.mean_length += (length - self.mean_length) / self.n
+        self.var_t += dt * (t - self.mean_t)
+        self.cov += dt * (length - self.mean_length)
+        error = length - ideal
+        self.squared_error += error * error
+        self.max_error = max(self.max_error, abs(error))
+
+    def slope(self) -> float:
+        """[mm/s], as np.polyfit(t, length, 1)[0]"""
+        return self.cov / self.var_t if self.var_t else 0.0
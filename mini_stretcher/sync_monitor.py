@@ -0,0 +1,149 @@
+import json
+from collections import Counter, deque
+
+import numpy as np
+
+from mini_stretcher.units import data_to_mm, velocity_unit
+
+
+class SyncMonitor:
+    """Watches the position skew between the two axes and optionally trims it.
+
+    Both axes get the same targets, so device1 - device2 should stay zero;
+    any skew shifts the sample centre by half of it, out of the microscope
+    field. Fed by PositionSampler.listeners. When the skew exceeds
+    `threshold` on_alarm is called once per excursion. With `trim` set, the
+    lagging axis gets a faster speed during a move until the skew is back
+    within a quarter of the threshold.
+
+    Statistics are kept as running sums and a histogram of the skew, so a
+    monitor can run for days; only the last HISTORY samples are kept.
+
+    Trims go through Motors.retarget() from the sampler thread, not through
+    the MotionWorker, which is blocked in the running protocol. That is only
+    safe while the trimmed move is the only motion command in flight: a
+    single move sent through Motors. CycleEngine half cycles keep the
+    current speed, so they carry none and are never trimmed; don't trim
+    runs that change the speed themselves, like StrainRateController.
+    """
+
+    TRIM_INTERVAL = 0.2  # [s] between speed changes
+    HISTORY = 3000  # samples kept in `samples`, a minute at 50 Hz
+
+    def __init__(self, motors, threshold: float = 0.01, on_alarm=None, trim: bool = False, trim_gain: float = 2.0):
+        """
+        Args:
+            motors (Motors): connected motors
+            threshold (float): skew alarm threshold [mm]
+            on_alarm (callable): called as on_alarm(t_ns, skew_mm) on the sampler thread
+            trim (bool): speed up the lagging axis to remove skew
+            trim_gain (float): skew to extra speed [1/s]
+        """
+        self.motors = motors
+        self.threshold = threshold
+        self.on_alarm = on_alarm
+        self.trim = trim
+        self.trim_gain = trim_gain
+        self.samples = deque(maxlen=self.HISTORY)  # (t_ns, skew [data], moving)
+        self._all = _SkewStats()
+        self._moving = _SkewStats()
+        self.alarms = []  # (t_ns, skew [mm])
+        self.trims = 0
+        self._alarmed = False
+        self._trimmed = None  # trimmed device
+        self._last_trim_ns = 0
+
+    def feed(self, t_ns: int, pos1: int, pos2: int) -> None:
+        """Signature matches PositionSampler.listeners"""
+        skew = pos1 - pos2
+        moving = self.motors.state in ("moving", "homing")
+        self.samples.append((t_ns, skew, moving))
+        self._all.add(skew)
+        if moving:
+            self._moving.add(skew)
+        skew_mm = data_to_mm(skew)
+        if abs(skew_mm) > self.threshold and not self._alarmed:
+            self._alarmed = True
+            self.alarms.append((t_ns, skew_mm))
+            if self.on_alarm is not None:
+                self.on_alarm(t_ns, skew_mm)
+        elif abs(skew_mm) < self.threshold / 2:
+            self._alarmed = False
+        if self.trim and moving:
+            self._trim(t_ns, pos1, pos2, skew_mm)
+        elif not moving:
+            self._trimmed = None
+
+    def stats(self) -> dict:
+        """Skew statistics [mm], overall and while moving"""
+        if not self._all.n:
+            return {"samples": 0}
+        result = {"samples": self._all.n, "threshold_mm": self.threshold, "alarms": len(self.alarms),
+                  "trims": self.trims, "all": self._all.stats()}
+        if self._moving.n:
+            result["moving"] = self._moving.stats()
+        return result
+
+    def save(self, path: str) -> None:
+        """Write stats() as JSON"""
+        with open(path, "w") as f:
+            json.dump(dict(self.stats(), alarm_times_ns=[t for t, _ in self.alarms]), f, indent=2)
+
+    def _trim(self, t_ns, pos1, pos2, skew_mm):
+        handle = self.motors.tracker.current
+        if handle is None or handle.done() or handle.kind != "move_absolute" or handle.speed is None:
+            return
+        if t_ns - self._last_trim_ns < self.TRIM_INTERVAL * 1e9:
+            return
+        devices = (self.motors.device1, self.motors.device2)
+        remaining = (abs(handle.target - pos1), abs(handle.target - pos2))
+        lagging = 0 if remaining[0] > remaining[1] else 1
+        if abs(skew_mm) > self.threshold / 2:
+            speed = handle.speed + self.trim_gain * abs(pos1 - pos2)  # [data/s]
+            device = devices[lagging]
+        elif self._trimmed is not None and abs(skew_mm) < self.threshold / 4:
+            speed, device = handle.speed, self._trimmed
+        else:
+            return
+        if self._trimmed is not None and self._trimmed is not device:
+            self.motors.retarget(self._trimmed, round(handle.speed / velocity_unit()))
+        self.motors.retarget(device, round(speed / velocity_unit()))
+        self._trimmed = device if speed != handle.speed else None
+        self._last_trim_ns = t_ns
+        self.trims += 1
+
+
+class _SkewStats:
+    """Running mean/RMS/max of the skew; a histogram of |skew| [data] gives the percentile"""
+
+    def __init__(self):
+        self.n = 0
+        self.total = 0
+        self.squares = 0
+        self.histogram = Counter()  # |skew| -> samples; a few hundred distinct values at most
+
+    def add(self, skew: int) -> None:
+        self.n += 1
+        self.total += skew
+        self.squares += skew * skew
+        self.histogram[abs(skew)] += 1
+
+    def stats(self) -> dict:
+        return {
+            "mean_mm": float(data_to_mm(self.total / self.n)),
+            "rms_mm": float(data_to_mm(np.sqrt(self.squares / self.n))),
+            "max_abs_mm": float(data_to_mm(max(self.histogram))),
+            "p95_abs_mm": float(data_to_mm(self.percentile(95))),
+        }
+
+    def percentile(self, q: float) -> float:
+        """np.percentile() of |skew| [data], with the same linear interpolation"""
+        values = np.array(sorted(self.histogram))
+        ends = np.cumsum([self.histogram[v] for v in values])  # sorted rank after each value
+
+        def ranked(k):
+            return values[np.searchsorted(ends, k, side="right")]
+
+        h = (self.n - 1) * q / 100
+        low = int(h)
+        return ranked(low) + (h - low) * (ranked(min(low + 1, self.n - 1)) - ranked(low))
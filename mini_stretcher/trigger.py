@@ -1,34 +1,297 @@
-from pynput.mouse import Listener
-from zaber_stuff import stretch
+"""Start protocols from external events: clicks, key presses, UDP packets, TTL.
 
-left_counter = 0
-right_counter = 0
+    triggers = TriggerManager([MouseSource(), UdpSource(5005)], worker=worker)
+    triggers.start()
+    triggers.arm(lambda event: motors.move_absolute_distance(14, 0.03))
 
-def on_click(x, y, button, pressed):
-    global left_counter
-    global right_counter
+Every source runs one long-lived listener thread that is started once and
+reused for every arm. Its callback only stamps the event with
+time.monotonic_ns() and hands the action to the motion worker, so the OS
+input hook or socket is never blocked by a protocol.
+"""
+import socket
+import threading
+import time
+from dataclasses import dataclass
 
-    if button._name_ == "left" and not pressed:
-        left_counter += 1
-        print(f"left_counter: {left_counter}")
 
-    if button._name_ == "right" and not pressed:
-        right_counter += 1
-        print(f"right_counter: {right_counter}")
+@dataclass
+class TriggerEvent:
+    source: str
+    name: str      # "trigger" or "disarm"
+    t_ns: int      # time.monotonic_ns() when the source saw the event
+    dispatch_ns: int = None  # action started on the worker
+    motion_ns: int = None    # first motion command sent afterwards
 
-    if left_counter == 3:
-        left_counter = 0
-        print("Protocol LIVE")
-        stretch(strain=50, strain_rate=0.5, pause=10)
-        return False
+    @property
+    def dispatch_ms(self):
+        return None if self.dispatch_ns is None else (self.dispatch_ns - self.t_ns) / 1e6
 
-    if right_counter == 3:
-        right_counter = 0
-        print("Trigger stopped")
-        return False
+    @property
+    def motion_ms(self):
+        return None if self.motion_ns is None else (self.motion_ns - self.t_ns) / 1e6
 
 
-def trigger():
-    listener = Listener(on_click=on_click)
-    listener.start()
+class TriggerSource:
+    """Base class; subclasses call self.emit(name) from their listener thread"""
 
+    name = "source"
+
+    def start(self, emit) -> None:
+        self.emit = emit
+
+    def stop(self) -> None:
+        pass
+
+
+class MouseSource(TriggerSource):
+    """`clicks` releases of `button` within `window` seconds trigger, the same on `cancel_button` disarms"""
+
+    name = "mouse"
+
+    def __init__(self, button: str = "left", cancel_button: str = "right", clicks: int = 3, window: float = 2):
+        self.button = button
+        self.cancel_button = cancel_button
+        self.clicks = clicks
+        self.window = window
+        self._clicks = {}  # button name -> release times
+
+    def start(self, emit) -> None:
+        from pynput.mouse import Listener
+        self.emit = emit
+        self._listener = Listener(on_click=self._on_click)
+        self._listener.start()
+
+    def stop(self) -> None:
+        self._listener.stop()
+
+    def reset(self) -> None:
+        self._clicks = {}
+
+    def _on_click(self, x, y, button, pressed):
+        if pressed or button.name not in (self.button, self.cancel_button):
+            return
+        now = time.monotonic()
+        times = [t for t in self._clicks.get(button.name, []) if now - t < self.window] + [now]
+        if len(times) < self.clicks:
+            self._clicks[button.name] = times
+            return
+        self._clicks[button.name] = []
+        self.emit("trigger" if button.name == self.button else "disarm")
+
+
+class KeyboardSource(TriggerSource):
+    """A key press triggers, e.g. a foot pedal that sends F9"""
+
+    name = "keyboard"
+
+    def __init__(self, key: str = "f9", cancel_key: str = "esc"):
+        self.key = key
+        self.cancel_key = cancel_key
+
+    def start(self, emit) -> None:
+        from pynput.keyboard import Listener
+        self.emit = emit
+        self._listener = Listener(on_press=self._on_press)
+        self._listener.start()
+
+    def stop(self) -> None:
+        self._listener.stop()
+
+    def _on_press(self, key):
+        name = getattr(key, "name", None) or getattr(key, "char", None)
+        if name == self.key:
+            self.emit("trigger")
+        elif name == self.cancel_key:
+            self.emit("disarm")
+
+
+class UdpSource(TriggerSource):
+    """A datagram on a local port triggers, e.g. sent by the acquisition software
+
+    The payload is the event name; an empty payload means "trigger".
+
+        echo -n trigger | nc -u -w0 127.0.0.1 5005
+    """
+
+    name = "udp"
+
+    def __init__(self, port: int = 5005, host: str = "127.0.0.1"):
+        self.port = port
+        self.host = host
+
+    def start(self, emit) -> None:
+        self.emit = emit
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._socket.bind((self.host, self.port))
+        self.port = self._socket.getsockname()[1]
+        threading.Thread(target=self._receive, name="UdpTrigger", daemon=True).start()
+
+    def stop(self) -> None:
+        self._socket.close()
+
+    def _receive(self):
+        while True:
+            try:
+                data = self._socket.recv(64)
+            except OSError:
+                return
+            self.emit(data.decode(errors="replace").strip() or "trigger")
+
+
+class SerialSource(TriggerSource):
+    """A rising edge on a modem status line of a serial port triggers
+
+    TTL outputs of cameras and DAQ cards can drive CTS, DSR, RI or CD
+    through a USB-serial adapter. The line is polled, so the timestamp is
+    accurate to about `poll_interval`. Needs pyserial.
+    """
+
+    name = "serial"
+
+    def __init__(self, port: str, line: str = "cts", poll_interval: float = 0.0002):
+        self.port = port
+        self.line = line
+        self.poll_interval = poll_interval
+        self._stopped = threading.Event()
+
+    def start(self, emit) -> None:
+        import serial
+        self.emit = emit
+        # A fresh event per start, so a restart works while the last poll thread is still winding down
+        self._stopped = threading.Event()
+        port = serial.Serial(self.port)
+        threading.Thread(target=self._poll, args=(port, self._stopped), name="SerialTrigger", daemon=True).start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+    def _poll(self, port, stopped):
+        last = getattr(port, self.line)
+        while not stopped.wait(self.poll_interval):
+            state = getattr(port, self.line)
+            if state and not last:
+                self.emit("trigger")
+            last = state
+        port.close()
+
+
+class TriggerManager:
+    """Routes trigger events from all sources to one armed action.
+
+    arm() sets the action, the first "trigger" event afterwards runs it once
+    on the motion worker (or on a new thread without a worker) and disarms.
+    Events seen while disarmed are ignored. The latency from the event to
+    the action starting and to the first motion command is kept per event.
+    """
+
+    def __init__(self, sources, worker=None, motors=None):
+        """
+        Args:
+            sources (list[TriggerSource]): event sources, started by start()
+            worker (MotionWorker): runs the armed action
+            motors (Motors): its move_listeners time the first motion
+                command after a trigger; defaults to worker.motors
+        """
+        self.sources = list(sources)
+        self.worker = worker
+        self.motors = motors or getattr(worker, "motors", None)
+        self.events = []  # every TriggerEvent that ran an action
+        self.on_disarm = None  # called with the event when a source disarms
+        self._action = None
+        self._lock = threading.Lock()
+        self._started = False
+
+    @property
+    def armed(self) -> bool:
+        return self._action is not None
+
+    def start(self) -> None:
+        """Start every source's listener; later calls do nothing"""
+        if self._started:
+            return
+        for source in self.sources:
+            source.start(lambda name, source=source: self._on_event(source, name))
+        self._started = True
+
+    def stop(self) -> None:
+        self.disarm()
+        if not self._started:
+            return
+        for source in self.sources:
+            source.stop()
+        self._started = False
+
+    def arm(self, action, on_done=None, on_error=print) -> None:
+        """Run action(event) once on the next trigger
+
+        Args:
+            on_done (callable): called with the action's return value
+            on_error (callable): called with the exception if the action fails;
+                both on the Tk thread when the worker has one
+        """
+        self.start()
+        for source in self.sources:
+            if hasattr(source, "reset"):
+                source.reset()
+        with self._lock:
+            self._action = (action, on_done, on_error)
+
+    def disarm(self) -> None:
+        with self._lock:
+            self._action = None
+
+    def latency_report(self) -> dict:
+        """Trigger-to-dispatch and trigger-to-first-motion latency [ms]"""
+        report = {}
+        for key in ("dispatch_ms", "motion_ms"):
+            values = [getattr(e, key) for e in self.events if getattr(e, key) is not None]
+            if values:
+                report[key] = {"n": len(values), "mean": sum(values) / len(values),
+                               "min": min(values), "max": max(values)}
+        return report
+
+    def _on_event(self, source, name):
+        # Runs on the source's listener thread: stamp, hand off, return
+        t_ns = time.monotonic_ns()
+        with self._lock:
+            action, self._action = self._action, None
+        if action is None:
+            return
+        event = TriggerEvent(source.name, name, t_ns)
+        if name != "trigger":
+            if self.on_disarm is not None:
+                self.on_disarm(event)
+            return
+        self.events.append(event)
+        action, on_done, on_error = action
+        if self.worker is not None:
+            self.worker.submit(self._run, action, event, on_done=on_done, on_error=on_error)
+        else:
+            threading.Thread(target=self._run_callbacks, args=(action, event, on_done, on_error),
+                             daemon=True).start()
+
+    def _run_callbacks(self, action, event, on_done, on_error):
+        try:
+            result = self._run(action, event)
+        except Exception as e:
+            if on_error is not None:
+                on_error(e)
+            return
+        if on_done is not None:
+            on_done(result)
+
+    def _run(self, action, event):
+        event.dispatch_ns = time.monotonic_ns()
+        if self.motors is None:
+            return action(event)
+
+        def moved(t_ns, handle):
+            if event.motion_ns is None and handle.kind != "stop":
+                event.motion_ns = t_ns
+
+        self.motors.move_listeners.append(moved)
+        try:
+            return action(event)
+        finally:
+            self.motors.move_listeners.remove(moved)
@@ -0,0 +1,100 @@
+"""Conversions between millimetres and Zaber data units.
+
+The scale factors come from the conversion table of the cached device DB
+entry of the T-LSM025A, not from hard-coded constants. All functions take
+scalars or NumPy arrays; scalars give back plain ints/floats, arrays are
+converted in one vectorized call.
+"""
+import functools
+import glob
+import json
+import os
+
+import numpy as np
+
+DEVICE_DB_DIR = os.path.dirname(__file__) + "/../zaber_device_db"
+DEVICE_ID = 6110  # T-LSM025A
+# Factory default microsteps per step (setting 37). Every conversion below
+# assumes it; Motors.connect() checks the devices with
+# check_microstep_resolution()
+MICROSTEP_RESOLUTION = 64
+
+
+@functools.lru_cache(maxsize=None)
+def conversion_table(device_id: int = DEVICE_ID) -> dict:
+    """Scale per dimension name ("Length", "Velocity", ...) from the device DB"""
+    paths = glob.glob(f"{DEVICE_DB_DIR}/*_dev{device_id}_*binary.json")
+    if not paths:
+        raise FileNotFoundError(f"No cached device DB entry for device {device_id} in {DEVICE_DB_DIR}")
+    with open(paths[0]) as f:
+        rows = json.load(f)["conversion_table"]["rows"]
+    return {row["dimension_name"]: row["scale"] for row in rows}
+
+
+def check_microstep_resolution(resolutions) -> None:
+    """Raise ValueError unless every device runs at MICROSTEP_RESOLUTION
+
+    Args:
+        resolutions (iterable[int]): setting 37 read from each device
+    """
+    for resolution in resolutions:
+        if resolution != MICROSTEP_RESOLUTION:
+            raise ValueError(f"Microstep resolution is {resolution}, the conversions assume "
+                             f"{MICROSTEP_RESOLUTION}; reset setting 37 on the device")
+
+
+def data_per_unit(dimension: str) -> float:
+    """Data units per mm, mm/s or mm/s²"""
+    return conversion_table()[dimension] * MICROSTEP_RESOLUTION / 1000
+
+
+def velocity_unit() -> float:
+    """Microsteps/s per velocity data unit (T-series: 9.375)"""
+    table = conversion_table()
+    return table["Length"] / table["Velocity"]
+
+
+def acceleration_unit() -> float:
+    """Microsteps/s² per acceleration data unit (T-series: 11250)"""
+    table = conversion_table()
+    return table["Length"] / table["Acceleration"]
+
+
+def _to_data(value, dimension):
+    data = np.rint(np.asarray(value) * data_per_unit(dimension))
+    return int(data) if data.ndim == 0 else data.astype(np.int64)
+
+
+def _from_data(data, dimension):
+    value = np.asarray(data) / data_per_unit(dimension)
+    return float(value) if value.ndim == 0 else value
+
+
+def mm_to_data(length_mm):
+    """Convert millimetres to position data units"""
+    return _to_data(length_mm, "Length")
+
+
+def data_to_mm(data):
+    """Convert position data units to millimetres"""
+    return _from_data(data, "Length")
+
+
+def mms_to_data(speed_mms):
+    """Convert millimetres per second to velocity data units"""
+    return _to_data(speed_mms, "Velocity")
+
+
+def data_to_mms(data):
+    """Convert velocity data units to millimetres per second"""
+    return _from_data(data, "Velocity")
+
+
+def mms2_to_data(acceleration_mms2):
+    """Convert millimetres per second² to acceleration data units"""
+    return _to_data(acceleration_mms2, "Acceleration")
+
+
+def data_to_mms2(data):
+    """Convert acceleration data units to millimetres per second²"""
+    return _from_data(data, "Acceleration")
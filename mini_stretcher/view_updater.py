@@ -0,0 +1,63 @@
+import threading
+
+_UNSET = object()
+
+
+class ViewUpdater:
+    """Applies model state to widgets once per frame, and only what changed.
+
+    Views are bound to a key. Values arrive either from set(), callable from
+    any thread where the latest value per key wins, or from a source that
+    is polled on the Tk thread every frame. A view is only called when its
+    value differs from the one it shows, so an idle window costs a few
+    comparisons per frame and no redraws.
+
+        view = ViewUpdater(app)
+        view.bind("state", lambda text: label.configure(text=text), source=lambda: motors.state)
+        view.set("state", "moving")  # from any thread
+    """
+
+    FRAME_INTERVAL = 40  # [ms]
+
+    def __init__(self, master):
+        self.master = master
+        self.frames = 0
+        self.applied = 0  # view calls so far
+        self._views = {}  # key -> apply(value)
+        self._sources = {}  # key -> source()
+        self._shown = {}  # key -> value the view shows
+        self._pending = {}
+        self._lock = threading.Lock()
+        self.master.after(self.FRAME_INTERVAL, self._frame)
+
+    def bind(self, key: str, apply, source=None) -> None:
+        """Call apply(value) on the Tk thread whenever the value of `key` changes
+
+        Args:
+            apply (callable): updates the widget
+            source (callable): polled every frame for the current value
+        """
+        self._views[key] = apply
+        if source is not None:
+            self._sources[key] = source
+
+    def set(self, key: str, value) -> None:
+        """Publish a new value; shown on the next frame if it changed"""
+        with self._lock:
+            self._pending[key] = value
+
+    def _frame(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for key, source in self._sources.items():
+            try:
+                pending[key] = source()
+            except Exception as e:
+                print(f"View source {key}: {e}")
+        for key, value in pending.items():
+            if key in self._views and self._shown.get(key, _UNSET) != value:
+                self._views[key](value)
+                self._shown[key] = value
+                self.applied += 1
+        self.frames += 1
+        self.master.after(self.FRAME_INTERVAL, self._frame)
@@ -0,0 +1,151 @@
+import threading
+import time
+
+import numpy as np
+from zaber_motion.binary import CommandCode
+
+from mini_stretcher import units
+
+
+def ramp_hold(strain: float, ramp_time: float, hold_time: float):
+    """Strain function: linear ramp to `strain` [%], then hold"""
+    def f(t):
+        return strain * np.clip(t / ramp_time, 0, 1)
+    f.duration = ramp_time + hold_time
+    return f
+
+
+def sine(amplitude: float, frequency: float, cycles: int = 1):
+    """Strain function: 0 -> amplitude [%] -> 0 following a cosine, `cycles` times"""
+    def f(t):
+        return amplitude / 2 * (1 - np.cos(2 * np.pi * frequency * t))
+    f.duration = cycles / frequency
+    return f
+
+
+def triangle(amplitude: float, frequency: float, cycles: int = 1):
+    """Strain function: linear 0 -> amplitude [%] -> 0, `cycles` times"""
+    def f(t):
+        phase = (t * frequency) % 1
+        return amplitude * (1 - np.abs(2 * phase - 1))
+    f.duration = cycles / frequency
+    return f
+
+
+class Trajectory:
+    """Dense axis position/velocity samples of a strain waveform.
+
+    Both axes follow the same trajectory; positions are in data units and
+    computed the same way as Motors.move_absolute_distance.
+    """
+
+    def __init__(self, t, strain, position):
+        self.t = t                # [s]
+        self.strain = strain      # [%]
+        self.position = position  # [data]
+        self.velocity = np.gradient(position.astype(float), t)  # [data/s]
+
+    @classmethod
+    def from_strain(cls, strain_fn, l0: float, zero_position: int, zero_length: float,
+                    duration: float = None, dt: float = 0.001):
+        """Sample a strain function of time
+
+        Args:
+            strain_fn (callable): strain [%] as a function of a time array [s]
+            l0 (float): reference length of the strain [mm]
+            zero_position (int): axis position at `zero_length` [data]
+            zero_length (float): chamber length at `zero_position` [mm]
+            duration (float): [s]; defaults to strain_fn.duration
+            dt (float): sample interval [s]
+        """
+        duration = duration or strain_fn.duration
+        t = np.arange(0, duration + dt / 2, dt)
+        strain = strain_fn(t)
+        length = l0 * (1 + strain / 100)
+        position = zero_position - units.mm_to_data((length - zero_length) / 2)
+        return cls(t, strain, position)
+
+    def segments(self, segment_time: float):
+        """Split into constant-speed moves
+
+        Returns:
+            (start_times, end_positions, speeds): start time of each segment
+            [s], its end position [data] and the speed that gets there on
+            time [speed data units]
+        """
+        step = max(int(round(segment_time / (self.t[1] - self.t[0]))), 1)
+        idx = np.arange(0, len(self.t), step)
+        if idx[-1] != len(self.t) - 1:
+            idx = np.append(idx, len(self.t) - 1)
+        start_times = self.t[idx[:-1]]
+        end_positions = self.position[idx[1:]]
+        velocity = np.abs(np.diff(self.position[idx])) / np.diff(self.t[idx])
+        speeds = np.maximum(np.rint(velocity / units.velocity_unit()), 1).astype(np.int64)
+        return start_times, end_positions, speeds
+
+
+class TrajectoryStreamer:
+    """Streams a precomputed trajectory to both axes as back-to-back moves.
+
+    Every segment is a broadcast speed + MOVE_ABSOLUTE sent `lookahead`
+    seconds before the segment starts, so it reaches the devices while the
+    previous move is still running and the stage never stops in between.
+    A new MOVE_ABSOLUTE replaces the running one on the fly, so no reply
+    has to be awaited between segments.
+
+    Given the Motors, segments are sent through Motors.move_to() so the
+    tracker and the move listeners follow the trajectory.
+    """
+
+    def __init__(self, connection, segment_time: float = 0.05, lookahead: float = 0.02, motors=None):
+        """
+        Args:
+            connection (Connection): open binary connection
+            segment_time (float): duration of one streamed move [s]
+            lookahead (float): how early each segment is sent [s]; at least
+                the time two packets take on the link (12.5 ms at 9600 baud)
+            motors (Motors): send the segments through these instead of the bare connection
+        """
+        self.connection = connection
+        self.motors = motors
+        self.segment_time = segment_time
+        self.lookahead = lookahead
+        self.send_errors = []  # [s] actual - planned send time per segment
+        self._cancelled = threading.Event()
+
+    def run(self, trajectory: Trajectory) -> dict:
+        """Stream a trajectory; blocks until the last segment has been sent
+
+        Returns:
+            dict: send timing error statistics [ms]
+        """
+        start_times, end_positions, speeds = trajectory.segments(self.segment_time)
+        # Plain Python ints, so the loop does no numpy work between deadlines
+        plan = list(zip((start_times - self.lookahead).tolist(), end_positions.tolist(), speeds.tolist()))
+        self._cancelled.clear()
+        self.send_errors = []
+        t0 = time.monotonic() + self.lookahead
+        last_speed = None
+        for send_at, position, speed in plan:
+            deadline = t0 + send_at
+            if self._cancelled.wait(max(deadline - time.monotonic(), 0)):
+                break
+            self.send_errors.append(time.monotonic() - deadline)
+            if self.motors is not None:
+                self.motors.move_to(position, speed if speed != last_speed else None)
+                last_speed = speed
+                continue
+            if speed != last_speed:
+                self.connection.generic_command_no_response(0, CommandCode.SET_TARGET_SPEED, speed)
+                last_speed = speed
+            self.connection.generic_command_no_response(0, CommandCode.MOVE_ABSOLUTE, position)
+        errors = np.array(self.send_errors) * 1000
+        return {
+            "segments": len(errors),
+            "mean_ms": float(errors.mean()) if len(errors) else None,
+            "max_ms": float(errors.max()) if len(errors) else None,
+        }
+
+    def cancel(self) -> None:
+        """Stop streaming; the last sent move still completes"""
+        self._cancelled.set()
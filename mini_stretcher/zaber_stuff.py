@@ -1,6 +1,7 @@
 from zaber_motion import Library, Units
 from zaber_motion.binary import *
-from time import sleep
+from mini_stretcher.units import mm_to_data
+from mini_stretcher.scheduler import DeadlineScheduler
 
 Library.enable_device_db_store()
 
@@ -41,20 +42,6 @@ def zero() -> None:
     
     print("POSITION: zero")
 
-def mm_to_data(length_mm: float) -> int:
-    """Convert millimeters to zaber data units
-    default microstep size: 0.047625 µm
-    position = data[micron] * (Microstep Size[micron]) 
-    """
-    return round(length_mm * 1000 / 0.047625)
-
-# def mms_to_data(speed_mms: float) -> int:
-#     """Convert millimeters per second to zaber data units
-#     default microstep size: 0.047625 µm
-#     velocity = data * (Microstep Size) / (1.6384 s) 
-#     """
-#     return round(speed_mms * 1000 / 0.047625 * 1.6384)
-
 def stretch(strain: float, strain_rate: float, pause: float) -> None:
     """Stretch chamber
 
@@ -74,10 +61,8 @@ def stretch(strain: float, strain_rate: float, pause: float) -> None:
     d1.settings.set(BinarySettings.TARGET_SPEED, speed, Units.VELOCITY_MILLIMETRES_PER_SECOND)
     d2.settings.set(BinarySettings.TARGET_SPEED, speed, Units.VELOCITY_MILLIMETRES_PER_SECOND)
 
-    for s in range(pause):
-        countdown = pause - s
-        print("Start in: ", countdown)
-        sleep(1)
+    schedule = DeadlineScheduler()
+    schedule.countdown(pause)
 
     # Send move commands
     d1.generic_command_no_response(CommandCode.MOVE_ABSOLUTE, position)
@@ -1,9 +1,14 @@
-from zaber_motion import Library, Units
-from zaber_motion.binary import *
-from pynput.mouse import Listener
 import time
 
-Library.enable_device_db_store()
+STARTED = time.perf_counter()
+
+import sys
+
+from mini_stretcher.scheduler import DeadlineScheduler
+from mini_stretcher.units import data_to_mm, mm_to_data
+
+# zaber_motion (~0.5 s, native library) is imported by start() and pynput
+# by trigger(), so importing this module for a quick command stays fast
 
 class Protocol():
     DEFAULT_SPEED = 5  # [mm/s]
@@ -13,8 +18,19 @@ class Protocol():
     DEFAULT_STRAIN_RATE = 0.5  # [%/s]
 
 
+def _load_zaber() -> None:
+    """Import zaber_motion into this module's namespace on first use"""
+    global Library, Units, Connection, CommandCode, BinarySettings
+    if "Connection" in globals():
+        return
+    from zaber_motion import Library, Units
+    from zaber_motion.binary import BinarySettings, CommandCode, Connection
+    Library.enable_device_db_store()
+
+
 def start(port="COM3") -> None:
     """Open connection to motors"""
+    _load_zaber()
     global con1
     con1 = Connection.open_serial_port(port)
     global d1, d2
@@ -48,27 +64,15 @@ def zero() -> None:
     
     print("POSITION: zero")
 
-def mm_to_data(length_mm: float) -> int:
-    """Convert millimeters to zaber data units
-    default microstep size: 0.047625 µm
-    position = data[micron] * (Microstep Size[micron]) 
-    """
-    return round(length_mm * 1000 / 0.047625)
-
-# def mms_to_data(speed_mms: float) -> int:
-#     """Convert millimeters per second to zaber data units
-#     default microstep size: 0.047625 µm
-#     velocity = data * (Microstep Size) / (1.6384 s) 
-#     """
-#     return round(speed_mms * 1000 / 0.047625 * 1.6384)
-
-def stretch(strain: float, strain_rate: float, pause: float) -> None:
+def stretch(strain: float, strain_rate: float, pause: float, on_move=None) -> None:
     """Stretch chamber
 
     Args:
         strain (float): target strain [%]
         strain_rate (float): strain rate [%/s]
         pause (float): time to pause before stretch [s]
+        on_move (callable): called with time.monotonic_ns() right before
+            the move commands are sent
     """
 
     chamber_end_length = Protocol.CHAMBER_LENGTH * (1 + strain / 100)
@@ -85,18 +89,18 @@ def stretch(strain: float, strain_rate: float, pause: float) -> None:
                     speed/2, 
                     Units.VELOCITY_MILLIMETRES_PER_SECOND)
 
-    for s in range(pause):
-        countdown = pause - s
-        print("Start in: ", countdown)
-        time.sleep(1)
+    schedule = DeadlineScheduler()
+    schedule.countdown(pause)
 
     # Send move commands
+    if on_move is not None:
+        on_move(time.monotonic_ns())
     d1.generic_command_no_response(CommandCode.MOVE_ABSOLUTE, position)
     d2.generic_command_no_response(CommandCode.MOVE_ABSOLUTE, position)
     
     print("POSITION: max. strain")
 
-def cycle(cycles: int, strain: float, strain_rate: float, pause: float) -> None:
+def cycle(cycles: int, strain: float, strain_rate: float, pause: float) -> list:
     """Stretch chamber
 
     Args:
@@ -104,7 +108,11 @@ def cycle(cycles: int, strain: float, strain_rate: float, pause: float) -> None:
         strain (float): target strain [%]
         strain_rate (float): strain rate [%/s]
         pause (float): time to pause before stretch [s]
+
+    Returns:
+        list[CycleTiming]: per-cycle timing
     """
+    from mini_stretcher.cycle_engine import CycleEngine, summarize
 
     chamber_end_length = Protocol.CHAMBER_LENGTH * (1 + strain / 100)
     delta_x = (chamber_end_length - Protocol.CHAMBER_LENGTH) / 2
@@ -120,33 +128,50 @@ def cycle(cycles: int, strain: float, strain_rate: float, pause: float) -> None:
                     speed/2, 
                     Units.VELOCITY_MILLIMETRES_PER_SECOND)
 
-    for s in range(pause):
-        countdown = pause - s
-        print("Start in: ", countdown)
-        time.sleep(1)
+    schedule = DeadlineScheduler()
+    schedule.countdown(pause)
 
     # Send move commands
     t = time.localtime()
     current_time = time.strftime("%H:%M:%S", t)
     print(current_time)
-    for cycle in range(cycles):
-        # go to end position
-        while True:              
-            if not d1.is_busy() and not d2.is_busy():
-                d1.generic_command_no_response(CommandCode.MOVE_ABSOLUTE, position)
-                d2.generic_command_no_response(CommandCode.MOVE_ABSOLUTE, position)
-                break
-        # go back to zero
-        while True:
-            if not d1.is_busy() and not d2.is_busy():
-                d1.generic_command_no_response(CommandCode.MOVE_ABSOLUTE, Protocol.ZERO_POSITION)
-                d2.generic_command_no_response(CommandCode.MOVE_ABSOLUTE, Protocol.ZERO_POSITION)
-                break
-            
-        print(f"{1 + cycle} / {cycles}")
+
+    def report(timing):
+        print(f"{timing.cycle} / {cycles}  {timing.period_s:.3f} s")
+
+    move_time = delta_x / (speed / 2)
+    engine = CycleEngine(con1, (d1, d2))
+    timings = engine.run(cycles, position, Protocol.ZERO_POSITION, move_time, on_cycle=report)
+    print(summarize(timings))
     t = time.localtime()
     current_time = time.strftime("%H:%M:%S", t)
     print(current_time)
+    return timings
+
+def waveform(shape: str, strain: float, frequency: float, cycles: int, pause: float) -> dict:
+    """Stretch chamber following a precomputed strain waveform
+
+    Args:
+        shape (str): "sine" or "triangle"
+        strain (float): peak strain [%]
+        frequency (float): cycles per second [Hz]
+        cycles (int): number of cycles [n]
+        pause (float): time to pause before stretch [s]
+
+    Returns:
+        dict: segment send timing error
+    """
+    from mini_stretcher import waveform as wf
+    strain_fn = {"sine": wf.sine, "triangle": wf.triangle}[shape](strain, frequency, cycles)
+    trajectory = wf.Trajectory.from_strain(strain_fn, Protocol.CHAMBER_LENGTH, Protocol.ZERO_POSITION,
+                                           Protocol.CHAMBER_LENGTH)
+
+    schedule = DeadlineScheduler()
+    schedule.countdown(pause)
+
+    timing = wf.TrajectoryStreamer(con1).run(trajectory)
+    print(timing)
+    return timing
 
 def stop() -> None:
     """Stops both motors"""
@@ -158,38 +183,37 @@ def current_position():
     pos = [d1.settings.get(BinarySettings.CURRENT_POSITION), 
            d2.settings.get(BinarySettings.CURRENT_POSITION)]
     print(pos)
-    print(f"Position equal: {pos[0] == pos[1]}")
+    print(f"Position equal: {pos[0] == pos[1]}, skew {data_to_mm(pos[0] - pos[1]) * 1000:.1f} µm")
     
 
 # Trigger
 
-left_counter = 0
-right_counter = 0
+_triggers = None
+
+
+def trigger(strain: float = 50, strain_rate: float = 0.5, pause: float = 10) -> None:
+    """Stretch on a triple left click; a triple right click disarms"""
+    global _triggers
+    from mini_stretcher.trigger import MouseSource, TriggerManager
+    if _triggers is None:
+        _triggers = TriggerManager([MouseSource()])
+        _triggers.on_disarm = lambda event: print("Trigger stopped")
 
-def on_click(x, y, button, pressed):
-    global left_counter
-    global right_counter
+    def triggered(event):
+        print(f"Protocol LIVE ({event.dispatch_ms:.2f} ms after the click)")
 
-    if button._name_ == "left" and not pressed:
-        left_counter += 1
-        print(f"left_counter: {left_counter}")
+        def moved(t_ns):
+            # No Motors here to time the move for the TriggerManager
+            event.motion_ns = t_ns
 
-    if button._name_ == "right" and not pressed:
-        right_counter += 1
-        print(f"right_counter: {right_counter}")
+        stretch(strain=strain, strain_rate=strain_rate, pause=pause, on_move=moved)
 
-    if left_counter == 3:
-        left_counter = 1
-        print("Protocol LIVE")
-        stretch(strain=50, strain_rate=0.5, pause=10)
-        return False
+    def finished(_):
+        print(f"Trigger latency: {_triggers.latency_report()}")
 
-    if right_counter == 3:
-        right_counter = 0
-        print("Trigger stopped")
-        return False
+    _triggers.arm(triggered, on_done=finished)
+    print("Trigger armed")
 
 
-def trigger():
-    listener = Listener(on_click=on_click)
-    listener.start()
+if __name__ == "__main__" and "--startup-time" in sys.argv:
+    print(f"ready in {time.perf_counter() - STARTED:.3f} s")
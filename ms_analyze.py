@@ -0,0 +1,53 @@
+"""Analyse recorded runs in parallel
+
+    python ms_analyze.py runs/
+    python ms_analyze.py runs/rig1 runs/rig2 --jobs 8 --out week.csv --json week.json
+
+Writes one CSV row per run (see mini_stretcher/analysis.py for the
+metrics) and optionally all results including the per-cycle peaks and
+amplitudes as JSON.
+"""
+import argparse
+import glob
+import json
+import os
+import time
+
+from mini_stretcher.analysis import SETTLE_TOLERANCE, analyze_runs, write_summary
+
+
+def find_runs(paths) -> list:
+    """Run files given directly or found below the given directories"""
+    runs = []
+    for path in paths:
+        if os.path.isdir(path):
+            runs += sorted(glob.glob(os.path.join(path, "**", "*.msrun"), recursive=True))
+        else:
+            runs.append(path)
+    return runs
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="+", help=".msrun files or directories to search")
+    parser.add_argument("--jobs", type=int, default=None, help="worker processes, default: one per CPU")
+    parser.add_argument("--out", default="summary.csv")
+    parser.add_argument("--json", default=None, help="also write full results here")
+    parser.add_argument("--settle-tolerance", type=float, default=SETTLE_TOLERANCE, help="[mm]")
+    args = parser.parse_args()
+
+    runs = find_runs(args.paths)
+    if not runs:
+        parser.exit(1, "No run files found\n")
+    start = time.perf_counter()
+    results = analyze_runs(runs, jobs=args.jobs, settle_tolerance=args.settle_tolerance)
+    write_summary(results, args.out)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    failed = [r for r in results if "error" in r]
+    for result in failed:
+        print(f"{result['path']}: {result['error']}")
+    print(f"Analysed {len(results) - len(failed)} of {len(runs)} runs in {time.perf_counter() - start:.1f} s"
+          f" -> {args.out}")
@@ -1,79 +1,37 @@
+import time
+
+STARTED = time.perf_counter()
+
 import os
+import sys
 
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
-from zaber_motion import Units, Library
-from zaber_motion.binary import Connection, BinarySettings, CommandCode
 from mini_stretcher import color_LED
-from pynput.mouse import Listener
-from time import sleep
-
-
-Library.enable_device_db_store(os.path.dirname(__file__) + "/zaber_device_db")
-
-
-class Motors:
-    ZERO_POSITION = 503937
-
-    def __init__(self):
-        self.connected = False
-
-    def connect(self, port):
-        self.connection = Connection.open_serial_port(port)
-        try:
-            self.device1 = self.connection.detect_devices()[0]
-            self.device2 = self.connection.detect_devices()[1]
-            self.connected = True
-        except Exception as e:
-            self.connection.close()
-            raise e
-
-    def disconnect(self):
-        self.connected = False
-        self.connection.close()
-
-    def stop(self):
-        if not self.connected:
-            raise ConnectionError("Motors must be connected first.")
-        self.device1.stop()
-        self.device2.stop()
-
-    def home(self):
-        if not self.connected:
-            raise ConnectionError("Motors must be connected first.")
-        self.device1.generic_command_no_response(CommandCode.HOME)
-        self.device2.generic_command_no_response(CommandCode.HOME)
-
-    def move_relative_distance(self, length, speed):
-        if not self.connected:
-            raise ConnectionError("Motors must be connected first.")
-        self.device1.settings.set(BinarySettings.TARGET_SPEED, speed / 2, Units.VELOCITY_MILLIMETRES_PER_SECOND)
-        self.device2.settings.set(BinarySettings.TARGET_SPEED, speed / 2, Units.VELOCITY_MILLIMETRES_PER_SECOND)
-
-        self.device1.generic_command_no_response(CommandCode.MOVE_RELATIVE, self.mm_to_data(-length / 2))
-        self.device2.generic_command_no_response(CommandCode.MOVE_RELATIVE, self.mm_to_data(-length / 2))
-
-    def move_absolute_distance(self, pos, speed):
-        if not self.connected:
-            raise ConnectionError("Motors must be connected first.")
-        self.device1.settings.set(BinarySettings.TARGET_SPEED, speed / 2, Units.VELOCITY_MILLIMETRES_PER_SECOND)
-        self.device2.settings.set(BinarySettings.TARGET_SPEED, speed / 2, Units.VELOCITY_MILLIMETRES_PER_SECOND)
-
-        position = self.ZERO_POSITION - self.mm_to_data((pos - 12) / 2)
-        self.device1.generic_command_no_response(CommandCode.MOVE_ABSOLUTE, position)
-        self.device2.generic_command_no_response(CommandCode.MOVE_ABSOLUTE, position)
-
-    def get_positions(self):
-        if not self.connected:
-            raise ConnectionError("Motors must be connected first.")
-        return self.device1.settings.get(BinarySettings.CURRENT_POSITION), self.device2.settings.get(BinarySettings.CURRENT_POSITION)
-
-    def mm_to_data(self, length_mm: float) -> int:
-        """Convert millimeters to zaber data units
-        default microstep size: 0.047625 µm
-        position = data[micron] * (Microstep Size[micron])
-        """
-        return round(length_mm * 1000 / 0.047625)
+from mini_stretcher.connection_manager import ConnectionManager
+from mini_stretcher.estimator import PositionEstimator
+from mini_stretcher.live_plot import LivePlot
+from mini_stretcher.motors import Motors
+from mini_stretcher.motion_worker import MotionWorker
+from mini_stretcher.position_sampler import PositionSampler
+from mini_stretcher.recorder import Recorder
+from mini_stretcher.strain_control import StrainRateController
+from mini_stretcher.sync_monitor import SyncMonitor
+from mini_stretcher.trigger import MouseSource, TriggerManager
+from mini_stretcher.units import data_to_mm
+from mini_stretcher.view_updater import ViewUpdater
+
+IMPORTED = time.perf_counter()
+
+# zaber_motion is loaded on Connect and pynput on Arm trigger, so neither
+# delays the window
+
+DEVICE_DB_DIR = os.path.dirname(__file__) + "/zaber_device_db"
+RUN_DIR = os.path.dirname(__file__) + "/runs"
+RECORD_SAMPLE_RATE = 50  # [Hz] while recording
+IDLE_SAMPLE_RATE = 2  # [Hz] otherwise; the display runs on the position estimator
+SYNC_THRESHOLD = 0.01  # [mm] axis skew that raises an alarm during a run
+SYNC_TRIM = "--sync-trim" in sys.argv  # speed up the lagging axis during runs
 
 
 class Protocol:
@@ -81,10 +39,13 @@ class Protocol:
     TARGET_LENGTH = None
     PAUSE = None
     SPEED = None
+    CLOSED_LOOP = None
 
 
 class SetupFrame(ttk.Labelframe):
-    def __init__(self, master, motors: Motors):
+    HOME_POLL_INTERVAL = 100  # [ms]
+
+    def __init__(self, master, worker: MotionWorker):
         super().__init__(master, text="Setup", padding=(5, 5))
 
         self.port_var = ttk.StringVar(value="COM3")
@@ -116,7 +77,7 @@ class SetupFrame(ttk.Labelframe):
         self.master = master
         self.on_top = False
 
-        self.motors = motors
+        self.worker = worker
 
     # def validator(self, P):
     #     return P.isdigit() or P == ""
@@ -126,36 +87,41 @@ class SetupFrame(ttk.Labelframe):
 
     def on_connect_click(self):
         if self.connection_state == "naive":
-            try:
-                self.motors.connect(self.port_var.get())
-            except Exception as e:
-                print(e)
-            else:
-                self.connection_state = "connected"
-                self.connect_btn.configure(bootstyle="danger", text="Disconnect")
-                self.connect_led.set_color("green")
-                self.home_btn.configure(state="enabled")
+            self.worker.submit(self.worker.motors.connect, self.port_var.get(),
+                               on_done=self.on_connected, on_error=print)
         elif self.connection_state == "connected":
-            try:
-                self.motors.disconnect()
-            except:
-                return
-            else:
-                self.connection_state = "naive"
-                self.connect_btn.configure(bootstyle="defaul", text="Connect")
-                self.connect_led.set_color("red")
-                self.home_led.set_color("red")
+            self.worker.submit(self.worker.motors.disconnect, on_done=self.on_disconnected)
+
+    def on_connected(self, _):
+        self.connection_state = "connected"
+        self.connect_btn.configure(bootstyle="danger", text="Disconnect")
+        self.connect_led.set_color("green")
+        self.home_btn.configure(state="enabled")
+
+    def on_disconnected(self, _):
+        self.connection_state = "naive"
+        self.connect_btn.configure(bootstyle="defaul", text="Connect")
+        self.connect_led.set_color("red")
+        self.home_led.set_color("red")
 
     def on_home_click(self):
-        try:
-            self.motors.home()
-            self.home_led.set_color("yellow")
-        except Exception as e:
-            print(e)
+        self.home_led.set_color("yellow")
+        self.worker.submit(self.worker.motors.home, on_done=self.watch_homing, on_error=print)
+
+    def watch_homing(self, handle):
+        """Poll the home command's handle until both axes replied"""
+        if not handle.done():
+            self.after(self.HOME_POLL_INTERVAL, self.watch_homing, handle)
+        elif handle.exception() is None and not handle.stopped:
+            self.on_homed()
         else:
-            self.home_btn.configure(state="disabled")
-            self.home_state = "homed"
-            self.home_led.set_color("green")
+            print(f"Homing failed: {handle.exception() or 'stopped'}")
+            self.home_led.set_color("red")
+
+    def on_homed(self):
+        self.home_btn.configure(state="disabled")
+        self.home_state = "homed"
+        self.home_led.set_color("green")
 
     def on_top_click(self):
         if self.on_top:
@@ -174,7 +140,7 @@ class SetupFrame(ttk.Labelframe):
 
 
 class ManualMove(ttk.Labelframe):
-    def __init__(self, master, motors: Motors):
+    def __init__(self, master, worker: MotionWorker):
         super().__init__(master, text="Manual move", padding=(5, 5))
         # self.pack(fill=BOTH, expand=True, padx=5, pady=2)
         self.columnconfigure(0, weight=1, minsize=120)
@@ -198,13 +164,15 @@ class ManualMove(ttk.Labelframe):
         self.move_btn = ttk.Button(self, text="Move", command=self.on_move_click)
         self.move_btn.grid(row=3, column=1, padx=5, pady=5, sticky=EW)
 
-        self.motors = motors
+        self.worker = worker
 
     def on_move_click(self):
         try:
-            self.motors.move_absolute_distance(float(self.length_var.get()), float(self.speed_var.get()))
+            length, speed = float(self.length_var.get()), float(self.speed_var.get())
         except Exception as e:
             print(e)
+            return
+        self.worker.submit(self.worker.motors.move_absolute_distance, length, speed, on_error=print)
 
 
 class ProtocolFrame(ttk.Labelframe):
@@ -243,14 +211,22 @@ class ProtocolFrame(ttk.Labelframe):
         self.speed_ent = ttk.Entry(self, textvariable=self.speed_var, width=6, justify="right")
         self.speed_ent.grid(row=3, column=1, padx=5, pady=2, sticky=E)
 
+        self.closed_loop_var = ttk.BooleanVar(value=False)
+        self.closed_loop_chk = ttk.Checkbutton(self, text="Closed-loop strain rate", variable=self.closed_loop_var)
+        self.closed_loop_chk.grid(row=4, column=0, columnspan=2, padx=5, pady=2, sticky=E)
+
         protocol.L0 = self.len_zero_var
         protocol.TARGET_LENGTH = self.len_target_var
         protocol.PAUSE = self.pause_var
         protocol.SPEED = self.speed_var
+        protocol.CLOSED_LOOP = self.closed_loop_var
 
 
 class ControlsFrame(ttk.Labelframe):
-    def __init__(self, master, motors: Motors, protocol: Protocol):
+    TRIGGER_POLL_INTERVAL = 100  # [ms]
+
+    def __init__(self, master, worker: MotionWorker, protocol: Protocol, sampler: PositionSampler,
+                 plot: LivePlot = None):
         super().__init__(master, text="Controls", padding=(5, 5))
         # self.pack(fill=BOTH, expand=True, padx=5, pady=2)
         self.columnconfigure(0, weight=1)
@@ -268,61 +244,166 @@ class ControlsFrame(ttk.Labelframe):
         self.stop_btn = ttk.Button(self, text="STOP", bootstyle="danger", command=self.on_stop_click)
         self.stop_btn.grid(row=1, column=1, padx=5, pady=5, sticky=EW)
 
-        self.motors = motors
+        self.worker = worker
         self.protocol = protocol
+        self.sampler = sampler
+        self.plot = plot
+        self.recorder = None
+        self.sync = None
+        # Triple left click fires, triple right click disarms
+        self.triggers = TriggerManager([MouseSource()], worker=worker)
 
     def on_goto_zero_click(self):
         try:
-            self.motors.move_absolute_distance(float(self.protocol.L0.get()), 5)
+            l0 = float(self.protocol.L0.get())
         except Exception as e:
             print(e)
+            return
+        self.worker.submit(self.worker.motors.move_absolute_distance, l0, 5, on_error=print)
 
-    def on_run_click(self):
+    def read_protocol(self):
+        """(l0, target_length, speed, pause) from the protocol form, None if invalid"""
         try:
-            pause = int(self.protocol.PAUSE.get())
-            for i in range(pause):
-                print(f"START in {pause - i} seconds")
-                sleep(1)
-            self.motors.move_absolute_distance(float(self.protocol.TARGET_LENGTH.get()), float(self.protocol.SPEED.get()))
+            pause = float(self.protocol.PAUSE.get())
+            target_length = float(self.protocol.TARGET_LENGTH.get())
+            speed = float(self.protocol.SPEED.get())
+            l0 = float(self.protocol.L0.get())
         except Exception as e:
             print(e)
+            return None
+        return l0, target_length, speed, pause
+
+    def on_run_click(self):
+        params = self.read_protocol()
+        if params is None:
+            return
+        l0, target_length, speed, pause = params
+        closed_loop = self.protocol.CLOSED_LOOP.get()
+        recorder = self.start_recording(l0, {"target_length": target_length, "speed": speed, "pause": pause},
+                                        trim=SYNC_TRIM and not closed_loop)
+        self.worker.submit(self.run_protocol, pause, target_length, speed, l0, closed_loop,
+                           on_done=lambda _: self.on_run_finished(recorder),
+                           on_error=lambda e: self.on_run_failed(e, recorder))
+
+    def run_protocol(self, pause, target_length, speed, l0, closed_loop=False):
+        """Runs on the motion worker thread"""
+        schedule = self.worker.scheduler()
+        schedule.countdown(pause, "START")
+        if not closed_loop:
+            handle = self.worker.motors.move_absolute_distance(target_length, speed)
+            print(f"Pause timing: {schedule.report()}")
+            handle.result(2 * abs(target_length - l0) / speed + 10)  # STOP resolves it too
+            return
+        print(f"Pause timing: {schedule.report()}")
+        controller = StrainRateController(self.worker.motors, l0)
+        report = controller.run(target_length, speed / l0 * 100, sampler=self.sampler, scheduler=schedule)
+        print(f"Strain rate: {report}")
 
     def on_stop_click(self):
-        try:
-            self.motors.stop()
-        except Exception as e:
-            print(e)
+        self.triggers.disarm()
+        self.worker.stop_motors(on_error=print)
+        self.stop_recording()
+
+    def on_run_finished(self, recorder):
+        """End the run's recording, unless STOP or a newer run already replaced it"""
+        if recorder is not None and recorder is self.recorder:
+            self.stop_recording()
+
+    def on_run_failed(self, e, recorder):
+        print(e)
+        self.on_run_finished(recorder)
+
+    def start_recording(self, l0, metadata, trim=False) -> Recorder:
+        """Record positions until the run finishes, STOP or the next run
+
+        Recordings are only started and stopped on the Tk thread. With trim
+        the SyncMonitor corrects axis skew, which conflicts with the closed
+        loop's own speed changes.
+        """
+        self.stop_recording()
+        os.makedirs(RUN_DIR, exist_ok=True)
+        path = RUN_DIR + time.strftime("/%Y%m%d-%H%M%S.msrun")
+        self.recorder = Recorder(path, l0, self.worker.motors.length_from_positions, metadata=metadata)
+        self.sync = SyncMonitor(self.worker.motors, SYNC_THRESHOLD, on_alarm=self.sync_alarm, trim=trim)
+        self.sampler.listeners.append(self.recorder.append)
+        self.sampler.listeners.append(self.sync.feed)
+        self.sampler.rate = RECORD_SAMPLE_RATE
+        if self.plot is not None:
+            self.plot.reset(l0)
+        print(f"Recording to {path}")
+        return self.recorder
+
+    def stop_recording(self):
+        if self.recorder is None:
+            return
+        self.sampler.listeners.remove(self.recorder.append)
+        self.sampler.listeners.remove(self.sync.feed)
+        self.sampler.rate = IDLE_SAMPLE_RATE
+        self.recorder.close()
+        self.sync.save(os.path.splitext(self.recorder.path)[0] + ".sync.json")
+        self.recorder = None
+        self.sync = None
+
+    @staticmethod
+    def sync_alarm(t_ns, skew_mm):
+        print(f"WARNING: axes out of sync by {skew_mm * 1000:.1f} µm, the sample centre moved {skew_mm * 500:.1f} µm")
 
     def on_trigger_click(self):
-        self.left_counter = 0
-        self.right_counter = 0
-        self.listener = Listener(on_click=self.on_click)
-        self.listener.start()
-
-    def on_click(self, x, y, button, pressed):
-        if button._name_ == "left" and not pressed:
-            self.left_counter += 1
-            print(f"left_counter: {self.left_counter}")
-
-        if button._name_ == "right" and not pressed:
-            self.right_counter += 1
-            print(f"right_counter: {self.right_counter}")
-
-        if self.left_counter == 3:
-            try:
-                self.on_run_click()
-                print("Protocol LIVE")
-            except Exception as e:
-                print(e)
-            return False
-
-        if self.right_counter == 3:
+        if self.triggers.armed:
+            self.triggers.disarm()
             print("Trigger stopped")
-            return False
+            return
+        params = self.read_protocol()
+        if params is None:
+            return
+        l0, target_length, speed, pause = params
+        metadata = {"target_length": target_length, "speed": speed, "pause": pause}
+        closed_loop = self.protocol.CLOSED_LOOP.get()
+        run = {}
+
+        def start_recording(event):
+            if run.get("ended"):
+                return  # the run was over before the Tk thread got here
+            run["recorder"] = self.start_recording(l0, dict(metadata, trigger_ns=event.t_ns),
+                                                   trim=SYNC_TRIM and not closed_loop)
+
+        def triggered(event):
+            # Runs on the motion worker; the recording starts on the Tk thread meanwhile,
+            # always ahead of finished/failed since both go through the worker's result queue
+            print(f"Protocol LIVE ({event.source} trigger, {event.dispatch_ms:.2f} ms)")
+            self.worker.post(start_recording, event)
+            self.run_protocol(pause, target_length, speed, l0, closed_loop)
+
+        def finished(_):
+            run["ended"] = True
+            print(f"Trigger latency: {self.triggers.latency_report()}")
+            self.on_run_finished(run.get("recorder"))
+
+        def failed(e):
+            run["ended"] = True
+            print(f"Trigger latency: {self.triggers.latency_report()}")
+            self.on_run_failed(e, run.get("recorder"))
+
+        self.triggers.arm(triggered, on_done=finished, on_error=failed)
+        self.trigger_btn.configure(text="Disarm trigger")
+        print("Trigger armed")
+        self.watch_trigger()
+
+    def close(self):
+        """Save the running recording and stop the trigger listeners, before the window closes"""
+        self.triggers.stop()
+        self.stop_recording()
+
+    def watch_trigger(self):
+        """Reset the button once the trigger fired or was disarmed"""
+        if self.triggers.armed:
+            self.after(self.TRIGGER_POLL_INTERVAL, self.watch_trigger)
+        else:
+            self.trigger_btn.configure(text="Arm trigger")
 
 
 class StatusFrame(ttk.Labelframe):
-    def __init__(self, master, motors: Motors):
+    def __init__(self, master, motors: Motors, estimator: PositionEstimator, view: ViewUpdater):
         super().__init__(master, text="Status", padding=(5, 5))
         # self.pack(fill=BOTH, expand=True, padx=5, pady=2)
         self.columnconfigure(0, weight=1)
@@ -330,7 +411,7 @@ class StatusFrame(ttk.Labelframe):
 
         self.status_lbl = ttk.Label(self, text="Status:")
         self.status_lbl.grid(row=0, column=0, padx=5, pady=2, sticky=E)
-        self.status_out = ttk.Label(self, text="idle")
+        self.status_out = ttk.Label(self, text="disconnected")
         self.status_out.grid(row=0, column=1, padx=5, pady=2, sticky=W)
 
         self.clen_lbl = ttk.Label(self, text="Current length [mm]:")
@@ -338,36 +419,67 @@ class StatusFrame(ttk.Labelframe):
         self.clen_out = ttk.Label(self, text="-")
         self.clen_out.grid(row=1, column=1, padx=5, pady=2, sticky=W)
 
+        self.skew_lbl = ttk.Label(self, text="Axis skew [µm]:")
+        self.skew_lbl.grid(row=2, column=0, padx=5, pady=2, sticky=E)
+        self.skew_out = ttk.Label(self, text="-")
+        self.skew_out.grid(row=2, column=1, padx=5, pady=2, sticky=W)
+
         self.motors = motors
+        self.estimator = estimator
 
-        self.last_distance = 12
-        self.display_values()
+        # Labels only change when their formatted text does
+        view.bind("status", lambda text: self.status_out.configure(text=text), source=lambda: self.motors.state)
+        view.bind("length", lambda text: self.clen_out.configure(text=text), source=self.length_text)
+        view.bind("skew", lambda text: self.skew_out.configure(text=text), source=self.skew_text)
 
-    def display_values(self):
-        if self.motors.connected:
-            pos1, pos2 = self.motors.get_positions()
-            distance = ((motors.ZERO_POSITION - pos1) + (motors.ZERO_POSITION - pos2)) / 1000 * 0.047625 + 12
-            self.clen_out["text"] = "{:10.4f}".format(distance)
-            if self.last_distance != distance:
-                self.status_out["text"] = "running"
-            else:
-                self.status_out["text"] = "idle"
-            self.last_distance = distance
-        self.after(100, self.display_values)
+    def length_text(self):
+        positions = self.estimator.position()
+        if not self.motors.connected or positions is None:
+            return "-"
+        return "{:10.4f}".format(self.motors.length_from_positions(*positions))
 
+    def skew_text(self):
+        positions = self.estimator.position()
+        if not self.motors.connected or positions is None:
+            return "-"
+        return "{:10.1f}".format(data_to_mm(positions[0] - positions[1]) * 1000)
 
-if __name__ == "__main__":
-    # Library.enable_device_db_store()
 
+def report_startup_time(app):
+    """`python ms_app.py --startup-time`: print how long the window took, then quit"""
+    app.update()
+    print(f"imports {IMPORTED - STARTED:.3f} s, window shown {time.perf_counter() - STARTED:.3f} s")
+    app.destroy()
+
+
+if __name__ == "__main__":
     app = ttk.Window("miniStretcher", "darkly", resizable=(False, False), iconphoto="icons/banana2.png")
 
-    motors = Motors()
+    motors = Motors(ConnectionManager(device_db=DEVICE_DB_DIR))
+    worker = MotionWorker(motors, app)
+    sampler = PositionSampler(motors, rate=IDLE_SAMPLE_RATE)
+    estimator = PositionEstimator(motors)
+    sampler.listeners.append(estimator.correct)
+    sampler.start()
     protocol = Protocol()
+    view = ViewUpdater(app)
 
-    SetupFrame(app, motors).grid(row=0, column=0, sticky=NSEW, padx=5, pady=2)
-    ManualMove(app, motors).grid(row=0, column=1, sticky=NSEW, padx=5, pady=2)
+    SetupFrame(app, worker).grid(row=0, column=0, sticky=NSEW, padx=5, pady=2)
+    ManualMove(app, worker).grid(row=0, column=1, sticky=NSEW, padx=5, pady=2)
     ProtocolFrame(app, protocol).grid(row=1, column=0, rowspan=2, sticky=NSEW, padx=5, pady=2)
-    ControlsFrame(app, motors, protocol).grid(row=1, column=1, sticky=NSEW, padx=5, pady=2)
-    StatusFrame(app, motors).grid(row=2, column=1, sticky=NSEW, padx=5, pady=2)
+    plot = LivePlot(app, sampler.buffer, motors.length_from_positions)
+    controls = ControlsFrame(app, worker, protocol, sampler, plot)
+    controls.grid(row=1, column=1, sticky=NSEW, padx=5, pady=2)
+    StatusFrame(app, motors, estimator, view).grid(row=2, column=1, sticky=NSEW, padx=5, pady=2)
+    plot.grid(row=3, column=0, columnspan=2, sticky=NSEW, padx=5, pady=2)
+
+    def on_close():
+        controls.close()
+        sampler.stop()
+        app.destroy()
+
+    app.protocol("WM_DELETE_WINDOW", on_close)
 
+    if "--startup-time" in sys.argv:
+        app.after_idle(report_startup_time, app)
     app.mainloop()
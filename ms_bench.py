@@ -0,0 +1,46 @@
+"""Benchmark command latency, axis skew, sample rate and strain rate accuracy
+
+    python ms_bench.py --simulate
+    python ms_bench.py --port COM3 --out bench.json --compare last_bench.json
+"""
+import argparse
+import json
+import os
+
+from mini_stretcher import benchmark
+from mini_stretcher.connection_manager import ConnectionManager
+from mini_stretcher.motors import Motors
+
+DEVICE_DB_DIR = os.path.dirname(__file__) + "/zaber_device_db"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", default="COM3", help="serial port or tcp://host:port")
+    parser.add_argument("--simulate", action="store_true", help="run against mini_stretcher.simulator")
+    parser.add_argument("--latency", type=float, default=0.0, help="simulated reply latency [s]")
+    parser.add_argument("--out", default="bench_output.json", help="report file")
+    parser.add_argument("--compare", help="previous report to compare against")
+    args = parser.parse_args()
+
+    port = args.port
+    if args.simulate:
+        from mini_stretcher.simulator import SimulatedChain, serve_tcp
+        port = f"tcp://127.0.0.1:{serve_tcp(SimulatedChain(latency=args.latency))}"
+
+    motors = Motors(ConnectionManager(device_db=DEVICE_DB_DIR))
+    motors.connect(port)
+    try:
+        report = benchmark.run_all(motors, "simulator" if args.simulate else port)
+    finally:
+        motors.disconnect()
+
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+        for name, before, after, change in benchmark.compare(previous, report):
+            print(f"{name:45s} {before:12.4f} -> {after:12.4f}  {change:+7.1%}")
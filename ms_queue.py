@@ -0,0 +1,44 @@
+"""Run a queue of protocols unattended
+
+    python ms_queue.py COM3 overnight.json
+    python ms_queue.py COM3 overnight.yaml --restart
+
+See mini_stretcher/experiment_queue.py for the queue file format.
+"""
+import argparse
+import os
+
+from mini_stretcher.connection_manager import ConnectionManager
+from mini_stretcher.experiment_queue import ExperimentQueue
+from mini_stretcher.rigs import Rig
+
+DEVICE_DB_DIR = os.path.dirname(__file__) + "/zaber_device_db"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("port")
+    parser.add_argument("queue", help=".json, .yaml or .yml queue file")
+    parser.add_argument("--restart", action="store_true", help="rerun entries that already finished")
+    parser.add_argument("--run-dir", default=os.path.dirname(__file__) + "/runs")
+    parser.add_argument("--codec", choices=["delta", "zlib", "lzma"], default=None,
+                        help="write compact recordings, for week-long queues")
+    args = parser.parse_args()
+
+    queue = ExperimentQueue(args.queue)
+    rig = Rig(os.path.splitext(os.path.basename(args.queue))[0], args.port, ConnectionManager(device_db=DEVICE_DB_DIR),
+              run_dir=args.run_dir, codec=args.codec)
+    rig.motors.connect(args.port)
+    rig.state = "idle"
+    try:
+        rig.submit(queue.run, resume=not args.restart)
+        while not rig.done.wait(1):
+            pass
+    except KeyboardInterrupt:
+        rig.stop()
+        rig.done.wait(5)
+    finally:
+        rig.sampler.stop()
+        rig.motors.disconnect()
+        rig.worker.shutdown()
+    print(f"Results in {queue.results_path}")
@@ -0,0 +1,45 @@
+"""Run the same protocol on several stretchers at once
+
+    python ms_rigs.py --rig left=COM3 --rig right=COM4 --target 14 --speed 0.03 --pause 10
+    python ms_rigs.py --rig a=COM3 --rig b=COM4 --cycles 100 --target 13 --speed 1
+"""
+import argparse
+import os
+import time
+
+from mini_stretcher import rigs
+
+DEVICE_DB_DIR = os.path.dirname(__file__) + "/zaber_device_db"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rig", action="append", required=True, help="name=port, repeat for each rig")
+    parser.add_argument("--l0", type=float, default=12, help="[mm]")
+    parser.add_argument("--target", type=float, default=14, help="target length [mm]")
+    parser.add_argument("--speed", type=float, default=0.03, help="[mm/s]")
+    parser.add_argument("--pause", type=float, default=10, help="[s]")
+    parser.add_argument("--cycles", type=int, default=0, help="cycle instead of a single stretch")
+    parser.add_argument("--run-dir", default=os.path.dirname(__file__) + "/runs")
+    args = parser.parse_args()
+
+    manager = rigs.RigManager(dict(r.split("=", 1) for r in args.rig), args.run_dir, device_db=DEVICE_DB_DIR)
+    errors = manager.connect_all()
+    for name, error in errors.items():
+        print(f"[{name}] not connected: {error}")
+
+    params = {"l0": args.l0, "target_length": args.target, "speed": args.speed, "pause": args.pause}
+    try:
+        if args.cycles:
+            manager.run(rigs.cycle, cycles=args.cycles, **params)
+        else:
+            manager.run(rigs.stretch, **params)
+        while not manager.wait(timeout=5):
+            for name, status in manager.status().items():
+                length = "-" if status["length"] is None else f"{status['length']:.4f}"
+                print(f"[{name}] {status['state']:8s} {length} mm")
+    except KeyboardInterrupt:
+        manager.stop_all()
+        time.sleep(0.5)
+    finally:
+        manager.close()
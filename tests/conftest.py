@@ -0,0 +1,19 @@
+import pytest
+
+from mini_stretcher.connection_manager import ConnectionManager
+from mini_stretcher.motors import Motors
+from mini_stretcher.simulator import SimulatedChain, serve_tcp
+
+
+@pytest.fixture
+def chain():
+    return SimulatedChain()
+
+
+@pytest.fixture
+def motors(chain):
+    """Motors connected to a simulated chain over TCP"""
+    motors = Motors(ConnectionManager())
+    motors.connect(f"tcp://127.0.0.1:{serve_tcp(chain)}")
+    yield motors
+    motors.disconnect()
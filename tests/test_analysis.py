@@ -0,0 +1,108 @@
+import csv
+
+import numpy as np
+import pytest
+
+from mini_stretcher.analysis import analyze_run, analyze_runs, write_summary
+from mini_stretcher.recorder import Recorder
+from mini_stretcher.units import data_to_mm
+
+L0 = 10.0
+TARGET = 12.0
+SPEED = 0.5  # [mm/s], 0.01 mm per sample
+DT = 0.02  # [s]
+
+
+def length_from_positions(pos1, pos2):
+    # 1 µm per data step, L0 at 0
+    return L0 + (pos1 + pos2) / 2000
+
+
+def synthetic_length():
+    """Two cycles at 0.5 mm/s with known answers
+
+    Cycle 1: 1 s at L0, ramp to 12 mm, 0.05 mm overshoot during
+    (5.0, 5.2] s, hold until 7 s, back to L0 at 11 s.
+    Cycle 2: ramp from 12 s to 11.9 mm, hold until 17 s, back to L0.
+    """
+    t = np.arange(1100) * DT
+    length = np.interp(t, [0, 1, 5, 7, 11, 12, 15.8, 17, 20.8, 22],
+                       [L0, L0, TARGET, TARGET, L0, L0, 11.9, 11.9, L0, L0])
+    length[(t > 5.0 + DT / 2) & (t < 5.2 + DT / 2)] += 0.05
+    return np.round(length * 1000) / 1000
+
+
+def record(path, length):
+    recorder = Recorder(path, L0, length_from_positions, chunk_size=256,
+                        metadata={"target_length": TARGET, "speed": SPEED})
+    center = np.round((length - L0) * 1000).astype(int)
+    for i, c in enumerate(center):
+        recorder.append(10 ** 12 + int(round(i * DT * 1e9)), c + 1, c - 1)  # 2 data steps of skew
+    recorder.close()
+    return str(path)
+
+
+@pytest.fixture
+def run(tmp_path):
+    return record(tmp_path / "run.msrun", synthetic_length())
+
+
+def test_metrics(run):
+    result = analyze_run(run)
+    assert result["name"] == "run" and result["samples"] == 1100
+    assert result["duration_s"] == pytest.approx(21.98)
+    assert result["target_strain"] == pytest.approx(20.0)
+    assert result["peak_strain"] == pytest.approx(20.5)
+    assert result["peak_strain_error"] == pytest.approx(0.5)
+    assert result["overshoot_mm"] == pytest.approx(0.05)
+    assert result["overshoot_pct"] == pytest.approx(2.5)
+    assert result["nominal_rate"] == pytest.approx(5.0)
+    assert result["ramp_rate"] == pytest.approx(5.0, rel=0.02)
+    # 11.91 mm -> 12.05 mm (the overshoot step) within one 0.2 s window
+    assert result["peak_rate"] == pytest.approx(7.0, rel=0.01)
+    # Arrives within 0.01 mm at 4.98 s, back in the band after the overshoot at 5.22 s
+    assert result["settling_time_s"] == pytest.approx(0.24, abs=DT / 2)
+    skew = data_to_mm(2) * 1000
+    assert result["skew_mean_um"] == pytest.approx(skew)
+    assert result["skew_rms_um"] == pytest.approx(skew)
+    assert result["skew_max_um"] == pytest.approx(skew)
+
+
+def test_cycle_peaks(run):
+    result = analyze_run(run)
+    assert result["cycles"] == 2
+    assert result["cycle_peaks"] == pytest.approx([20.5, 19.0])
+    assert result["cycle_amplitudes"] == pytest.approx([20.5, 19.0])
+    assert result["amplitude_decay_pct"] == pytest.approx(1.5 / 20.5 * 100)
+
+
+def test_without_target(tmp_path):
+    path = tmp_path / "idle.msrun"
+    recorder = Recorder(path, L0, length_from_positions)
+    for i in range(50):
+        recorder.append(i * 20_000_000, 0, 0)
+    recorder.close()
+    result = analyze_run(path)
+    assert result["duration_s"] == pytest.approx(0.98)
+    assert result["peak_rate"] == 0
+    assert "peak_strain" not in result
+
+
+def test_parallel_batch_and_summary(tmp_path, run):
+    second = record(tmp_path / "second.msrun", synthetic_length()[:500])  # first cycle, cut during the return
+    missing = str(tmp_path / "missing.msrun")
+    results = analyze_runs([run, missing, second], jobs=2)
+
+    assert [r["path"] for r in results] == [run, missing, second]
+    assert results[0] == analyze_run(run)
+    assert "error" in results[1]
+    assert results[2]["cycles"] == 1 and results[2]["peak_strain"] == pytest.approx(20.5)
+
+    summary = tmp_path / "summary.csv"
+    write_summary(results, summary)
+    with open(summary, newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert [row["name"] for row in rows] == ["run", "missing.msrun", "second"]
+    assert float(rows[0]["overshoot_mm"]) == pytest.approx(0.05)
+    assert rows[1]["error"] and not rows[0]["error"]
+    assert "cycle_peaks" not in rows[0]
@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+
+from mini_stretcher.async_motors import AsyncMotors
+from mini_stretcher.connection_manager import ConnectionManager
+from mini_stretcher.motion_state import MoveInterrupted
+from mini_stretcher.motors import Motors
+from mini_stretcher.simulator import serve_tcp
+from mini_stretcher.units import mm_to_data
+
+
+def run(chain, scenario):
+    """Run scenario(motors) with AsyncMotors connected to the simulated chain"""
+    async def main():
+        motors = AsyncMotors(ConnectionManager())
+        await motors.connect(f"tcp://127.0.0.1:{serve_tcp(chain)}")
+        try:
+            return await scenario(motors)
+        finally:
+            await motors.disconnect()
+    return asyncio.run(main())
+
+
+def test_move_absolute_resolves_with_final_positions(chain):
+    async def scenario(motors):
+        return await motors.move_absolute(12.4, 2, timeout=5), await motors.get_positions()
+
+    result, positions = run(chain, scenario)
+    target = Motors.ZERO_POSITION - mm_to_data(0.2)
+    assert result == (target, target)
+    assert positions == result
+    assert all(axis.position == target for axis in chain.axes.values())
+
+
+def test_move_relative(chain):
+    async def scenario(motors):
+        return await motors.move_relative(-0.4, 2, timeout=5)
+
+    assert run(chain, scenario) == (Motors.ZERO_POSITION + mm_to_data(0.2),) * 2
+
+
+def test_stop_resolves_the_running_move(chain):
+    async def scenario(motors):
+        move = asyncio.ensure_future(motors.move_absolute(16, 1, timeout=15))
+        await asyncio.sleep(0.3)
+        stopped = await motors.stop()
+        return stopped, await move
+
+    stopped, moved = run(chain, scenario)
+    assert moved == stopped
+    target = Motors.ZERO_POSITION - mm_to_data(2)
+    assert all(target < position < Motors.ZERO_POSITION for position in stopped)
+
+
+def test_new_move_interrupts_the_running_one(chain):
+    async def scenario(motors):
+        first = asyncio.ensure_future(motors.move_absolute(16, 1, timeout=15))
+        await asyncio.sleep(0.1)
+        second = await motors.move_absolute(12.2, 2, timeout=5)
+        with pytest.raises(MoveInterrupted):
+            await first
+        return second
+
+    assert run(chain, scenario) == (Motors.ZERO_POSITION - mm_to_data(0.1),) * 2
+
+
+@pytest.mark.parametrize("command", ["stop", "home", "get_positions"])
+def test_commands_need_a_connection(command):
+    with pytest.raises(ConnectionError):
+        asyncio.run(getattr(AsyncMotors(), command)())
+
+
+def test_connect_checks_the_microstep_resolution(chain):
+    chain.axes[1].settings[37] = 16
+    with pytest.raises(ConnectionError, match="resolution is 16"):
+        run(chain, None)
@@ -0,0 +1,25 @@
+import pytest
+
+from mini_stretcher.benchmark import bench_issue_skew
+from mini_stretcher.connection_manager import ConnectionManager
+from mini_stretcher.motors import Motors
+from mini_stretcher.simulator import SimulatedChain, serve_tcp
+from mini_stretcher.units import mm_to_data
+
+
+def test_issue_skew_starts_anywhere():
+    # Away from ZERO_POSITION and apart from each other
+    chain = SimulatedChain(position=Motors.ZERO_POSITION - mm_to_data(1))
+    chain.axes[2].position += mm_to_data(0.05)
+    motors = Motors(ConnectionManager())
+    motors.connect(f"tcp://127.0.0.1:{serve_tcp(chain)}")
+    try:
+        result = bench_issue_skew(motors, n=1)
+    finally:
+        motors.disconnect()
+    # device2's MOVE_ABSOLUTE follows device1's by at least one 6 byte packet
+    # at 9600 baud (6.25 ms), more when a position query gets in between
+    assert result["per_device"]["n"] == 2
+    assert result["per_device"]["mean_ms"] > 4
+    assert result["broadcast"]["n"] == 2
+    assert abs(result["broadcast"]["mean_ms"]) < 1
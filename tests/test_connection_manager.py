@@ -0,0 +1,63 @@
+import asyncio
+
+import pytest
+
+from mini_stretcher.connection_manager import ConnectionManager
+from mini_stretcher.simulator import SimulatedChain, serve_tcp
+
+
+@pytest.fixture
+def port():
+    chain = SimulatedChain()
+    return chain, f"tcp://127.0.0.1:{serve_tcp(chain)}"
+
+
+def count_detections(connections, monkeypatch):
+    calls = []
+    detect = connections._detect
+
+    def counting(port, connection):
+        calls.append(port)
+        return detect(port, connection)
+
+    monkeypatch.setattr(connections, "_detect", counting)
+    return calls
+
+
+def test_reconnect_reuses_known_devices(port, monkeypatch):
+    _, port = port
+    connections = ConnectionManager()
+    detections = count_detections(connections, monkeypatch)
+    for _ in range(2):
+        connection, devices = connections.open(port)
+        assert [d.device_address for d in devices] == [1, 2]
+        connection.close()
+    assert detections == [port]
+    assert connections._known[port] == [(1, 6110), (2, 6110)]
+
+
+def test_changed_device_is_detected_again(port, monkeypatch):
+    chain, port = port
+    connections = ConnectionManager()
+    detections = count_detections(connections, monkeypatch)
+    connection, _ = connections.open(port)
+    connection.close()
+    chain.axes[2].DEVICE_ID = 6111  # stage swapped on the same address
+    connection, devices = connections.open(port)
+    connection.close()
+    assert detections == [port, port]
+    assert connections._known[port] == [(1, 6110), (2, 6111)]
+
+
+def test_async_reconnect(port):
+    _, port = port
+    connections = ConnectionManager()
+
+    async def open_twice():
+        for _ in range(2):
+            connection, devices = await connections.open_async(port)
+            await connection.close_async()
+        return devices
+
+    assert [d.device_address for d in asyncio.run(open_twice())] == [1, 2]
+    assert connections._known[port] == [(1, 6110), (2, 6110)]
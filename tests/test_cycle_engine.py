@@ -0,0 +1,73 @@
+import threading
+
+import pytest
+
+from mini_stretcher.cycle_engine import CycleEngine, cycle_lengths, summarize
+from mini_stretcher.position_sampler import PositionSampler
+from mini_stretcher.sync_monitor import SyncMonitor
+from mini_stretcher.units import mm_to_data
+
+L0, TARGET, SPEED = 14.0, 15.0, 2.0  # [mm], [mm], [mm/s]
+MOVE_TIME = abs(TARGET - L0) / SPEED
+
+
+@pytest.fixture
+def lengths(motors):
+    """(t_ns, length) samples while the test runs"""
+    samples = []
+    sampler = PositionSampler(motors, rate=100)
+
+    def on_sample(t_ns, pos1, pos2):
+        samples.append((t_ns, motors.length_from_positions(pos1, pos2)))
+
+    sampler.listeners.append(on_sample)
+    sampler.start()
+    yield samples
+    sampler.stop()
+    sampler.join()
+
+
+def test_every_cycle_reaches_the_peak(motors, lengths):
+    motors.move_absolute_distance(L0, SPEED).result(timeout=10)
+    # Starting at L0 is the worst case for a stray move reply: it arrives at once
+    timings = cycle_lengths(motors, L0, TARGET, SPEED, cycles=3, hold=0.1)
+
+    assert [t.cycle for t in timings] == [1, 2, 3]
+    for timing in timings:
+        assert timing.stretch_s == pytest.approx(MOVE_TIME, rel=0.2)
+        assert timing.release_s - 0.1 == pytest.approx(MOVE_TIME, rel=0.2)
+        peak = max(length for t_ns, length in lengths if timing.start_ns <= t_ns <= timing.end_ns)
+        assert peak == pytest.approx(TARGET, abs=0.005)
+    assert summarize(timings)["cycles"] == 3
+
+
+def test_cancel_ends_the_cycles(motors):
+    engine = CycleEngine(motors.connection, (motors.device1, motors.device2))
+    zero = motors.ZERO_POSITION
+    threading.Timer(0.3, engine.cancel).start()
+    motors.set_speed(SPEED)
+    with pytest.raises(InterruptedError):
+        engine.run(100, zero - 20000, zero, MOVE_TIME)
+    assert len(engine.timings) < 100
+
+
+def test_cycles_are_tracked(motors):
+    moves = []
+    motors.move_listeners.append(lambda t_ns, handle: moves.append(handle.target))
+    motors.move_absolute_distance(L0, SPEED).result(timeout=10)
+    moves.clear()
+    monitor = SyncMonitor(motors)
+    sampler = PositionSampler(motors, rate=50)
+    sampler.listeners.append(monitor.feed)
+    sampler.start()
+    try:
+        cycle_lengths(motors, L0, TARGET, SPEED, cycles=2)
+    finally:
+        sampler.stop()
+        sampler.join()
+
+    peak = motors.ZERO_POSITION - mm_to_data((TARGET - 12) / 2)
+    zero = motors.ZERO_POSITION - mm_to_data((L0 - 12) / 2)
+    assert moves == [peak, zero] * 2
+    assert motors.tracker.current.result(timeout=1) == (zero, zero)
+    assert monitor.stats()["moving"]  # the sync statistics see the cycles as motion
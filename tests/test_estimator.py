@@ -0,0 +1,79 @@
+import math
+
+import pytest
+
+from mini_stretcher import units
+from mini_stretcher.estimator import AxisProfile, PositionEstimator
+from mini_stretcher.motion_state import MoveHandle
+from mini_stretcher.simulator import DEFAULT_SETTINGS, SimulatedAxis
+
+START = 400_000  # [data]
+DT = 0.001  # [s] simulator step
+TOLERANCE = units.mm_to_data(0.008)  # [data]
+ACCELERATION = DEFAULT_SETTINGS[43] * units.acceleration_unit()  # [data/s²]
+SPEED = DEFAULT_SETTINGS[42] * units.velocity_unit()  # [data/s]
+
+
+class FakeMotors:
+    def __init__(self):
+        self.move_listeners = []
+
+
+def compare(events, duration):
+    """Max |estimate - simulated position| [data] of one axis
+
+    Args:
+        events (list): (time [s], kind, target [data]), sent to the simulated
+            axis and, as MoveHandles, to the estimator at the same instant
+    """
+    axis = SimulatedAxis(1, units.velocity_unit(), units.acceleration_unit(), START)
+    motors = FakeMotors()
+    estimator = PositionEstimator(motors, acceleration=ACCELERATION, command_delay=0)
+    estimator.correct(0, START, START)
+    events = sorted(events)
+    worst = 0.0
+    for step in range(round(duration / DT)):
+        t = step * DT
+        while events and events[0][0] <= t + DT / 2:
+            _, kind, target = events.pop(0)
+            if kind == "stop":
+                axis.stop()
+            else:
+                axis.start_move(20, target)
+            for listener in motors.move_listeners:
+                listener(round(t * 1e9), MoveHandle(kind, target, SPEED if kind != "stop" else None))
+        estimate = estimator.position(round(t * 1e9))[0]
+        worst = max(worst, abs(estimate - axis.position))
+        axis.step(DT)
+    return worst
+
+
+def test_triangular_profile():
+    distance = 400  # shorter than the SPEED ramp up and down
+    assert distance < SPEED ** 2 / ACCELERATION
+    profile = AxisProfile(0, START, target=START + distance, speed=SPEED, acceleration=ACCELERATION)
+    t_half = math.sqrt(distance / ACCELERATION)
+    position, velocity = profile.state(round(t_half * 1e9))
+    assert position == pytest.approx(START + distance / 2)
+    assert velocity == pytest.approx(math.sqrt(ACCELERATION * distance))
+    assert profile.state(round(2 * t_half * 1e9) + 1) == (START + distance, 0.0)
+
+
+def test_triangular_move():
+    assert compare([(0.0, "move_absolute", START + 400)], 0.2) <= TOLERANCE
+
+
+def test_long_move():
+    assert compare([(0.0, "move_absolute", START + units.mm_to_data(0.5))], 0.6) <= TOLERANCE
+
+
+def test_retarget_mid_move():
+    # Reverses while running at full speed: brake, then move back past the start
+    events = [(0.0, "move_absolute", START + units.mm_to_data(1)),
+              (0.3, "move_absolute", START - units.mm_to_data(0.2))]
+    assert compare(events, 1.0) <= TOLERANCE
+
+
+def test_stop_mid_move():
+    events = [(0.0, "move_absolute", START + units.mm_to_data(1)), (0.3, "stop", None)]
+    assert compare(events, 0.5) <= TOLERANCE
@@ -0,0 +1,71 @@
+import json
+import time
+
+import pytest
+
+from mini_stretcher.experiment_queue import ExperimentQueue
+from mini_stretcher.motors import Motors
+from mini_stretcher.recorder import CYCLE_DTYPE, cycles_path
+from mini_stretcher.rigs import Rig
+from mini_stretcher.simulator import PACKET, serve_tcp
+from mini_stretcher.units import mm_to_data
+
+MOVE_ABSOLUTE = 20
+
+
+@pytest.fixture
+def rig(chain, tmp_path):
+    rig = Rig("sim", f"tcp://127.0.0.1:{serve_tcp(chain)}", run_dir=str(tmp_path / "runs"))
+    rig.motors.connect(rig.port)
+    yield rig
+    rig.sampler.stop()
+    rig.motors.disconnect()
+    rig.worker.shutdown()
+
+
+def test_cycling_entry_runs_full_cycles(rig, tmp_path):
+    path = tmp_path / "queue.json"
+    path.write_text(json.dumps([{"l0": 14, "target_length": 15, "speed": 2, "cycles": 3, "hold": 0.1}]))
+    queue = ExperimentQueue(str(path))
+
+    rig.submit(queue.run)
+    assert rig.done.wait(30)
+    assert rig.state == "idle", rig.error
+
+    result, = [json.loads(line) for line in open(queue.results_path)]
+    assert result["status"] == "done"
+    assert result["cycles"]["cycles"] == 3
+    assert result["cycles"]["min_period"] == pytest.approx(2 * 0.5 + 0.1, rel=0.2)
+    markers = open(cycles_path(result["recording"]), "rb").read()
+    assert len(markers) == 3 * CYCLE_DTYPE.itemsize
+
+
+def test_stop_during_a_hold_ends_the_cycles(rig, chain, tmp_path):
+    moves = []  # (time.monotonic(), target) of every MOVE_ABSOLUTE the devices received
+    receive = chain.receive
+
+    def logging_receive(packet):
+        _, command, data = PACKET.unpack(packet)
+        if command == MOVE_ABSOLUTE:
+            moves.append((time.monotonic(), data))
+        receive(packet)
+
+    chain.receive = logging_receive
+    path = tmp_path / "queue.json"
+    path.write_text(json.dumps([{"l0": 14, "target_length": 15, "speed": 2, "cycles": 5, "hold": 2}]))
+    queue = ExperimentQueue(str(path))
+    peak = Motors.ZERO_POSITION - mm_to_data((15 - 12) / 2)
+
+    rig.submit(queue.run)
+    deadline = time.monotonic() + 10
+    while not any(target == peak for _, target in moves) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    time.sleep(1)  # 0.5 s stretch, then into the 2 s hold
+    stopped = time.monotonic()
+    rig.stop()
+    assert rig.done.wait(5)
+
+    assert rig.state == "stopped"
+    assert [target for t, target in moves if t > stopped] == []
+    time.sleep(1)
+    assert [target for t, target in moves if t > stopped] == []
@@ -0,0 +1,43 @@
+import pytest
+
+from mini_stretcher import waveform
+from mini_stretcher.connection_manager import ConnectionManager
+from mini_stretcher.motors import Motors
+from mini_stretcher.simulator import serve_tcp
+
+
+@pytest.mark.parametrize("command", ["stop", "home", "get_positions"])
+def test_commands_need_a_connection(command):
+    with pytest.raises(ConnectionError):
+        getattr(Motors(), command)()
+
+
+def test_move_to_is_tracked(motors):
+    moves = []
+    motors.move_listeners.append(lambda t_ns, handle: moves.append(handle))
+    motors.set_speed(2)
+    handle = motors.move_to(motors.ZERO_POSITION - 5000)
+    assert motors.state == "moving"
+    assert handle.result(timeout=5) == (motors.ZERO_POSITION - 5000,) * 2
+    assert moves == [handle] and handle.speed is None
+    assert motors.state == "idle"
+
+
+def test_streamed_trajectory_is_tracked(motors):
+    moves = []
+    motors.move_listeners.append(lambda t_ns, handle: moves.append(handle))
+    trajectory = waveform.Trajectory.from_strain(waveform.sine(5, 2, 1), 12, motors.ZERO_POSITION, 12)
+    streamer = waveform.TrajectoryStreamer(motors.connection, segment_time=0.05, motors=motors)
+    report = streamer.run(trajectory)
+
+    assert len(moves) == report["segments"]
+    assert moves[0].speed is not None
+    assert moves[-1].result(timeout=5) == (motors.ZERO_POSITION,) * 2
+
+
+def test_connect_checks_the_microstep_resolution(chain):
+    chain.axes[2].settings[37] = 128
+    motors = Motors(ConnectionManager())
+    with pytest.raises(ConnectionError, match="resolution is 128"):
+        motors.connect(f"tcp://127.0.0.1:{serve_tcp(chain)}")
+    assert not motors.connected
@@ -0,0 +1,33 @@
+import time
+
+from mini_stretcher.position_sampler import PositionSampler
+
+
+class FakeMotors:
+    connected = True
+
+    def __init__(self):
+        self.position = 0
+
+    def get_positions(self):
+        self.position += 1
+        return self.position, self.position
+
+
+def test_failing_listener_does_not_stop_sampling(capsys):
+    received = []
+
+    def broken(t_ns, pos1, pos2):
+        raise OSError("disk full")
+
+    sampler = PositionSampler(FakeMotors(), rate=200)
+    sampler.listeners += [broken, lambda t_ns, pos1, pos2: received.append(pos1)]
+    sampler.start()
+    time.sleep(0.2)
+    sampler.stop()
+    sampler.join(1)
+
+    assert len(received) > 10  # later listeners still get every sample
+    assert sampler.errors == len(received)
+    assert sampler.buffer.count == len(received)
+    assert capsys.readouterr().out.count("disk full") == 1
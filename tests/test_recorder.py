@@ -0,0 +1,95 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from mini_stretcher import recorder as recorder_module
+from mini_stretcher.cycle_engine import CycleTiming
+from mini_stretcher.motors import Motors
+from mini_stretcher.recorder import CYCLE_DTYPE, Recorder, cycles_path, load_run
+
+
+def record(path, samples, codec=None, timings=()):
+    recorder = Recorder(path, 12.0, Motors.length_from_positions, chunk_size=64, pool_size=2,
+                        metadata={"speed": 0.5}, codec=codec)
+    for t_ns, pos1, pos2 in samples:
+        recorder.append(t_ns, pos1, pos2)
+    for timing in timings:
+        recorder.mark_cycle(timing)
+    recorder.close()
+
+
+@pytest.mark.parametrize("codec", [None, "delta", "zlib", "lzma"])
+def test_round_trip(tmp_path, codec):
+    rng = np.random.default_rng(1)
+    n = 1000  # several chunks plus a partial one
+    t_ns = 10 ** 12 + np.cumsum(20_000_000 + rng.integers(-200_000, 200_000, n))
+    pos1 = Motors.ZERO_POSITION - np.cumsum(rng.integers(0, 40, n))
+    pos2 = pos1 + rng.integers(-3, 4, n)
+    path = tmp_path / "run.msrun"
+    record(path, zip(t_ns, pos1, pos2), codec)
+
+    header, records = load_run(path)
+    assert header["l0"] == 12.0 and header["speed"] == 0.5
+    assert len(records) == n
+    np.testing.assert_array_equal(records["t_ns"], t_ns)
+    np.testing.assert_array_equal(records["pos1"], pos1)
+    np.testing.assert_array_equal(records["pos2"], pos2)
+    np.testing.assert_allclose(records["length"], Motors.length_from_positions(pos1, pos2))
+    np.testing.assert_allclose(records["strain"], (records["length"] - 12.0) / 12.0 * 100)
+
+
+def test_empty_run(tmp_path):
+    path = tmp_path / "run.msrun"
+    record(path, [])
+    header, records = load_run(path)
+    assert header["l0"] == 12.0 and len(records) == 0
+
+
+def test_cycle_markers(tmp_path):
+    path = tmp_path / "run.msrun"
+    timings = [CycleTiming(i + 1, 100 * i, 100 * i + 40, 100 * i + 90) for i in range(3)]
+    record(path, [(0, 1, 1)], timings=timings)
+    markers = np.fromfile(cycles_path(path), dtype=CYCLE_DTYPE)
+    assert markers["cycle"].tolist() == [1, 2, 3]
+    assert markers["peak_ns"].tolist() == [40, 140, 240]
+    assert markers["end_ns"].tolist() == [90, 190, 290]
+
+
+def test_cycle_markers_not_writable(tmp_path, monkeypatch, capsys):
+    # The run must still be recorded and closed
+    monkeypatch.setattr(recorder_module, "cycles_path", lambda path: str(tmp_path / "missing" / "run.cycles"))
+    path = tmp_path / "run.msrun"
+    timings = [CycleTiming(i + 1, 100 * i, 100 * i + 40, 100 * i + 90) for i in range(3)]
+    record(path, [(0, 1, 1), (1, 2, 2)], timings=timings)
+    _, records = load_run(path)
+    assert records["t_ns"].tolist() == [0, 1]
+    assert capsys.readouterr().out.count("cycle markers of") == 1
+
+
+def test_append_while_closing(tmp_path):
+    # The sampler thread may still append while the Tk thread closes the run
+    path = tmp_path / "run.msrun"
+    recorder = Recorder(path, 12.0, Motors.length_from_positions, chunk_size=64, pool_size=2)
+    closed = threading.Event()
+
+    def sample():
+        t_ns = 0
+        while not closed.is_set():
+            t_ns += 1
+            recorder.append(t_ns, 1, 1)
+        recorder.append(t_ns + 1, 1, 1)  # after close: ignored
+
+    sampler = threading.Thread(target=sample)
+    sampler.start()
+    while recorder.count < 1000:
+        time.sleep(0.001)
+    recorder.close()
+    closed.set()
+    sampler.join()
+    recorder.close()
+
+    _, records = load_run(path)
+    assert len(records) == recorder.count
+    np.testing.assert_array_equal(records["t_ns"], np.arange(1, recorder.count + 1))
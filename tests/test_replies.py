@@ -0,0 +1,57 @@
+import threading
+
+from zaber_motion.binary import CommandCode
+
+from mini_stretcher.replies import ReplyCollector
+
+
+def collector(motors):
+    return ReplyCollector(motors.connection, (motors.device1.device_address, motors.device2.device_address))
+
+
+def test_collects_both_move_replies(motors):
+    replies = collector(motors)
+    target = motors.ZERO_POSITION - 2000
+    try:
+        replies.arm(CommandCode.MOVE_ABSOLUTE)
+        motors.broadcast(CommandCode.MOVE_ABSOLUTE, target)
+        assert replies.wait(5)
+        assert replies.replies == {1: target, 2: target}
+        assert not replies.stopped and replies.error is None
+    finally:
+        replies.close()
+
+
+def test_ignores_replies_to_other_commands(motors):
+    replies = collector(motors)
+    try:
+        replies.arm(CommandCode.MOVE_ABSOLUTE)
+        motors.broadcast(CommandCode.SET_TARGET_SPEED, 1000)
+        assert not replies.wait(0.3)
+        assert replies.replies == {}
+    finally:
+        replies.close()
+
+
+def test_stop_ends_the_wait(motors):
+    replies = collector(motors)
+    try:
+        motors.set_speed(0.1)
+        replies.arm(CommandCode.MOVE_ABSOLUTE, stop_ends=True)
+        motors.broadcast(CommandCode.MOVE_ABSOLUTE, motors.ZERO_POSITION - 100000)
+        threading.Timer(0.2, motors.broadcast, (CommandCode.STOP,)).start()
+        assert replies.wait(5)
+        assert replies.stopped
+    finally:
+        replies.close()
+
+
+def test_release_wakes_the_waiter(motors):
+    replies = collector(motors)
+    try:
+        replies.arm(CommandCode.MOVE_ABSOLUTE)
+        threading.Timer(0.1, replies.release).start()
+        assert replies.wait(5)
+        assert replies.replies == {}
+    finally:
+        replies.close()
@@ -0,0 +1,24 @@
+import numpy as np
+
+from mini_stretcher import rigs
+from mini_stretcher.recorder import CYCLE_DTYPE, cycles_path
+from mini_stretcher.simulator import SimulatedChain, serve_tcp
+
+
+def test_cycles_on_every_rig(tmp_path):
+    ports = {name: f"tcp://127.0.0.1:{serve_tcp(SimulatedChain())}" for name in ("left", "right")}
+    manager = rigs.RigManager(ports, str(tmp_path))
+    try:
+        assert manager.connect_all() == {}
+        manager.run(rigs.cycle, l0=14, target_length=15, speed=2, pause=0, cycles=2)
+        assert manager.wait(timeout=30)
+        for rig in manager.rigs.values():
+            assert rig.state == "idle", rig.error
+            run, = tmp_path.joinpath(rig.name).glob("*.msrun")
+            markers = np.fromfile(cycles_path(run), dtype=CYCLE_DTYPE)
+            periods = (markers["end_ns"] - markers["start_ns"]) / 1e9
+            assert markers["cycle"].tolist() == [1, 2]
+            assert (periods > 0.8).all()  # two 0.5 s moves
+            assert run.with_suffix(".sync.json").exists()
+    finally:
+        manager.close()
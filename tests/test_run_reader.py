@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from mini_stretcher import run_reader
+from mini_stretcher.motors import Motors
+from mini_stretcher.recorder import Recorder, load_run
+from mini_stretcher.run_reader import RunReader
+from mini_stretcher.units import mm_to_data
+
+RATE = 50  # [Hz]
+PERIOD = 2.0  # [s] of the recorded cycles
+
+
+def write_run(path, seconds: float, codec=None):
+    """Cycles between 12 and 13 mm"""
+    recorder = Recorder(path, 12.0, Motors.length_from_positions, chunk_size=256,
+                        metadata={"target_length": 13.0}, codec=codec)
+    t = np.arange(int(seconds * RATE)) / RATE
+    half = mm_to_data(0.5 * (1 - np.cos(2 * np.pi * t / PERIOD)) / 2)
+    for t_s, step in zip(t, half):
+        pos = Motors.ZERO_POSITION - int(step)
+        recorder.append(10 ** 12 + round(t_s * 1e9), pos, pos)
+    recorder.close()
+
+
+@pytest.mark.parametrize("codec", [None, "zlib"])
+def test_slices_match_the_whole_run(tmp_path, monkeypatch, codec):
+    monkeypatch.setattr(RunReader, "INDEX_STRIDE", 64)  # lookups across many index entries
+    path = tmp_path / "run.msrun"
+    write_run(path, 60, codec)
+    _, records = load_run(path)
+    run = RunReader(path)
+
+    assert len(run) == len(records) == 60 * RATE
+    assert run.duration == pytest.approx(60 - 1 / RATE)
+    np.testing.assert_array_equal(run.time_slice(10, 12.5), records[10 * RATE:int(12.5 * RATE)])
+    assert run.find(run.t0_ns + 7_000_000_000) == 7 * RATE
+    assert len(run.time_slice(100, 110)) == 0
+
+
+@pytest.mark.parametrize("codec", [None, "delta"])
+def test_detected_cycles(tmp_path, codec):
+    path = tmp_path / "run.msrun"
+    write_run(path, 10 * PERIOD, codec)
+    run = RunReader(path)
+    markers = run.cycle_markers()
+    assert len(markers) == 10
+    cycle = run.cycles(3)
+    assert cycle["length"].max() == pytest.approx(13.0, abs=1e-3)
+    assert (cycle["t_ns"][-1] - cycle["t_ns"][0]) / 1e9 == pytest.approx(PERIOD, abs=2 / RATE)
+
+
+def test_cycle_markers_not_writable(tmp_path, monkeypatch, capsys):
+    path = tmp_path / "run.msrun"
+    write_run(path, 3 * PERIOD)
+    monkeypatch.setattr(run_reader, "cycles_path", lambda path: str(tmp_path / "missing" / "run.cycles"))
+    run = RunReader(path)
+    assert len(run.cycle_markers()) == 3
+    assert len(run.cycles(2)) > 0
+    assert "cycle markers not saved" in capsys.readouterr().out
+
+
+@pytest.mark.parametrize("codec", [None, "delta"])
+def test_empty_run(tmp_path, codec):
+    path = tmp_path / "run.msrun"
+    write_run(path, 0, codec)
+    run = RunReader(path)
+    assert len(run) == 0 and run.t0_ns is None and run.duration == 0.0
+    assert len(run.time_slice(0, 10)) == 0
+    assert len(run.cycle_markers()) == 0
@@ -0,0 +1,56 @@
+import threading
+import time
+
+import pytest
+
+from mini_stretcher.motion_worker import CommandCancelled, MotionWorker
+from mini_stretcher.scheduler import DeadlineScheduler
+
+
+def test_deadlines_do_not_drift():
+    # Each step takes 6 ms of the 10 ms period; waits measure from the
+    # previous deadline, so the steps don't add up (sleeping 10 ms after
+    # each would take 0.32 s). Bounds leave room for a loaded machine.
+    schedule = DeadlineScheduler()
+    for i in range(20):
+        time.sleep(0.006)
+        schedule.wait(0.01, f"step {i}")
+    report = schedule.report()
+    assert report["steps"] == 20
+    assert report["planned_s"] == pytest.approx(0.2)
+    assert 0.2 <= report["total_s"] < 0.25
+    assert 0 <= report["max_ms"] < 40
+    planned = [planned for _, planned, _ in schedule.steps]
+    assert [b - a for a, b in zip(planned, planned[1:])] == [10_000_000] * 19
+
+
+def test_late_step_is_caught_up():
+    schedule = DeadlineScheduler()
+    schedule.wait(0.01)
+    time.sleep(0.03)  # overruns the next deadline
+    assert schedule.wait(0.01) > 0.015
+    schedule.wait(0.03)  # back on the original grid
+    assert schedule.report()["total_s"] == pytest.approx(0.05, abs=0.02)
+
+
+def test_cancel_ends_a_wait():
+    cancel = threading.Event()
+    schedule = DeadlineScheduler(cancel)
+    threading.Timer(0.05, cancel.set).start()
+    started = time.monotonic()
+    with pytest.raises(InterruptedError):
+        schedule.wait(5)
+    assert time.monotonic() - started < 1
+    assert schedule.steps == []
+
+
+def test_worker_cancel_raises_command_cancelled():
+    worker = MotionWorker(None)
+    errors = []
+    done = threading.Event()
+    worker.submit(lambda: worker.scheduler().wait(5), on_error=lambda e: (errors.append(e), done.set()))
+    time.sleep(0.05)
+    worker.cancel()
+    assert done.wait(1)
+    assert isinstance(errors[0], CommandCancelled)
+    worker.shutdown()
@@ -0,0 +1,24 @@
+import numpy as np
+import pytest
+
+from mini_stretcher.strain_control import StrainRateController, _RampFit
+
+
+def test_ramp_fit_matches_polyfit():
+    t = 3600 + np.linspace(0, 7200, 20000)  # hours into a run
+    length = 12 + 0.001 * (t - 3600) + np.random.default_rng(3).normal(0, 1e-4, len(t))
+    fit = _RampFit()
+    for args in zip(t, length, length):
+        fit.add(*args)
+    assert fit.slope() == pytest.approx(np.polyfit(t, length, 1)[0], rel=1e-9)
+    assert fit.max_error == 0
+
+
+def test_ramp_reaches_the_strain_rate(motors):
+    motors.move_absolute_distance(12, 5).result(timeout=10)
+    controller = StrainRateController(motors, 12, rate=50)
+    report = controller.run(13.2, 5)
+
+    assert report["samples"] > 50
+    assert report["achieved_strain_rate"] == pytest.approx(5, rel=0.05)
+    assert motors.length_from_positions(*motors.get_positions()) == pytest.approx(13.2, abs=1e-3)
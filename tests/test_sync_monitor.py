@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+from mini_stretcher.sync_monitor import SyncMonitor
+from mini_stretcher.units import data_to_mm
+
+
+class IdleMotors:
+    state = "idle"
+
+
+def test_stats_match_numpy():
+    skew = np.random.default_rng(2).integers(-60, 40, 5000)
+    monitor = SyncMonitor(IdleMotors(), threshold=0.01)
+    for t_ns, value in enumerate(skew):
+        monitor.feed(t_ns, int(value), 0)
+
+    stats = monitor.stats()
+    skew_mm = data_to_mm(skew)
+    assert stats["samples"] == len(skew)
+    assert stats["all"]["mean_mm"] == pytest.approx(skew_mm.mean())
+    assert stats["all"]["rms_mm"] == pytest.approx(np.sqrt(np.mean(skew_mm ** 2)))
+    assert stats["all"]["max_abs_mm"] == pytest.approx(np.abs(skew_mm).max())
+    assert stats["all"]["p95_abs_mm"] == pytest.approx(np.percentile(np.abs(skew_mm), 95))
+    assert "moving" not in stats
+    assert len(monitor.samples) == SyncMonitor.HISTORY
+
+
+def test_alarm_once_per_excursion():
+    alarms = []
+    monitor = SyncMonitor(IdleMotors(), threshold=data_to_mm(10), on_alarm=lambda t_ns, skew: alarms.append(t_ns))
+    for t_ns, skew in enumerate([0, 12, 15, 8, 4, 11, 0]):
+        monitor.feed(t_ns, skew, 0)
+    assert alarms == [1, 5]
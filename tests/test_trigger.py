@@ -0,0 +1,73 @@
+import threading
+import time
+
+from mini_stretcher.motion_worker import MotionWorker
+from mini_stretcher.trigger import TriggerManager, TriggerSource
+
+
+class ManualSource(TriggerSource):
+    name = "manual"
+
+
+def test_action_runs_once_with_callbacks():
+    source = ManualSource()
+    triggers = TriggerManager([source])
+    done = threading.Event()
+    results = []
+    triggers.arm(lambda event: event.source, on_done=lambda result: (results.append(result), done.set()))
+    source.emit("trigger")
+    source.emit("trigger")  # disarmed by the first one
+    assert done.wait(5)
+    assert results == ["manual"]
+    assert not triggers.armed
+    assert len(triggers.events) == 1
+
+
+def test_failed_action_reaches_on_error():
+    source = ManualSource()
+    triggers = TriggerManager([source])
+    errors = []
+    failed = threading.Event()
+
+    def action(event):
+        raise RuntimeError("no motors")
+
+    triggers.arm(action, on_error=lambda e: (errors.append(str(e)), failed.set()))
+    source.emit("trigger")
+    assert failed.wait(5)
+    assert errors == ["no motors"]
+
+
+class FakeTk:
+    """Stands in for the Tk root: after() callbacks run when pumped"""
+
+    def after(self, ms, callback):
+        self.pending = callback
+
+
+def test_posted_start_runs_on_tk_thread_before_the_failure():
+    # ms_app starts the recording from the trigger action this way; a quick
+    # failure must not end the run before the recording was started
+    source = ManualSource()
+    master = FakeTk()
+    worker = MotionWorker(None, master)
+    triggers = TriggerManager([source], worker=worker)
+    calls = []
+
+    def action(event):
+        worker.post(lambda e: calls.append(("start", threading.current_thread())), event)
+        raise RuntimeError("no motors")
+
+    triggers.arm(action, on_error=lambda e: calls.append(("failed", threading.current_thread())))
+    source.emit("trigger")
+    deadline = time.monotonic() + 5
+    while len(calls) < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+        master.pending()
+    worker.shutdown()
+    assert [name for name, _ in calls] == ["start", "failed"]
+    assert all(thread is threading.main_thread() for _, thread in calls)
+
+
+def test_stop_before_start():
+    TriggerManager([ManualSource()]).stop()